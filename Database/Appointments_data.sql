@@ -13,3 +13,11 @@ CREATE TABLE Appointments (
     CONSTRAINT FK_Appointments_Patients FOREIGN KEY (patient_id) 
         REFERENCES Patients(patient_id)
 );
+
+CREATE INDEX IX_Appointments_doctor ON Appointments(doctor_id);
+CREATE INDEX IX_Appointments_patient ON Appointments(patient_id);
+CREATE INDEX IX_Appointments_date ON Appointments(appointment_date);
+
+-- yyyymm of appointment_date, set by the loaders (see Dates_data.sql).
+ALTER TABLE Appointments ADD month_key INT NULL;
+CREATE INDEX IX_Appointments_month ON Appointments(month_key);
@@ -0,0 +1,22 @@
+USE Care_Stat;
+GO
+
+-- One row per calendar day, added by the loaders as new dates arrive
+-- (care_stat/datedim.py).  Keys are integers: date_key is yyyymmdd and
+-- month_key is yyyymm, the same value as the month_key column the loaders
+-- store on Payments, Visits, Appointments and Medical_Records.  Time-series
+-- reports group on that column and range-scan its index instead of calling
+-- YEAR()/MONTH() on every row.
+CREATE TABLE Dates (
+    date_key INT PRIMARY KEY,
+    full_date DATE NOT NULL UNIQUE,
+    year INT NOT NULL,
+    quarter INT NOT NULL CHECK (quarter BETWEEN 1 AND 4),
+    month INT NOT NULL CHECK (month BETWEEN 1 AND 12),
+    month_key INT NOT NULL,
+    day INT NOT NULL CHECK (day BETWEEN 1 AND 31),
+    day_of_week INT NOT NULL CHECK (day_of_week BETWEEN 1 AND 7),
+    week_start_key INT NOT NULL
+);
+
+CREATE INDEX IX_Dates_month ON Dates(month_key);
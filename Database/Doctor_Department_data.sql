@@ -11,4 +11,7 @@ CREATE TABLE DoctorDepartment (
         REFERENCES Doctors(doctor_id),
     CONSTRAINT FK_DoctorDepartment_Department FOREIGN KEY (department_id) 
         REFERENCES Departments(department_id)
-);
\ No newline at end of file
+);
+
+-- The primary key leads with doctor_id; this serves joins from Departments.
+CREATE INDEX IX_DoctorDepartment_department ON DoctorDepartment(department_id);
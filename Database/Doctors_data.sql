@@ -23,4 +23,8 @@ CREATE TABLE Doctors (
 );
 ALTER TABLE Doctors
 ADD gender NVARCHAR(10) NOT NULL 
-    CHECK (gender IN (N'male', N'female')) DEFAULTN'male';
\ No newline at end of file
+    CHECK (gender IN (N'male', N'female')) DEFAULTN'male';
+
+-- Top doctors of a specialization by rating or salary (care_stat/leaderboards.py).
+CREATE INDEX IX_Doctors_specialization_rating ON Doctors(specialization, rating_avg);
+CREATE INDEX IX_Doctors_specialization_salary ON Doctors(specialization, salary);
@@ -18,4 +18,13 @@ CREATE TABLE Medical_Records (
         REFERENCES Doctors(doctor_id),
     CONSTRAINT FK_MedicalRecords_Departments FOREIGN KEY (department_id) 
         REFERENCES Departments(department_id)
-);
\ No newline at end of file
+);
+
+CREATE INDEX IX_MedicalRecords_patient ON Medical_Records(patient_id);
+CREATE INDEX IX_MedicalRecords_doctor ON Medical_Records(doctor_id);
+CREATE INDEX IX_MedicalRecords_department ON Medical_Records(department_id);
+CREATE INDEX IX_MedicalRecords_date ON Medical_Records(record_date) INCLUDE (prescription_cost);
+
+-- yyyymm of record_date, set by the loaders (see Dates_data.sql).
+ALTER TABLE Medical_Records ADD month_key INT NULL;
+CREATE INDEX IX_MedicalRecords_month ON Medical_Records(month_key) INCLUDE (prescription_cost);
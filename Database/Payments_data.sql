@@ -23,4 +23,17 @@ CREATE TABLE Payments (
         REFERENCES Medical_Records(record_id),
     CONSTRAINT FK_Payments_Departments FOREIGN KEY (department_id) 
         REFERENCES Departments(department_id)
-);
\ No newline at end of file
+);
+
+-- Foreign keys, then revenue totals, revenue per month and revenue per
+-- method, which read only their index.
+CREATE INDEX IX_Payments_patient ON Payments(patient_id);
+CREATE INDEX IX_Payments_appointment ON Payments(appointment_id);
+CREATE INDEX IX_Payments_record ON Payments(record_id);
+CREATE INDEX IX_Payments_department ON Payments(department_id);
+CREATE INDEX IX_Payments_date ON Payments(payment_date) INCLUDE (amount);
+CREATE INDEX IX_Payments_method ON Payments(method) INCLUDE (amount);
+
+-- yyyymm of payment_date, set by the loaders (see Dates_data.sql).
+ALTER TABLE Payments ADD month_key INT NULL;
+CREATE INDEX IX_Payments_month ON Payments(month_key) INCLUDE (amount);
@@ -0,0 +1,53 @@
+USE Care_Stat;
+GO
+
+-- Summaries read by SQL_analysis/SQL_summary_reports.sql.  The loaders keep
+-- them up to date in the same transaction as their inserts (care_stat/rollups.py).
+
+CREATE TABLE RevenueMonthly (
+    year INT NOT NULL,
+    month INT NOT NULL,
+    method NVARCHAR(50) NOT NULL,
+    payment_status NVARCHAR(20) NOT NULL,
+    payment_count INT NOT NULL,
+    revenue DECIMAL(18,2) NOT NULL,
+    first_payment DATETIME NOT NULL,
+    last_payment DATETIME NOT NULL,
+
+    CONSTRAINT PK_RevenueMonthly PRIMARY KEY (year, month, method, payment_status)
+);
+
+-- Visits has no doctor, so a doctor's visits are counted from Appointments.
+CREATE TABLE DoctorVisits (
+    doctor_id INT PRIMARY KEY,
+    visit_count INT NOT NULL,
+
+    CONSTRAINT FK_DoctorVisits_Doctors FOREIGN KEY (doctor_id)
+        REFERENCES Doctors(doctor_id)
+);
+
+CREATE TABLE PatientVisits (
+    patient_id INT PRIMARY KEY,
+    visit_count INT NOT NULL,
+    first_visit DATE NOT NULL,
+
+    CONSTRAINT FK_PatientVisits_Patients FOREIGN KEY (patient_id)
+        REFERENCES Patients(patient_id)
+);
+
+-- Patients has no admission date; a patient is new in the month of their first visit.
+CREATE TABLE NewPatientsMonthly (
+    year INT NOT NULL,
+    month INT NOT NULL,
+    new_patients INT NOT NULL,
+
+    CONSTRAINT PK_NewPatientsMonthly PRIMARY KEY (year, month)
+);
+
+-- The leaderboards read the largest counts first.
+CREATE INDEX IX_DoctorVisits_count ON DoctorVisits(visit_count);
+CREATE INDEX IX_PatientVisits_count ON PatientVisits(visit_count);
+
+-- Each doctor's specialization, so a specialization's leaderboard is one index range.
+ALTER TABLE DoctorVisits ADD specialization NVARCHAR(50) NULL;
+CREATE INDEX IX_DoctorVisits_specialization_count ON DoctorVisits(specialization, visit_count);
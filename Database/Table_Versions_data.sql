@@ -0,0 +1,12 @@
+USE Care_Stat;
+GO
+
+-- One counter per table, raised by every loader in the transaction that
+-- changes the table.  Cached report results are kept while the counters of
+-- the tables they read stay the same (care_stat/versions.py).
+
+CREATE TABLE TableVersions (
+    table_name NVARCHAR(128) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at DATETIME NULL
+);
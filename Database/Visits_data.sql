@@ -8,4 +8,11 @@ CREATE TABLE Visits (
 
     CONSTRAINT FK_Visits_Patients FOREIGN KEY (patient_id) 
         REFERENCES Patients(patient_id)
-);
\ No newline at end of file
+);
+
+CREATE INDEX IX_Visits_date ON Visits(visit_date);
+
+-- yyyymm of visit_date, set by the loaders (see Dates_data.sql); the patient
+-- index carries it for the first-visit month behind new patients per month.
+ALTER TABLE Visits ADD month_key INT NULL;
+CREATE INDEX IX_Visits_patient ON Visits(patient_id) INCLUDE (visit_date, month_key);
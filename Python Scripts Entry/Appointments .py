@@ -1,6 +1,12 @@
 import pandas as pd
 import pyodbc
 import os
+import sys
+
+# Dates, the report summaries and the table versions are maintained by the
+# shared care_stat package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import datedim, rollups, versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -75,12 +81,13 @@ except Exception as e:
 # === 7. Insert data row by row ===
 insert_query = f"""
 INSERT INTO {table_name} (
-    appointment_id, doctor_id, patient_id, appointment_date, notes
-) VALUES (?, ?, ?, ?, ?)
+    appointment_id, doctor_id, patient_id, appointment_date, notes, month_key
+) VALUES (?, ?, ?, ?, ?, ?)
 """
 
 success_count = 0
 error_count = 0
+inserted = []
 print("\n🔄 Starting data insertion into the table...")
 
 for index, row in df.iterrows():
@@ -90,9 +97,11 @@ for index, row in df.iterrows():
             row['doctor_id'],
             row['patient_id'],
             row['appointment_date'],
-            row['notes']
+            row['notes'],
+            datedim.month_key(row['appointment_date']) if pd.notna(row['appointment_date']) else None
         )
         cursor.execute(insert_query, record_tuple)
+        inserted.append(record_tuple)
         success_count += 1
     except pyodbc.IntegrityError as e:
         print(f"⚠️ Integrity error for record {index + 1} (appointment_id={row['appointment_id']}): {e}")
@@ -101,8 +110,14 @@ for index, row in df.iterrows():
         print(f"❌ Unexpected error inserting record {index + 1} (appointment_id={row['appointment_id']}): {e}")
         error_count += 1
 
-# === 8. Commit changes and close connection ===
+# === 8. Update Dates and report summaries, commit changes and close connection ===
+# Same transaction as the inserts: both are committed or rolled back together.
 try:
+    inserted = pd.DataFrame(inserted, columns=[
+        'appointment_id', 'doctor_id', 'patient_id', 'appointment_date', 'notes', 'month_key'])
+    datedim.ensure(cursor, inserted['appointment_date'])
+    rollups.apply(cursor, table_name, inserted)
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success_count} records.")
     if error_count > 0:
@@ -2,6 +2,10 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -135,6 +139,7 @@ for index, row in records_to_insert_df.iterrows():
 
 # === 7. Commit changes and close connection ===
 try:
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success_count} new records.")
     if error_count > 0:
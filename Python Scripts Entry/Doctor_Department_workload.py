@@ -2,6 +2,10 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -161,6 +165,7 @@ for (doc_id, dept_id, hours) in records_to_insert:
         failed += 1
 
 try:
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success} records.")
     if failed:
@@ -3,6 +3,10 @@ import pyodbc
 import os
 import random
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === 1) Configuration ===
 server = 'ALI\\SQLEXPRESS'            # Change if needed
@@ -167,6 +171,7 @@ for (did, ph) in records:
         failed += 1
 
 try:
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success} records.")
     if failed:
@@ -2,6 +2,10 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -148,6 +152,7 @@ for index, row in df_to_insert.iterrows():
 
 # === 7. Commit changes and close connection ===
 try:
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success_count} new records.")
     if error_count > 0:
@@ -1,6 +1,10 @@
 import pandas as pd
 import pyodbc
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import rollups, versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -88,11 +92,13 @@ INSERT INTO {table_name} (
 
 success_count = 0
 error_count = 0
+inserted = []
 print("\n🔄 Starting data insertion into the table...")
 
 for index, row in df.iterrows():
     try:
         cursor.execute(insert_query, tuple(row))
+        inserted.append(row)
         success_count += 1
     except pyodbc.IntegrityError as e:
         print(f"⚠️ Integrity error for record {index + 1} (doctor_id={row['doctor_id']}): {e}")
@@ -102,7 +108,10 @@ for index, row in df.iterrows():
         error_count += 1
 
 # === 8. Commit changes and close connection ===
+# Appointments loaded before these doctors are already counted without a specialization.
 try:
+    rollups.apply(cursor, table_name, pd.DataFrame(inserted, columns=required_columns))
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success_count} records.")
     if error_count > 0:
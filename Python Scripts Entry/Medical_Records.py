@@ -2,6 +2,11 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
+
+# The date keys and table versions are shared with the care_stat package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import datedim, versions
 
 # === 1. Configuration ===
 server = 'ALI\\SQLEXPRESS'
@@ -149,6 +154,7 @@ for index, row in df.iterrows():
         "severity_level": severity_level,
         "prescription_cost": prescription_cost,
         "record_date": record_date,
+        "month_key": datedim.month_key(record_date),
     })
 
 df_to_insert = pd.DataFrame(records_to_insert)
@@ -163,8 +169,9 @@ print(f"\nFound {len(df_to_insert)} unique records to insert after force-fixing.
 # === 6. Insert data row by row ===
 insert_query = f"""
 INSERT INTO {table_name} (
-    record_id, patient_id, doctor_id, department_id, diagnosis, severity_level, prescription_cost, record_date
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    record_id, patient_id, doctor_id, department_id, diagnosis, severity_level, prescription_cost, record_date,
+    month_key
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
 success_count = 0
@@ -182,6 +189,7 @@ for index, row in df_to_insert.iterrows():
             row["severity_level"],
             row["prescription_cost"],
             row["record_date"],
+            row["month_key"],
         )
         cursor.execute(insert_query, record_tuple)
         success_count += 1
@@ -192,8 +200,11 @@ for index, row in df_to_insert.iterrows():
         print(f"❌ Unexpected error inserting record (Record ID={row["record_id"]}, Patient ID={row["patient_id"]}, Doctor ID={row["doctor_id"]}, Dept ID={row["department_id"]}): {e}")
         error_count += 1
 
-# === 7. Commit changes and close connection ===
+# === 7. Add new days to Dates, commit changes and close connection ===
+# Same transaction as the inserts: both are committed or rolled back together.
 try:
+    datedim.ensure(cursor, df_to_insert["record_date"])
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"\n✅ Successfully inserted {success_count} new records.")
     if error_count > 0:
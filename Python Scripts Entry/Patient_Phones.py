@@ -2,6 +2,10 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === 1. Connection & file settings ===
 SERVER   = r'ALI\SQLEXPRESS'           # Change if needed
@@ -112,6 +116,7 @@ for rec in records_to_insert:
 
 # === 7. Commit & close ===
 try:
+    versions.bump(cursor, TABLE)
     conn.commit()
     print(f'\n✅ Successfully inserted {success} records.')
     if errors:
@@ -1,6 +1,10 @@
 import pandas as pd
 import pyodbc
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import versions
 
 # === Configuration ===
 server = 'ALI\\SQLEXPRESS'           # Server name from the image
@@ -108,6 +112,7 @@ for index, row in df.iterrows():
 
 # === Commit changes ===
 try:
+    versions.bump(cursor, table_name)
     conn.commit()
     print(f"✅ Successfully inserted {success_count} out of {len(df)} records into table '{table_name}'.")
 except Exception as e:
@@ -2,8 +2,14 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
 from datetime import datetime
 
+# Dates, the report summaries and the table versions are maintained by the
+# shared care_stat package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import datedim, rollups, versions
+
 # === 1. Connection & file settings ===
 SERVER   = r'ALI\SQLEXPRESS'          # Change if needed
 DATABASE = 'Care_Stat'
@@ -129,7 +135,8 @@ for _, row in df.iterrows():
     transid  = row['transaction_id'] if pd.notna(row['transaction_id']) and row['transaction_id'] else None
 
     records_to_insert.append(
-        (pid, patid, aid, rid, did, method, amount, paydate, status, transid)
+        (pid, patid, aid, rid, did, method, amount, paydate, status, transid,
+         datedim.month_key(row['payment_date']))
     )
 
 if not records_to_insert:
@@ -143,15 +150,17 @@ print(f'\nReady to insert {len(records_to_insert)} records.')
 insert_sql = f"""
 INSERT INTO {TABLE} (
     payment_id, patient_id, appointment_id, record_id, department_id,
-    method, amount, payment_date, payment_status, transaction_id
+    method, amount, payment_date, payment_status, transaction_id, month_key
 )
-VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
 success = errors = 0
+inserted = []
 for rec in records_to_insert:
     try:
         cursor.execute(insert_sql, rec)
+        inserted.append(rec)
         success += 1
     except pyodbc.IntegrityError as ie:
         print(f'⚠️ Duplicate or constraint error: {rec} -> {ie}')
@@ -160,8 +169,15 @@ for rec in records_to_insert:
         print(f'❌ Unexpected error: {rec} -> {ex}')
         errors += 1
 
-# === 7. Commit & close ===
+# === 7. Update Dates and report summaries, commit & close ===
+# Same transaction as the inserts: both are committed or rolled back together.
 try:
+    inserted = pd.DataFrame(inserted, columns=[
+        'payment_id', 'patient_id', 'appointment_id', 'record_id', 'department_id',
+        'method', 'amount', 'payment_date', 'payment_status', 'transaction_id', 'month_key'])
+    datedim.ensure(cursor, inserted['payment_date'])
+    rollups.apply(cursor, TABLE, inserted)
+    versions.bump(cursor, TABLE)
     conn.commit()
     print(f'\n✅ Successfully inserted {success} records.')
     if errors:
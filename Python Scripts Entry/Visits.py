@@ -2,8 +2,14 @@ import pandas as pd
 import pyodbc
 import os
 import random
+import sys
 from datetime import datetime
 
+# Dates, the report summaries and the table versions are maintained by the
+# shared care_stat package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from care_stat import datedim, rollups, versions
+
 # === 1. Connection & file settings ===
 SERVER   = r'ALI\SQLEXPRESS'
 DATABASE = 'Care_Stat'
@@ -82,7 +88,7 @@ for _, row in df.iterrows():
 
     vdate = row['visit_date'].strftime('%Y-%m-%d')
 
-    records_to_insert.append((vid, pid, vdate))
+    records_to_insert.append((vid, pid, vdate, datedim.month_key(row['visit_date'])))
 
 if not records_to_insert:
     print('\n✅ No new records to insert.')
@@ -93,14 +99,16 @@ print(f'\nReady to insert {len(records_to_insert)} records.')
 
 # === 6. Insert into table ===
 insert_sql = f"""
-INSERT INTO {TABLE} (visit_id, patient_id, visit_date)
-VALUES (?, ?, ?)
+INSERT INTO {TABLE} (visit_id, patient_id, visit_date, month_key)
+VALUES (?, ?, ?, ?)
 """
 
 success = errors = 0
+inserted = []
 for rec in records_to_insert:
     try:
         cursor.execute(insert_sql, rec)
+        inserted.append(rec)
         success += 1
     except pyodbc.IntegrityError as ie:
         print(f'⚠️ Duplicate or constraint error: {rec} -> {ie}')
@@ -109,8 +117,13 @@ for rec in records_to_insert:
         print(f'❌ Unexpected error: {rec} -> {ex}')
         errors += 1
 
-# === 7. Commit & close ===
+# === 7. Update Dates and report summaries, commit & close ===
+# Same transaction as the inserts: both are committed or rolled back together.
 try:
+    inserted = pd.DataFrame(inserted, columns=['visit_id', 'patient_id', 'visit_date', 'month_key'])
+    datedim.ensure(cursor, inserted['visit_date'])
+    rollups.apply(cursor, TABLE, inserted)
+    versions.bump(cursor, TABLE)
     conn.commit()
     print(f'\n✅ Successfully inserted {success} records.')
     if errors:
@@ -13,13 +13,13 @@ FROM Payments;
 
 -- Monthly revenue --
 SELECT 
-    YEAR(payment_date) AS year,
-    MONTH(payment_date) AS month,
+    month_key / 100 AS year,
+    month_key % 100 AS month,
     SUM(amount) AS monthly_revenue,
     COUNT(*) AS payment_count
 FROM Payments
-GROUP BY YEAR(payment_date), MONTH(payment_date)
-ORDER BY year, month
+GROUP BY month_key
+ORDER BY month_key
 
 
 -- Payment methods (which method is most commonly used?) --
@@ -58,13 +58,14 @@ SELECT TOP 10
     d.doctor_id,
     d.first_name + ' ' + d.last_name AS doctor_name,
     d.specialization,
-    COUNT(v.visit_id) AS total_visits,
+    COUNT(a.appointment_id) AS total_visits,
     d.rating_avg,
     d.salary
+-- Visits has no doctor_id: a doctor's visits are their appointments.
 FROM Doctors d
-JOIN Visits v ON d.doctor_id = v.doctor_id
+JOIN Appointments a ON d.doctor_id = a.doctor_id
 GROUP BY d.doctor_id, d.first_name, d.last_name, d.specialization, d.rating_avg, d.salary
-ORDER BY total_visits DESC;
+ORDER BY total_visits DESC, d.doctor_id;
 
 
 -- For patients who have more than one visit --
@@ -78,7 +79,7 @@ FROM Patients p
 JOIN Visits v ON p.patient_id = v.patient_id
 GROUP BY p.patient_id, p.first_name, p.last_name, p.age, p.gender
 HAVING COUNT(v.visit_id) > 1
-ORDER BY total_visits DESC;
+ORDER BY total_visits DESC, p.patient_id;
 
 
 -- Departments by number of doctors --
@@ -93,11 +94,16 @@ ORDER BY doctor_count DESC;
 
 
 -- New patients per month --
+-- Patients has no admission date: a patient is new in the month of their first visit.
 
 SELECT 
-    YEAR(admission_date) AS year,
-    MONTH(admission_date) AS month,
+    first_month / 100 AS year,
+    first_month % 100 AS month,
     COUNT(*) AS new_patients
-FROM Patients
-GROUP BY YEAR(admission_date), MONTH(admission_date)
-ORDER BY year, month;
\ No newline at end of file
+FROM (
+    SELECT patient_id, MIN(month_key) AS first_month
+    FROM Visits
+    GROUP BY patient_id
+) AS first_visits
+GROUP BY first_month
+ORDER BY first_month;
\ No newline at end of file
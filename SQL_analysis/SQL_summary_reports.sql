@@ -0,0 +1,75 @@
+USE Care_Stat
+
+
+-- The SQL_analysis.sql reports, read from the summary tables in
+-- Database/Report_Summaries_data.sql instead of the full history.
+
+
+-- Total revenue and number of payments --
+SELECT 
+    SUM(payment_count) AS total_payments,
+    SUM(revenue) AS total_revenue,
+    SUM(revenue) / SUM(payment_count) AS avg_payment,
+    MIN(first_payment) AS first_payment,
+    MAX(last_payment) AS last_payment
+FROM RevenueMonthly;
+
+
+-- Monthly revenue --
+SELECT 
+    year,
+    month,
+    SUM(revenue) AS monthly_revenue,
+    SUM(payment_count) AS payment_count
+FROM RevenueMonthly
+GROUP BY year, month
+ORDER BY year, month;
+
+
+-- Payment methods (which method is most commonly used?) --
+
+SELECT 
+    method,
+    SUM(payment_count) AS count,
+    SUM(revenue) AS total_amount,
+    SUM(revenue) / SUM(payment_count) AS avg_amount
+FROM RevenueMonthly
+GROUP BY method
+ORDER BY count DESC;
+
+
+-- Doctors by number of visits --
+SELECT TOP 10
+    d.doctor_id,
+    d.first_name + ' ' + d.last_name AS doctor_name,
+    d.specialization,
+    dv.visit_count AS total_visits,
+    d.rating_avg,
+    d.salary
+FROM DoctorVisits dv
+JOIN Doctors d ON d.doctor_id = dv.doctor_id
+ORDER BY dv.visit_count DESC, dv.doctor_id;
+
+
+-- For patients who have more than one visit --
+SELECT TOP 10
+    p.patient_id,
+    p.first_name + ' ' + p.last_name AS patient_name,
+    p.age,
+    p.gender,
+    pv.visit_count AS total_visits
+FROM PatientVisits pv
+JOIN Patients p ON p.patient_id = pv.patient_id
+WHERE pv.visit_count > 1
+ORDER BY pv.visit_count DESC, pv.patient_id;
+
+
+-- New patients per month --
+
+SELECT 
+    year,
+    month,
+    new_patients
+FROM NewPatientsMonthly
+WHERE new_patients > 0
+ORDER BY year, month;
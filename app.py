@@ -1,177 +1,317 @@
+import os
+
 import streamlit as st
-import numpy as np 
-import pandas as pd
-import plotly.express as px
+
+from care_stat import export, profiling, startup
+from care_stat.resources import DATA_SOURCE, csv_dataset, data_path, sketch_cube
+
+startup.mark("run")
 
 st.set_page_config(page_title="Care_Stat Dashboard", layout="wide")
 st.title("Care_Stat Dashboard")
+startup.mark("first_byte")
 
-@st.cache_data
-def load_data():
-    file_path = "Care_stat.csv"
-    df = None 
-    
+# Imported after the title is on its way; pandas and the data modules are
+# imported by the code that uses them.  serve.py pre-imports all of them.
+import plotly.express as px  # noqa: E402
+import plotly.graph_objects as go  # noqa: E402
+
+# Opt-in render profiling: ?profile=1 in the URL or CARE_STAT_PROFILE=1.
+profiler = profiling.start(profiling.env_enabled() or st.query_params.get("profile") in ("1", "true"))
+
+# Box-plot quartiles: "exact" or "tdigest" (mergeable estimates).
+QUANTILES = os.environ.get("CARE_STAT_QUANTILES", "exact").lower()
+
+def load_data(columns):
+    # Only the requested columns are parsed; each tab passes its TAB_COLUMNS.
+    dataset = csv_dataset(tuple(columns))
     try:
-        df = pd.read_csv(file_path, header=0, on_bad_lines="skip", encoding="utf-8")
+        with profiling.section("load"):
+            status = dataset.refresh()
 
     except FileNotFoundError:
-        st.error(f"ERROR: The file '{file_path}' was not found in the GitHub repository.")
+        st.error(f"ERROR: The file '{data_path()}' was not found in the GitHub repository.")
         st.error("Please make sure the file 'Care_stat.csv' is committed and pushed to your GitHub repository alongside 'app.py'.")
         st.stop()
     except Exception as e:
         st.error(f"An error occurred while reading the file: {e}")
         st.stop()
 
-    numeric_cols = ["salary", "prescription_cost", "amount", "num_staff", 
-                    "years_of_experience", "age", "age_patient", "visits_count"]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    profiling.record_cache(data_path(), hit=status in ("skipped", "unchanged", "restored"))
+    frame = dataset.view()
+    profiling.record_memory(f"{data_path()}[{', '.join(columns)}]", frame)
+    return frame
 
-    date_cols = ["appointment_date", "record_date", "payment_date", "visit_date"]
-    for col in date_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce")
+def get_source():
+    if DATA_SOURCE == "sqlite":
+        from care_stat import db
+        if not os.path.exists(db.DB_PATH):
+            st.error(f"ERROR: The database '{db.DB_PATH}' was not found.")
+            st.error("Build it with 'python -m care_stat.db --init' or point CARE_STAT_DB at an existing copy.")
+            st.stop()
+        # A fresh connection per rerun always sees the loaders' latest commits.
+        return db.SQLiteSource(db.connect())
+    from care_stat.dashboard import FrameSource
+    return FrameSource(load_data, cube=sketch_cube, quantiles=QUANTILES)
 
-    if "payment_date" in df.columns:
-        df["month_year"] = df["payment_date"].dropna().dt.to_period("M").astype(str)
+def fmt(value, spec):
+    return "N/A" if value is None else format(value, spec)
 
-    return df
+def sketch_metric(col, label, summary, key):
+    # Values read from an inexact sketch are marked with ≈ and their error bound.
+    value, error = summary[key], summary.get("approx", {}).get(key)
+    if error is None:
+        col.metric(label, "N/A" if value is None else value)
+    else:
+        shown = f"{value:,}" if isinstance(value, int) else value
+        col.metric(label, f"≈{shown}", help=f"Estimated from a sketch, within about ±{error:.1%}")
 
-df = load_data()
+def plot(chart, *args, **kwargs):
+    # Figure construction and st.plotly_chart serialization are timed separately.
+    with profiling.section("figure"):
+        fig = chart(*args, **kwargs)
+    with profiling.section("plotly_chart"):
+        st.plotly_chart(fig, width="stretch")
 
-st.header("Dashboard Tabs")
+def sample_badge(summary):
+    if summary.get("sampled") is not None:
+        st.badge("Approximate", icon=":material/query_stats:", color="orange",
+                 help=f"Some charts below are estimated from a stratified sample of {summary['sampled']:,} rows; "
+                      "KPIs are computed from all rows.")
 
-tab1, tab2, tab3 = st.tabs(["Hospit Overview", "Patient & Treatment Data", "Financial Performance"])
+def error_bars(frame, axis):
+    # Sampled means carry their standard error.
+    return {axis: "error"} if "error" in frame.columns else {}
 
-with tab1:
+def box_figure(summary, x, y, title):
+    # Boxes come from precomputed statistics, so the figure size does not grow with the data.
+    fig = go.Figure(go.Box(x=summary[x], q1=summary["q1"], median=summary["median"], q3=summary["q3"],
+                           lowerfence=summary["lower"], upperfence=summary["upper"], mean=summary["mean"],
+                           name=y, boxpoints=False))
+    outliers = summary[[x, "outliers"]].explode("outliers").dropna()
+    if not outliers.empty:
+        fig.add_trace(go.Scatter(x=outliers[x], y=outliers["outliers"], mode="markers", name="outliers"))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+def histogram_figure(summary, x, color, title):
+    fig = px.bar(summary, x="bin_mid", y="count", color=color, title=title)
+    fig.update_traces(width=float(summary["bin_end"].iloc[0] - summary["bin_start"].iloc[0]))
+    fig.update_layout(bargap=0, xaxis_title=x)
+    return fig
+
+def export_controls(tab, filters, summary, charts, dates=None):
+    # Filtered rows are encoded a chunk at a time and streamed by serve.py's
+    # export route, never held whole in memory; plain `streamlit run app.py`
+    # has no such route, so it only offers the chart data, which is the
+    # summary already computed for the chart.
+    with st.expander("Export"):
+        c1, c2 = st.columns(2)
+        with c1:
+            file_format = st.radio("Format", list(export.EXPORT_FORMATS), horizontal=True,
+                                   key=f"{tab}_export_format", persist_state="page")
+            if export.routes_mounted:
+                st.link_button("Download filtered rows", export.url(tab, file_format, filters, dates))
+            else:
+                st.caption("Row exports are streamed by `streamlit run serve.py`.")
+        with c2:
+            available = {title: summary[key] for title, key in charts.items() if summary[key] is not None}
+            chart = st.selectbox("Chart data", list(available), key=f"{tab}_export_chart", persist_state="page")
+            if chart is not None:
+                st.download_button("Download chart data", lambda: available[chart].to_csv(index=False),
+                                   file_name=f"care_stat_{chart.lower().replace(' ', '_')}.csv", mime="text/csv",
+                                   on_click="ignore", key=f"{tab}_export_chart_data")
+
+source = get_source()
+
+def overview_tab():
     st.header("Hospital Overview")
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        dept_list = ["All"] + list(df["department_name"].dropna().unique())
-        selected_dept = st.selectbox("Select Department", dept_list, key="tab1_dept")
+        dept_list = ["All"] + source.options("overview", "department_name")
+        selected_dept = st.selectbox("Select Department", dept_list, key="tab1_dept", persist_state="page")
     with col2:
-        gender_list = ["All"] + list(df["gender"].dropna().unique())
-        selected_gender = st.selectbox("Select Gender", gender_list, key="tab1_gender")
+        gender_list = ["All"] + source.options("overview", "gender")
+        selected_gender = st.selectbox("Select Gender", gender_list, key="tab1_gender", persist_state="page")
     with col3:
-        country_list = ["All"] + list(df["country"].dropna().unique())
-        selected_country = st.selectbox("Select Country", country_list, key="tab1_country")
+        country_list = ["All"] + source.options("overview", "country")
+        selected_country = st.selectbox("Select Country", country_list, key="tab1_country", persist_state="page")
 
-    filtered_df_tab1 = df.copy()
-    if selected_dept != "All":
-        filtered_df_tab1 = filtered_df_tab1[filtered_df_tab1["department_name"] == selected_dept]
-    if selected_gender != "All":
-        filtered_df_tab1 = filtered_df_tab1[filtered_df_tab1["gender"] == selected_gender]
-    if selected_country != "All":
-        filtered_df_tab1 = filtered_df_tab1[filtered_df_tab1["country"] == selected_country]
+    filters = {
+        "department_name": selected_dept,
+        "gender": selected_gender,
+        "country": selected_country,
+    }
+    overview = source.overview(filters)
 
     st.subheader("Key Performance Indicators")
     k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total Employees", filtered_df_tab1["doctor_id"].nunique())
-    k2.metric("Average Salary", f"{filtered_df_tab1['salary'].mean():,.0f}" if not filtered_df_tab1["salary"].empty else "N/A")
-    k3.metric("Number of Departments", filtered_df_tab1["department_name"].nunique())
-    if not filtered_df_tab1.empty and not filtered_df_tab1["gender"].empty:
-        female_percentage = (filtered_df_tab1["gender"] == "female").mean() * 100
-        k4.metric("Female Staff %", f"{female_percentage:.1f}%")
-    else:
-        k4.metric("Female Staff %", "N/A")
+    sketch_metric(k1, "Total Employees", overview, "employees")
+    k2.metric("Average Salary", fmt(overview["avg_salary"], ",.0f"))
+    sketch_metric(k3, "Number of Departments", overview, "departments")
+    k4.metric("Female Staff %", "N/A" if overview["female_pct"] is None else f"{overview['female_pct']:.1f}%")
 
     st.subheader("Visualizations")
+    sample_badge(overview)
     c1, c2 = st.columns(2)
     with c1:
-        dept_count = filtered_df_tab1["department_name"].value_counts().reset_index()
-        fig1 = px.bar(dept_count, x="count", y="department_name", orientation="h", title="Employee Count by Department")
-        st.plotly_chart(fig1, use_container_width=True)
+        plot(px.bar, overview["dept_count"], x="count", y="department_name", orientation="h", title="Employee Count by Department")
     with c2:
-        fig2 = px.pie(filtered_df_tab1, names="gender", title="Gender Distribution")
-        st.plotly_chart(fig2, use_container_width=True)
+        plot(px.pie, overview["gender_count"], names="gender", values="count", title="Gender Distribution")
 
     st.markdown("---")
     st.subheader("Average Salary by Department")
-    salary_by_dept = filtered_df_tab1.groupby("department_name")["salary"].mean().reset_index()
-    fig3 = px.bar(salary_by_dept, x="salary", y="department_name", orientation="h", title="Average Salary")
-    st.plotly_chart(fig3, use_container_width=True)
+    plot(px.bar, overview["salary_by_dept"], x="salary", y="department_name", orientation="h", title="Average Salary",
+         **error_bars(overview["salary_by_dept"], "error_x"))
 
-with tab2:
+    if overview["salary_box"] is not None:
+        st.subheader("Salary Distribution by Department")
+        plot(box_figure, overview["salary_box"], "department_name", "salary", title="Salary Distribution")
+
+    export_controls("overview", filters, overview, {
+        "Employee Count by Department": "dept_count",
+        "Gender Distribution": "gender_count",
+        "Average Salary by Department": "salary_by_dept",
+        "Salary Distribution by Department": "salary_box",
+    })
+
+def treatment_tab():
     st.header("Patient & Treatment Data")
     
-    disease_list = ["All"] + list(df["disease_name"].dropna().unique())
-    selected_disease = st.selectbox("Select Disease", disease_list, key="tab2_disease")
+    disease_list = ["All"] + source.options("treatment", "disease_name")
+    selected_disease = st.selectbox("Select Disease", disease_list, key="tab2_disease", persist_state="page")
     
-    severity_list = ["All"] + list(df["severity_level"].dropna().unique())
-    selected_severity = st.selectbox("Select Severity", severity_list, key="tab2_severity")
+    severity_list = ["All"] + source.options("treatment", "severity_level")
+    selected_severity = st.selectbox("Select Severity", severity_list, key="tab2_severity", persist_state="page")
 
-    filtered_df_tab2 = df.copy()
-    if selected_disease != "All":
-        filtered_df_tab2 = filtered_df_tab2[filtered_df_tab2["disease_name"] == selected_disease]
-    if selected_severity != "All":
-        filtered_df_tab2 = filtered_df_tab2[filtered_df_tab2["severity_level"] == selected_severity]
+    filters = {
+        "disease_name": selected_disease,
+        "severity_level": selected_severity,
+    }
+    treatment = source.treatment(filters)
 
     st.subheader("Key Performance Indicators")
     k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total Patients", filtered_df_tab2["patient_id"].nunique())
-    k2.metric("Most Common Disease", filtered_df_tab2["disease_name"].mode()[0] if not filtered_df_tab2.empty and not filtered_df_tab2["disease_name"].mode().empty else "N/A")
-    k3.metric("Average Cost", f"{filtered_df_tab2['prescription_cost'].mean():,.2f}" if not filtered_df_tab2.empty else "N/A")
-    k4.metric("Unique Medical Devices", filtered_df_tab2["equipment_name"].nunique())
+    sketch_metric(k1, "Total Patients", treatment, "patients")
+    sketch_metric(k2, "Most Common Disease", treatment, "top_disease")
+    k3.metric("Average Cost", fmt(treatment["avg_cost"], ",.2f"))
+    sketch_metric(k4, "Unique Medical Devices", treatment, "devices")
 
     st.subheader("Visualizations")
+    sample_badge(treatment)
     c1, c2 = st.columns(2)
     with c1:
-        disease_count = filtered_df_tab2["disease_name"].value_counts().head(10).reset_index()
-        fig1 = px.bar(disease_count, x="count", y="disease_name", orientation="h", title="Top 10 Most Common Diseases")
-        st.plotly_chart(fig1, use_container_width=True)
+        plot(px.bar, treatment["disease_count"].head(10), x="count", y="disease_name", orientation="h", title="Top 10 Most Common Diseases")
     with c2:
-        fig2 = px.pie(filtered_df_tab2, names="severity_level", title="Disease Severity Distribution")
-        st.plotly_chart(fig2, use_container_width=True)
+        plot(px.pie, treatment["severity_count"], names="severity_level", values="count", title="Disease Severity Distribution")
 
     st.markdown("---")
     st.subheader("Average Cost by Disease")
-    cost_by_disease = filtered_df_tab2.groupby("disease_name")["prescription_cost"].mean().reset_index()
-    fig3 = px.bar(cost_by_disease, x="prescription_cost", y="disease_name", orientation="h", title="Average Cost")
-    st.plotly_chart(fig3, use_container_width=True)
+    plot(px.bar, treatment["cost_by_disease"], x="prescription_cost", y="disease_name", orientation="h", title="Average Cost",
+         **error_bars(treatment["cost_by_disease"], "error_x"))
 
-with tab3:
+    if treatment["age_hist"] is not None:
+        st.subheader("Patient Age Distribution")
+        plot(histogram_figure, treatment["age_hist"], "age_patient", "severity_level", title="Patient Age by Severity")
+
+    export_controls("treatment", filters, treatment, {
+        "Most Common Diseases": "disease_count",
+        "Disease Severity Distribution": "severity_count",
+        "Average Cost by Disease": "cost_by_disease",
+        "Patient Age Distribution": "age_hist",
+    })
+
+def financial_tab():
     st.header("Financial Performance")
     
-    status_list = ["All"] + list(df["payment_status"].dropna().unique())
-    selected_status = st.selectbox("Payment Status", status_list, key="tab3_status")
+    status_list = ["All"] + source.options("financial", "payment_status")
+    selected_status = st.selectbox("Payment Status", status_list, key="tab3_status", persist_state="page")
     
-    method_list = ["All"] + list(df["method"].dropna().unique())
-    selected_method = st.selectbox("Payment Method", method_list, key="tab3_method")
+    method_list = ["All"] + source.options("financial", "method")
+    selected_method = st.selectbox("Payment Method", method_list, key="tab3_method", persist_state="page")
+
+    # Moving the range or switching the resolution is answered from the pre-rolled daily revenue.
+    col1, col2 = st.columns([3, 1])
+    selected_dates = None
+    bounds = source.date_bounds("financial", "payment_date")
+    if bounds is not None and bounds[0] < bounds[1]:
+        with col1:
+            selected_dates = st.slider("Payment Dates", min_value=bounds[0], max_value=bounds[1], value=bounds,
+                                       key="tab3_dates", persist_state="page")
+    with col2:
+        grain = st.radio("Revenue Resolution", ["Day", "Week", "Month"], index=2, horizontal=True,
+                         key="tab3_grain", persist_state="page")
 
-    filtered_df_tab3 = df.copy()
-    if selected_status != "All":
-        filtered_df_tab3 = filtered_df_tab3[filtered_df_tab3["payment_status"] == selected_status]
-    if selected_method != "All":
-        filtered_df_tab3 = filtered_df_tab3[filtered_df_tab3["method"] == selected_method]
+    filters = {
+        "payment_status": selected_status,
+        "method": selected_method,
+    }
+    financial = source.financial(filters, dates=selected_dates, grain=grain.lower())
 
     st.subheader("Key Performance Indicators")
     k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total Revenue", f"{filtered_df_tab3['amount'].sum():,.0f}" if not filtered_df_tab3.empty else "N/A")
-    k2.metric("Average Transaction", f"{filtered_df_tab3['amount'].mean():,.2f}" if not filtered_df_tab3.empty else "N/A")
-    if not filtered_df_tab3.empty and not filtered_df_tab3["payment_status"].empty:
-        completed_percentage = (filtered_df_tab3["payment_status"] == "completed").mean() * 100
-        k3.metric("Successful Payments %", f"{completed_percentage:.1f}%")
-    else:
-        k3.metric("Successful Payments %", "N/A")
-    k4.metric("Most Common Method", filtered_df_tab3["method"].mode()[0] if not filtered_df_tab3.empty and not filtered_df_tab3["method"].mode().empty else "N/A")
+    k1.metric("Total Revenue", fmt(financial["revenue"], ",.0f"))
+    k2.metric("Average Transaction", fmt(financial["avg_transaction"], ",.2f"))
+    k3.metric("Successful Payments %", "N/A" if financial["completed_pct"] is None else f"{financial['completed_pct']:.1f}%")
+    sketch_metric(k4, "Most Common Method", financial, "top_method")
 
     st.subheader("Visualizations")
+    sample_badge(financial)
     c1, c2 = st.columns(2)
     with c1:
-        fig1 = px.pie(filtered_df_tab3, names="payment_status", title="Payment Status Distribution")
-        st.plotly_chart(fig1, use_container_width=True)
+        plot(px.pie, financial["status_count"], names="payment_status", values="count", title="Payment Status Distribution")
     with c2:
-        fig2 = px.pie(filtered_df_tab3, names="method", title="Payment Method Distribution")
-        st.plotly_chart(fig2, use_container_width=True)
+        plot(px.pie, financial["method_count"], names="method", values="count", title="Payment Method Distribution")
 
     st.markdown("---")
-    st.subheader("Monthly Revenue")
-    if "month_year" in filtered_df_tab3.columns and not filtered_df_tab3["month_year"].dropna().empty:
-        revenue_by_month = filtered_df_tab3.groupby("month_year")["amount"].sum().reset_index()
-        fig3 = px.line(revenue_by_month, x="month_year", y="amount", title="Revenue by Month")
-        st.plotly_chart(fig3, use_container_width=True)
+    st.subheader("Revenue Over Time")
+    if financial["revenue_series"] is not None:
+        plot(px.line, financial["revenue_series"], x="period", y="amount", title=f"Revenue by {grain}")
     else:
-        st.warning("Not enough date information to display monthly revenue.")
+        st.warning("Not enough date information to display revenue over time.")
+
+    export_controls("financial", filters, financial, {
+        "Payment Status Distribution": "status_count",
+        "Payment Method Distribution": "method_count",
+        "Revenue Over Time": "revenue_series",
+    }, dates=selected_dates)
+
+st.header("Dashboard Tabs")
+
+# on_change="rerun" makes Streamlit report which tab is open, so only that
+# tab loads its columns and computes its KPIs and figures.  The filters use
+# persist_state="page" so they survive while their tab is not rendered.
+tab1, tab2, tab3 = st.tabs(["Hospit Overview", "Patient & Treatment Data", "Financial Performance"],
+                           key="active_tab", on_change="rerun")
+
+with tab1:
+    if tab1.open:
+        with profiling.section("overview"):
+            overview_tab()
+
+with tab2:
+    if tab2.open:
+        with profiling.section("treatment"):
+            treatment_tab()
+
+with tab3:
+    if tab3.open:
+        with profiling.section("financial"):
+            financial_tab()
+
+if profiler is not None:
+    import pandas as pd
+    record = profiler.to_record(source=DATA_SOURCE, tab=st.session_state.get("active_tab"))
+    with st.sidebar:
+        st.subheader("Render profile")
+        st.caption(f"Rerun: {record['total_ms']:,.1f} ms")
+        st.dataframe(pd.DataFrame(profiler.rows(), columns=["section", "ms", "calls"]), hide_index=True)
+        for name, counts in record["cache"].items():
+            st.caption(f"Cache {name}: {counts['hits']} hit(s), {counts['misses']} miss(es)")
+        for name, nbytes in record["memory_bytes"].items():
+            st.caption(f"Memory {name}: {nbytes / 2**20:,.1f} MB")
+    profiling.write_jsonl(record)
 
+if startup.mark("interactive"):
+    startup.report()
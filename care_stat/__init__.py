@@ -0,0 +1,5 @@
+"""Shared helpers behind the Care_Stat dashboard (app.py) and analysis scripts.
+
+Submodules are imported explicitly (``from care_stat import db``) so that
+importing the package itself stays cheap.
+"""
@@ -0,0 +1,168 @@
+"""The SQL_analysis.sql reports by name, cached until the tables they read change.
+
+    from care_stat import analytics, db
+    reports = analytics.Analytics(db.connect())
+    reports.run("monthly_revenue")
+
+Every query in SQL_analysis/SQL_analysis.sql is available under its
+``care_stat.sqlbench`` name (``reports.names``).  A result is kept with the
+version of each table its query reads (``care_stat.versions``), which the
+loaders raise when they commit; ``run`` compares them with one small query
+and only runs the SQL again when one of them moved.  Results are kept in
+memory and, unless ``cache_dir`` is None, as Arrow files in
+``QUERY_CACHE_DIR``, so a new notebook kernel or report process reuses them
+too.  Editing a query invalidates its cached result.
+
+    python -m care_stat.analytics monthly_revenue payment_methods
+
+runs reports against the local SQLite copy and shows which were cached.
+Against SQL Server, pass the pyodbc connection with ``dialect="tsql"``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+from care_stat import db, sqlbench, versions
+
+QUERY_CACHE_DIR = os.environ.get("CARE_STAT_QUERY_CACHE_DIR", os.path.join(db.ROOT_DIR, ".care_stat_query_cache"))
+
+
+def source_tables(sql):
+    """Tables (and views) a query reads, from its FROM and JOIN clauses."""
+    return sorted(set(re.findall(r"\b(?:FROM|JOIN)\s+(\w+)", sql, flags=re.IGNORECASE)))
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Analytics:
+    """Runs the named reports on ``conn`` and caches their results.
+
+    ``database`` names the database in the disk cache's keys; for SQLite it
+    defaults to the database file.
+    """
+
+    def __init__(self, conn, dialect="sqlite", cache_dir=QUERY_CACHE_DIR, path=sqlbench.ANALYSIS_PATH,
+                 database=None):
+        self.conn = conn
+        self.cache_dir = cache_dir
+        self.queries = dict(sqlbench.analysis_queries(path, translate=dialect == "sqlite"))
+        if database is None and dialect == "sqlite":
+            database = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+        self.database = database or ""
+        self.memory = {}
+        self.last_status = None
+
+    @property
+    def names(self):
+        return list(self.queries)
+
+    def _key(self, name):
+        sql = self.queries[name]
+        return hashlib.blake2b(json.dumps([self.database, name, sql]).encode(), digest_size=8).hexdigest()
+
+    def _meta_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.{self._key(name)}.json")
+
+    def _versions(self, name):
+        return versions.current(self.conn.cursor(), source_tables(self.queries[name]))
+
+    def _load(self, name, stamp):
+        if not self.cache_dir:
+            return None
+        meta = _read_json(self._meta_path(name))
+        if not meta or meta["versions"] != stamp:
+            return None
+        try:
+            from pyarrow import feather
+            return feather.read_feather(os.path.join(self.cache_dir, meta["data"]))
+        except (ImportError, OSError):
+            return None
+
+    def _store(self, name, stamp, frame):
+        if not self.cache_dir:
+            return
+        try:
+            from pyarrow import feather
+        except ImportError:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path = self._meta_path(name)
+        tag = hashlib.blake2b(json.dumps(stamp, sort_keys=True).encode(), digest_size=8).hexdigest()
+        data_path = f"{meta_path[:-len('.json')]}.{tag}.arrow"
+        old = _read_json(meta_path)
+        feather.write_feather(frame.reset_index(drop=True), data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"versions": stamp, "data": os.path.basename(data_path)}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        if old and old.get("data") != os.path.basename(data_path):
+            try:
+                os.remove(os.path.join(self.cache_dir, old["data"]))
+            except OSError:
+                pass
+
+    def run(self, name):
+        """The result of report ``name`` as a DataFrame, from the cache while its tables are unchanged.
+
+        ``last_status`` tells where it came from: "memory", "disk" or "computed".
+        """
+        if name not in self.queries:
+            raise KeyError(f"unknown report '{name}'; known: {', '.join(self.queries)}")
+        stamp = self._versions(name)
+        cached = self.memory.get(name)
+        if cached is not None and cached[0] == stamp:
+            self.last_status = "memory"
+            return cached[1].copy()
+        frame = self._load(name, stamp)
+        self.last_status = "disk"
+        if frame is None:
+            frame = pd.read_sql_query(self.queries[name], self.conn)
+            self._store(name, stamp, frame)
+            self.last_status = "computed"
+        self.memory[name] = (stamp, frame)
+        return frame.copy()
+
+    def invalidate(self, name=None):
+        """Forget the in-memory result of ``name`` (default: every report)."""
+        if name is None:
+            self.memory.clear()
+        else:
+            self.memory.pop(name, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SQL_analysis.sql reports by name, with cached results.")
+    parser.add_argument("reports", nargs="*", help="report names (default: all)")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=QUERY_CACHE_DIR, help="result cache (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1, help="run each report this many times")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db)
+    reports = Analytics(conn, cache_dir=args.cache_dir or None)
+    for name in args.reports or reports.names:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            try:
+                result = reports.run(name)
+            except Exception as e:
+                print(f"{name:<28} ❌ {e}")
+                break
+            print(f"{name:<28} {(time.perf_counter() - start) * 1000:>8.1f} ms  {len(result):>5} rows  "
+                  f"{reports.last_status}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Patient cohorts by diagnosis, answered from compressed bitsets.
+
+"Patients with more than one chronic disease" and questions like "Diabetes
+AND Hypertension but NOT Asthma" would otherwise group or self-join the
+diagnoses on every run.  ``CohortIndex`` keeps one ``Bitset`` of patient ids
+per diagnosis, and evaluates cohort expressions by combining them:
+
+    index = CohortIndex.load(db.connect())
+    index.count('Diabetes AND Hypertension AND NOT Asthma')
+    index.morbidity()          # patients by number of chronic diseases
+
+The schema has no table linking patients to chronic diseases, so a
+patient's diseases are the diagnoses of their medical records; the
+diagnoses named in ChronicDiseases count as chronic.  ``load`` keeps the
+index in a file (``INDEX_PATH``) and builds it again for another database or
+when the version of Medical_Records, Patients or ChronicDiseases
+(``care_stat.versions``) has moved; ``add`` folds in newly inserted records
+without a rebuild.
+
+Only uppercase ``AND``, ``OR`` and ``NOT`` are operators, so a diagnosis such
+as "Heart and Lung Disease" can be written as it is; names are matched
+case-insensitively, and may also be quoted.
+
+    python -m care_stat.cohorts 'Diabetes AND (Hypertension OR Asthma) AND NOT Flu'
+    python -m care_stat.cohorts --morbidity
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from care_stat import db, versions
+
+INDEX_PATH = os.environ.get("CARE_STAT_COHORT_INDEX", os.path.join(db.ROOT_DIR, ".care_stat_cohorts.npz"))
+SOURCE_TABLES = ("Medical_Records", "Patients", "ChronicDiseases")
+
+# Ids share a container per high 16 bits.  A container holding at most
+# ARRAY_MAX ids is a sorted uint16 array, a fuller one a 65536-bit bitmap
+# (8 KB, the size of ARRAY_MAX ids).
+ARRAY_MAX = 4096
+BITMAP_WORDS = 1 << 10
+
+
+def _to_bitmap(container):
+    if container.dtype == np.uint64:
+        return container
+    bits = np.zeros(BITMAP_WORDS * 64, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _to_array(bitmap):
+    bits = np.unpackbits(bitmap.view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _size(container):
+    return int(np.bitwise_count(container).sum()) if container.dtype == np.uint64 else len(container)
+
+
+def _compact(container):
+    """``container`` in its smaller form, or None when empty."""
+    if container.dtype == np.uint64:
+        n = _size(container)
+        if n == 0:
+            return None
+        return _to_array(container) if n <= ARRAY_MAX else container
+    if len(container) == 0:
+        return None
+    return _to_bitmap(container) if len(container) > ARRAY_MAX else container
+
+
+class Bitset:
+    """Compressed set of non-negative 32-bit ids (a roaring bitmap in numpy)."""
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        ids = np.sort(np.asarray(ids, dtype=np.int64))
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))] if len(ids) else ids
+        if len(ids) and (ids[0] < 0 or ids[-1] >= 1 << 32):
+            raise ValueError("ids must be between 0 and 2**32 - 1")
+        ids = ids.astype(np.uint32)
+        high = ids >> 16
+        keys, starts = np.unique(high, return_index=True)
+        bounds = list(starts[1:]) + [len(ids)]
+        containers = {}
+        for key, start, stop in zip(keys, starts, bounds):
+            containers[int(key)] = _compact((ids[start:stop] & 0xFFFF).astype(np.uint16))
+        return cls(containers)
+
+    def ids(self):
+        parts = [(np.uint32(key) << 16) | (_to_array(c) if c.dtype == np.uint64 else c).astype(np.uint32)
+                 for key, c in sorted(self.containers.items())]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+    def __len__(self):
+        return sum(_size(c) for c in self.containers.values())
+
+    def __contains__(self, value):
+        container = self.containers.get(int(value) >> 16)
+        if container is None:
+            return False
+        low = int(value) & 0xFFFF
+        if container.dtype == np.uint64:
+            return bool(container[low >> 6] >> np.uint64(low & 63) & np.uint64(1))
+        i = np.searchsorted(container, low)
+        return i < len(container) and container[i] == low
+
+    def _combine(self, other, keys, arrays, bitmaps):
+        out = {}
+        for key in keys:
+            a, b = self.containers.get(key), other.containers.get(key)
+            if a is None or b is None:
+                merged = arrays(a, b)
+            elif a.dtype == np.uint16 and b.dtype == np.uint16:
+                merged = arrays(a, b)
+            else:
+                merged = bitmaps(_to_bitmap(a), _to_bitmap(b))
+            merged = None if merged is None else _compact(merged)
+            if merged is not None:
+                out[key] = merged
+        return Bitset(out)
+
+    def __and__(self, other):
+        return self._combine(
+            other, self.containers.keys() & other.containers.keys(),
+            lambda a, b: np.intersect1d(a, b, assume_unique=True), np.bitwise_and)
+
+    def __or__(self, other):
+        return self._combine(
+            other, self.containers.keys() | other.containers.keys(),
+            lambda a, b: a if b is None else b if a is None else np.union1d(a, b), np.bitwise_or)
+
+    def __sub__(self, other):
+        return self._combine(
+            other, self.containers.keys(),
+            lambda a, b: a if b is None else np.setdiff1d(a, b, assume_unique=True),
+            lambda a, b: a & ~b)
+
+    def nbytes(self):
+        return sum(c.nbytes for c in self.containers.values())
+
+
+# === Cohort expressions ===
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|\b(AND|OR|NOT)\b|'([^']*)'|\"([^\"]*)\"|([^\s()'\"]+))")
+
+
+def _tokens(expression):
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"cannot read the cohort expression at '{expression[pos:]}'")
+        opening, closing, op, single, double, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif op:
+            tokens.append(op)
+        else:
+            tokens.append(("name", single if single is not None else double if double is not None else word))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """expr := term (OR term)*;  term := factor (AND factor)*;  factor := NOT factor | ( expr ) | name.
+
+    Unquoted names may span several words ("Heart Disease").
+    """
+
+    def __init__(self, tokens, lookup):
+        self.tokens, self.pos, self.lookup = tokens, 0, lookup
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse(self):
+        result = self._expr()
+        if self._peek() is not None:
+            raise ValueError(f"unexpected '{self._peek()}' in the cohort expression")
+        return result
+
+    def _expr(self):
+        result = self._term()
+        while self._peek() == "OR":
+            self.pos += 1
+            result = result | self._term()
+        return result
+
+    def _term(self):
+        result = self._factor()
+        while self._peek() == "AND":
+            self.pos += 1
+            result = result & self._factor()
+        return result
+
+    def _factor(self):
+        token = self._peek()
+        self.pos += 1
+        if token == "NOT":
+            return self.lookup(None) - self._factor()
+        if token == "(":
+            result = self._expr()
+            if self._peek() != ")":
+                raise ValueError("missing ')' in the cohort expression")
+            self.pos += 1
+            return result
+        if isinstance(token, tuple):
+            words = [token[1]]
+            while isinstance(self._peek(), tuple):
+                words.append(self._peek()[1])
+                self.pos += 1
+            return self.lookup(" ".join(words))
+        raise ValueError(f"expected a diagnosis, NOT or '(' but found {token or 'the end'}")
+
+
+def _stamp(conn):
+    """What a saved index was built from: the database file and its source tables' versions."""
+    database = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+    return {"database": database, "versions": versions.current(conn.cursor(), SOURCE_TABLES)}
+
+
+class CohortIndex:
+    """One patient ``Bitset`` per diagnosis, plus every patient for NOT."""
+
+    def __init__(self, diagnoses=None, patients=None, chronic=(), stamp=None):
+        self.diagnoses = diagnoses or {}
+        self.patients = patients or Bitset()
+        self.chronic = sorted(chronic)
+        self.stamp = stamp or {}
+
+    @classmethod
+    def build(cls, conn):
+        """Build the index from the database behind ``conn``."""
+        stamp = _stamp(conn)
+        pairs = pd.read_sql_query(
+            "SELECT DISTINCT diagnosis, patient_id FROM Medical_Records WHERE diagnosis IS NOT NULL", conn)
+        patients = pd.read_sql_query("SELECT patient_id FROM Patients", conn)["patient_id"]
+        chronic = pd.read_sql_query("SELECT DISTINCT disease_name FROM ChronicDiseases", conn)["disease_name"]
+        index = cls(patients=Bitset.from_ids(patients), chronic=chronic, stamp=stamp)
+        index.add(pairs)
+        return index
+
+    def add(self, records):
+        """Fold medical ``records`` (with ``diagnosis`` and ``patient_id``) into the index."""
+        records = records[["diagnosis", "patient_id"]].dropna()
+        for diagnosis, ids in records.groupby("diagnosis")["patient_id"]:
+            new = Bitset.from_ids(ids.to_numpy())
+            self.diagnoses[diagnosis] = self.diagnoses[diagnosis] | new if diagnosis in self.diagnoses else new
+            self.patients = self.patients | new
+
+    def _lookup(self, name):
+        if name is None:
+            return self.patients
+        found = {key.lower(): bitset for key, bitset in self.diagnoses.items()}.get(name.lower())
+        if found is None:
+            if name.lower() in {c.lower() for c in self.chronic}:
+                return Bitset()
+            raise KeyError(f"unknown diagnosis '{name}'; known: {', '.join(sorted(self.diagnoses))}")
+        return found
+
+    def cohort(self, expression):
+        """The patients matching ``expression`` (diagnoses combined with AND, OR, NOT and parentheses)."""
+        return _Parser(_tokens(expression), self._lookup).parse()
+
+    def count(self, expression):
+        return len(self.cohort(expression))
+
+    def morbidity(self, diagnoses=None):
+        """Patients by how many of ``diagnoses`` (default: the chronic ones) they have, from 1 up."""
+        names = self.chronic if diagnoses is None else diagnoses
+        members = [self.diagnoses[name].ids() for name in names if name in self.diagnoses]
+        if not members:
+            return pd.Series(dtype="int64", name="patients").rename_axis("diseases")
+        per_patient = np.unique(np.concatenate(members), return_counts=True)[1]
+        counts = np.bincount(per_patient)
+        return pd.Series(counts[1:], index=pd.RangeIndex(1, len(counts), name="diseases"), name="patients")
+
+    # === Persistence ===
+
+    def save(self, path):
+        arrays, layout = {}, {}
+        for name, bitset in [("", self.patients)] + sorted(self.diagnoses.items()):
+            keys = sorted(bitset.containers)
+            layout[name] = keys
+            for i, key in enumerate(keys):
+                arrays[f"{len(layout) - 1}_{i}"] = bitset.containers[key]
+        meta = {"names": list(layout), "keys": list(layout.values()), "chronic": self.chronic, "stamp": self.stamp}
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, _meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def read(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data["_meta"].tobytes())
+            bitsets = [Bitset({key: data[f"{n}_{i}"] for i, key in enumerate(keys)})
+                       for n, keys in enumerate(meta["keys"])]
+        return cls(dict(zip(meta["names"][1:], bitsets[1:])), bitsets[0], meta["chronic"], meta["stamp"])
+
+    @classmethod
+    def load(cls, conn, path=INDEX_PATH):
+        """The index saved at ``path`` if the source tables are unchanged since, else a fresh build (saved)."""
+        stamp = _stamp(conn)
+        if path and os.path.exists(path):
+            try:
+                index = cls.read(path)
+            except (OSError, ValueError, KeyError):
+                index = None
+            if index is not None and index.stamp == stamp:
+                return index
+        index = cls.build(conn)
+        if path:
+            index.save(path)
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count patient cohorts by diagnosis from bitsets.")
+    parser.add_argument("expressions", nargs="*", help="e.g. 'Diabetes AND Hypertension AND NOT Asthma'; only uppercase AND, OR, NOT are operators")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--index", default=INDEX_PATH, help="saved index (default: %(default)s)")
+    parser.add_argument("--morbidity", action="store_true", help="patients by number of chronic diseases")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db)
+    start = time.perf_counter()
+    index = CohortIndex.load(conn, args.index)
+    conn.close()
+    size = sum(b.nbytes() for b in index.diagnoses.values())
+    print(f"✅ {len(index.diagnoses)} diagnoses over {len(index.patients):,} patients "
+          f"({size / 1024:.0f} KB of bitsets) ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for expression in args.expressions:
+        start = time.perf_counter()
+        try:
+            cohort = index.cohort(expression)
+        except (KeyError, ValueError) as e:
+            print(f"❌ {e}")
+            continue
+        sample = ", ".join(str(i) for i in cohort.ids()[:5])
+        print(f"{expression}: {len(cohort):,} patients ({(time.perf_counter() - start) * 1000:.2f} ms)"
+              + (f" e.g. {sample}" if sample else ""))
+    if args.morbidity:
+        start = time.perf_counter()
+        counts = index.morbidity()
+        print(f"\nPatients by number of chronic diseases ({', '.join(index.chronic)}), "
+              f"{(time.perf_counter() - start) * 1000:.2f} ms:")
+        print(counts.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Per-tab aggregates for the dashboard, computed from the in-memory Care_stat frame.
+
+Every data source exposes the same methods (``options``, ``date_bounds``,
+``overview``, ``treatment`` and ``financial``) and returns plain dicts of
+scalars and small DataFrames, so app.py renders the tabs the same way
+whichever source is used.
+"""
+import numpy as np
+import pandas as pd
+
+from care_stat.profiling import section
+from care_stat.summaries import box_summary, histogram
+
+# Columns of Care_stat.csv each tab reads; nothing else is parsed for that tab.
+TAB_COLUMNS = {
+    "overview": ["doctor_id", "salary", "department_name", "gender", "country"],
+    "treatment": ["patient_id", "disease_name", "severity_level", "prescription_cost", "equipment_name",
+                  "age_patient"],
+    "financial": ["payment_status", "method", "amount", "payment_date"],
+}
+
+# Columns each tab's selectboxes filter on.
+TAB_FILTERS = {
+    "overview": ["department_name", "gender", "country"],
+    "treatment": ["disease_name", "severity_level"],
+    "financial": ["payment_status", "method"],
+}
+# Column each tab's date range applies to.
+TAB_DATES = {"financial": "payment_date"}
+# Rows per piece when a tab's filtered rows are exported.
+EXPORT_CHUNK_ROWS = 100_000
+
+# Distinct-count KPIs that can come from HyperLogLog cubes instead of nunique():
+# tab -> (filter columns the cube is keyed by, columns it sketches).
+DISTINCT_CUBES = {
+    "overview": (["department_name", "gender", "country"], ["doctor_id"]),
+    "treatment": (["disease_name", "severity_level"], ["patient_id", "equipment_name"]),
+}
+# Mode and top-N KPIs that can come from Space-Saving cubes instead of value_counts():
+# tab -> (filter columns the cube is keyed by, columns whose frequent values it keeps).
+HEAVY_HITTER_CUBES = {
+    "treatment": (["disease_name", "severity_level"], ["disease_name"]),
+    "financial": (["payment_status", "method"], ["method"]),
+}
+# Revenue time series pre-rolled per day: tab -> (filter columns, date column, value column).
+REVENUE_ROLLUPS = {
+    "financial": (["payment_status", "method"], "payment_date", "amount"),
+}
+# Column each tab's stratified sample is stratified by (sampling mode only).
+SAMPLE_STRATA = {
+    "overview": "department_name",
+    "treatment": "disease_name",
+    "financial": "payment_status",
+}
+# Resolutions of the revenue chart, as pandas period frequencies.
+GRAINS = {"day": "D", "week": "W-SUN", "month": "M"}
+
+NUMERIC_COLUMNS = ["salary", "prescription_cost", "amount", "num_staff",
+                   "years_of_experience", "age", "age_patient", "visits_count"]
+DATE_COLUMNS = ["appointment_date", "record_date", "payment_date", "visit_date"]
+# Low-cardinality text columns are stored dictionary-encoded (category): the
+# shared frame shrinks several times over and filters compare small codes.
+CATEGORY_COLUMNS = ["department_name", "gender", "country", "disease_name", "severity_level",
+                    "equipment_name", "payment_status", "method", "month_year"]
+
+
+def prepare_frame(df):
+    """Type the raw Care_stat columns and derive ``month_year`` from ``payment_date``."""
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    if "payment_date" in df.columns:
+        df["month_year"] = df["payment_date"].dropna().dt.to_period("M").astype(str)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    return df
+
+
+def filter_frame(df, filters):
+    """Return the rows of ``df`` matching every filter whose value is not "All"."""
+    with section("filter"):
+        mask = None
+        for col, value in filters.items():
+            if value is None or value == "All":
+                continue
+            cond = df[col] == value
+            mask = cond if mask is None else mask & cond
+        return df if mask is None else df[mask]
+
+
+def filter_dates(df, column, dates):
+    """Rows whose ``column`` falls within the inclusive ``(start, end)`` date range."""
+    if not dates:
+        return df
+    with section("filter"):
+        start, end = pd.Timestamp(dates[0]), pd.Timestamp(dates[1]) + pd.Timedelta(days=1)
+        return df[(df[column] >= start) & (df[column] < end)]
+
+
+def time_series(df, date, value, grain):
+    """``value`` summed per ``grain`` bucket of ``date``, labelled like ``RevenueRollup.series``."""
+    with section("groupby"):
+        dated = df[df[date].notna()]
+        if dated.empty:
+            return None
+        periods = dated[date].dt.to_period(GRAINS[grain])
+        totals = dated.groupby(periods)[value].sum()
+        labels = totals.index.strftime("%Y-%m") if grain == "month" else totals.index.start_time.strftime("%Y-%m-%d")
+        return pd.DataFrame({"period": labels.to_numpy(), value: totals.to_numpy()})
+
+
+def count_by(series, name):
+    """``value_counts`` as a two-column frame (``name``, ``count``)."""
+    with section("value_counts"):
+        counts = series.value_counts()
+        # Categorical columns also report categories that no row uses.
+        counts = counts[counts > 0]
+        return pd.DataFrame({name: counts.index.to_numpy(), "count": counts.to_numpy()})
+
+
+def group_agg(df, by, col, how):
+    """``df.groupby(by)[col].<how>()`` as a two-column frame."""
+    with section("groupby"):
+        return df.groupby(by, observed=True)[col].agg(how).reset_index()
+
+
+def weighted_count_by(df, name):
+    """``count_by`` over a stratified sample: each row counts as its ``_weight``."""
+    with section("value_counts"):
+        counts = df.groupby(name, observed=True)["_weight"].sum().sort_values(ascending=False)
+        return pd.DataFrame({name: counts.index.to_numpy(), "count": counts.round().astype("int64").to_numpy()})
+
+
+def weighted_group_mean(df, by, col):
+    """Per-group mean of ``col`` over a stratified sample, with its standard error in ``error``."""
+    with section("groupby"):
+        df = df[df[col].notna()]
+        grouped = df.assign(_wx=df[col] * df["_weight"]).groupby(by, observed=True)
+        sums = grouped[["_wx", "_weight"]].sum()
+        spread = grouped[col].agg(["std", "count"])
+        return pd.DataFrame({
+            by: sums.index.to_numpy(),
+            col: (sums["_wx"] / sums["_weight"]).to_numpy(),
+            "error": (spread["std"] / np.sqrt(spread["count"])).fillna(0).to_numpy(),
+        })
+
+
+def top_value(counts, name):
+    """Most frequent value of a ``count_by`` frame; ties go to the smallest value, like ``Series.mode()[0]``."""
+    if counts.empty:
+        return None
+    top = counts[counts["count"] == counts["count"].max()]
+    return top[name].min()
+
+
+def _mean(series):
+    return None if series.empty else series.mean()
+
+
+class FrameSource:
+    """Answers the dashboard's queries from the denormalized Care_stat frame.
+
+    ``load`` takes a list of column names and returns a frame with (at least)
+    those columns; each tab asks only for its ``TAB_COLUMNS`` on first use.
+    A source lives for one rerun and keeps the frame it got for each tab, so
+    every query in that rerun sees the same version of the data.
+
+    ``cube``, if given, is called as ``cube(kind, tab)`` and returns that tab's
+    ``DistinctCube`` (kind "distinct"), ``HeavyHitterCube`` (kind "top"),
+    ``RevenueRollup`` (kind "revenue") or ``StratifiedSample`` (kind "sample"),
+    or ``None``.  When a cube is ready, the KPIs it covers are read from it
+    and the result's ``approx`` dict maps each estimated KPI to its relative
+    error; KPIs not listed there are exact.  With a ready sample, the
+    exploratory charts that no KPI depends on are drawn from the sample and
+    the result's ``sampled`` is its row count (otherwise None); KPIs always
+    come from the full data.  ``quantiles`` ("exact" or "tdigest") is how
+    box-plot quartiles are computed.
+    """
+
+    def __init__(self, load, cube=None, quantiles="exact"):
+        self.load = load
+        self.cube = cube
+        self.quantiles = quantiles
+        self._frames = {}
+
+    def frame(self, tab):
+        if tab not in self._frames:
+            self._frames[tab] = self.load(TAB_COLUMNS[tab])
+        return self._frames[tab]
+
+    def ready_cube(self, kind, tab):
+        cube = None if self.cube is None else self.cube(kind, tab)
+        return cube if cube is not None and cube.ready else None
+
+    def counts(self, tab, df, column, filters, approx, key, use_cube=True):
+        """``count_by(df[column])``, from the tab's heavy-hitter cube when it is ready."""
+        cube = self.ready_cube("top", tab) if use_cube else None
+        if cube is None:
+            return count_by(df[column], column)
+        with section("heavy_hitters"):
+            counts, error = cube.top(column, filters)
+        if error:
+            approx[key] = error
+        return counts
+
+    def sample(self, tab, filters):
+        """The tab's stratified sample restricted to ``filters``, or None outside sampling mode."""
+        sample = self.ready_cube("sample", tab)
+        return None if sample is None else filter_frame(sample.frame, filters)
+
+    def options(self, tab, column):
+        frame = self.frame(tab)
+        with section("options"):
+            return list(frame[column].dropna().unique())
+
+    def date_bounds(self, tab, column):
+        """First and last date in ``column`` as ``datetime.date``, or None without dates."""
+        frame = self.frame(tab)
+        rollup = self.ready_cube("revenue", tab)
+        if rollup is not None and rollup.date == column:
+            return rollup.bounds()
+        dates = frame[column].dropna()
+        return None if dates.empty else (dates.min().date(), dates.max().date())
+
+    def export_chunks(self, tab, filters, dates=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """The tab's rows matching ``filters`` and ``dates``, as frames of at most ``chunk_rows`` rows.
+
+        Each piece is filtered from a zero-copy slice of the cached frame, so the
+        selection is never held as one frame.  The first piece is yielded even
+        when empty, so the columns are always known.
+        """
+        frame = self.frame(tab)
+        columns = [col for col in TAB_COLUMNS[tab] if col in frame.columns]
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            chunk = filter_frame(frame.iloc[start:start + chunk_rows], filters)
+            if tab in TAB_DATES:
+                chunk = filter_dates(chunk, TAB_DATES[tab], dates)
+            if start == 0 or len(chunk):
+                yield chunk[columns]
+
+    def overview(self, filters):
+        df = filter_frame(self.frame("overview"), filters)
+        cube = self.ready_cube("distinct", "overview")
+        approx = {}
+        with section("kpis"):
+            kpis = {
+                "avg_salary": _mean(df["salary"]),
+                "female_pct": None if df.empty else (df["gender"] == "female").mean() * 100,
+                "approx": approx,
+            }
+            if cube is None:
+                kpis.update(employees=df["doctor_id"].nunique(), departments=df["department_name"].nunique())
+            else:
+                # department_name is one of the cube's keys, so its count stays exact.
+                kpis.update(employees=cube.estimate("doctor_id", filters),
+                            departments=cube.distinct_dim("department_name", filters))
+                approx.update(employees=cube.relative_error)
+        sample = self.sample("overview", filters)
+        if sample is None:
+            charts = {
+                "dept_count": count_by(df["department_name"], "department_name"),
+                "gender_count": count_by(df["gender"], "gender"),
+                "salary_by_dept": group_agg(df, "department_name", "salary", "mean"),
+            }
+        else:
+            charts = {
+                "dept_count": weighted_count_by(sample, "department_name"),
+                "gender_count": weighted_count_by(sample, "gender"),
+                "salary_by_dept": weighted_group_mean(sample, "department_name", "salary"),
+            }
+        # Boxes are per department, the sample's stratum, so sampled rows need no weights.
+        charts_df = df if sample is None else sample
+        return {
+            **kpis,
+            **charts,
+            "salary_box": box_summary(charts_df, "department_name", "salary", method=self.quantiles),
+            "sampled": None if sample is None else len(sample),
+        }
+
+    def treatment(self, filters):
+        df = filter_frame(self.frame("treatment"), filters)
+        approx = {}
+        disease_count = self.counts("treatment", df, "disease_name", filters, approx, "top_disease")
+        cube = self.ready_cube("distinct", "treatment")
+        with section("kpis"):
+            kpis = {
+                "top_disease": top_value(disease_count, "disease_name"),
+                "avg_cost": _mean(df["prescription_cost"]),
+                "approx": approx,
+            }
+            if cube is None:
+                kpis.update(patients=df["patient_id"].nunique(), devices=df["equipment_name"].nunique())
+            else:
+                kpis.update(patients=cube.estimate("patient_id", filters),
+                            devices=cube.estimate("equipment_name", filters))
+                approx.update(patients=cube.relative_error, devices=cube.relative_error)
+        sample = self.sample("treatment", filters)
+        if sample is None:
+            charts = {
+                "severity_count": count_by(df["severity_level"], "severity_level"),
+                "cost_by_disease": group_agg(df, "disease_name", "prescription_cost", "mean"),
+            }
+        else:
+            charts = {
+                "severity_count": weighted_count_by(sample, "severity_level"),
+                "cost_by_disease": weighted_group_mean(sample, "disease_name", "prescription_cost"),
+            }
+        age_hist = None
+        if "age_patient" in df.columns:
+            age_hist = (histogram(df, "age_patient", by="severity_level") if sample is None
+                        else histogram(sample, "age_patient", by="severity_level", weights="_weight"))
+        return {
+            **kpis,
+            **charts,
+            "disease_count": disease_count,
+            "age_hist": age_hist,
+            "sampled": None if sample is None else len(sample),
+        }
+
+    def financial(self, filters, dates=None, grain="month"):
+        """Financial tab; ``dates`` is an inclusive (start, end) payment-date range, ``grain`` a ``GRAINS`` key."""
+        df = filter_frame(self.frame("financial"), filters)
+        approx = {}
+        rollup = self.ready_cube("revenue", "financial")
+        if rollup is not None:
+            with section("revenue_series"):
+                revenue_series = rollup.series(filters, *(dates or (None, None)), grain=grain)
+        # The heavy-hitter cube has no date axis, so a narrowed range is counted from the rows.
+        narrowed = dates is not None and tuple(dates) != self.date_bounds("financial", "payment_date")
+        df = filter_dates(df, "payment_date", dates if narrowed else None)
+        if rollup is None:
+            revenue_series = time_series(df, "payment_date", "amount", grain)
+        method_count = self.counts("financial", df, "method", filters, approx, "top_method", use_cube=not narrowed)
+        with section("kpis"):
+            kpis = {
+                "revenue": None if df.empty else df["amount"].sum(),
+                "avg_transaction": _mean(df["amount"]),
+                "completed_pct": None if df.empty else (df["payment_status"] == "completed").mean() * 100,
+                "top_method": top_value(method_count, "method"),
+                "approx": approx,
+            }
+        sample = self.sample("financial", filters)
+        if sample is not None:
+            sample = filter_dates(sample, "payment_date", dates if narrowed else None)
+        return {
+            **kpis,
+            "status_count": (count_by(df["payment_status"], "payment_status") if sample is None
+                             else weighted_count_by(sample, "payment_status")),
+            "method_count": method_count,
+            "revenue_series": revenue_series,
+            "sampled": None if sample is None else len(sample),
+        }
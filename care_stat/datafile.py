@@ -0,0 +1,291 @@
+"""Keeps the dashboard's copy of Care_stat.csv in step with the file on disk.
+
+``IncrementalCSV`` remembers how many bytes it has parsed and a hash of those
+bytes.  At most once per ``ttl`` seconds it compares size and mtime with the
+file: if the file only grew and the already-parsed prefix still hashes the
+same, just the new tail is parsed and appended; any other change triggers a
+full reload.
+
+With a ``snapshot_dir``, the typed frame from every full parse is also saved
+there as an uncompressed Arrow file named after the hash of the bytes it was
+parsed from.  After a restart that file is memory-mapped instead of parsing
+the CSV again, and the usual checks then decide whether the snapshot is still
+current, needs the new tail appended, or must be replaced by a full reload.
+
+One ``IncrementalCSV`` is shared by every session.  Its ``frame`` is never
+modified in place: a refresh builds a new frame and swaps the reference, and
+``view()`` hands each caller a zero-copy, copy-on-write view, so a session can
+neither see a half-applied refresh nor change the data other sessions read.
+
+A ``.parquet`` path (what ``python -m care_stat.widetable`` writes by
+default) is read with pyarrow instead.  Parquet files are rewritten rather
+than appended to and are already columnar, so any change to size or mtime
+reloads the requested columns in full and no snapshot is kept.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+READ_CSV_OPTIONS = {"on_bad_lines": "skip", "encoding": "utf-8"}
+HASH_CHUNK = 1 << 20
+# Bump when the snapshot layout changes, or when prepare_frame starts typing
+# columns differently, so old snapshots are ignored.
+SNAPSHOT_FORMAT = 1
+
+
+class _HashingReader:
+    """File-like view of the first ``limit`` bytes of ``f`` that hashes what it hands out."""
+
+    def __init__(self, f, limit, digest):
+        self.f = f
+        self.remaining = limit
+        self.digest = digest
+
+    def read(self, n=-1):
+        if n is None or n < 0 or n > self.remaining:
+            n = self.remaining
+        data = self.f.read(n)
+        self.remaining -= len(data)
+        self.digest.update(data)
+        return data
+
+
+def _complete_lines_end(f, size):
+    """Offset just past the last newline in the first ``size`` bytes of ``f``.
+
+    A writer may be half-way through appending a row; that row is left for the
+    next refresh instead of being parsed twice.
+    """
+    pos = size
+    while pos > 0:
+        start = max(0, pos - HASH_CHUNK)
+        f.seek(start)
+        chunk = f.read(pos - start)
+        idx = chunk.rfind(b"\n")
+        if idx != -1:
+            return start + idx + 1
+        pos = start
+    return 0
+
+
+def _hash_prefix(f, length):
+    digest = hashlib.blake2b()
+    f.seek(0)
+    remaining = length
+    while remaining > 0:
+        data = f.read(min(HASH_CHUNK, remaining))
+        if not data:
+            break
+        digest.update(data)
+        remaining -= len(data)
+    return digest
+
+
+def _append_rows(frame, new_rows):
+    """``pd.concat`` that keeps categorical columns categorical when the tail brings new values."""
+    old_cols, new_cols = {}, {}
+    for col in frame.columns:
+        old, new = frame[col].dtype, new_rows[col].dtype if col in new_rows else None
+        if isinstance(old, pd.CategoricalDtype) and isinstance(new, pd.CategoricalDtype) and old != new:
+            categories = old.categories.append(new.categories.difference(old.categories))
+            old_cols[col] = frame[col].cat.set_categories(categories)
+            new_cols[col] = new_rows[col].cat.set_categories(categories)
+    if old_cols:
+        frame = frame.assign(**old_cols)
+        new_rows = new_rows.assign(**new_cols)
+    return pd.concat([frame, new_rows])
+
+
+class IncrementalCSV:
+    """A CSV file parsed into a DataFrame that follows appends without re-parsing.
+
+    ``columns`` restricts parsing to those columns (``None`` reads all of them)
+    and ``prepare`` post-processes every parsed piece, the full file and each
+    appended tail alike.  Functions added to ``listeners`` are called as
+    ``listener(frame, new_rows)`` after every change, with ``new_rows=None``
+    after a full reload, so derived aggregates can be kept in step.
+    ``snapshot_dir`` enables the Arrow snapshots described above.
+    """
+
+    def __init__(self, path, columns=None, prepare=None, ttl=60.0, snapshot_dir=None):
+        self.path = path
+        self.columns = None if columns is None else set(columns)
+        self.prepare = prepare or (lambda df: df)
+        self.ttl = ttl
+        self.snapshot_dir = snapshot_dir
+        self.listeners = []
+        self.frame = None
+        self.header = None
+        self.offset = 0
+        self.size = None
+        self.mtime = None
+        self.digest = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def view(self):
+        """The current frame as a shallow copy: shares every buffer, copies on write."""
+        frame = self.frame
+        return None if frame is None else frame.copy(deep=False)
+
+    def add_listener(self, listener):
+        """Register ``listener`` and, if data is already loaded, replay it as a full reload."""
+        with self._lock:
+            self.listeners.append(listener)
+            if self.frame is not None:
+                listener(self.frame, None)
+
+    def _usecols(self):
+        if self.columns is None:
+            return None
+        return lambda col: col in self.columns
+
+    def refresh(self, force=False):
+        """Bring ``frame`` up to date.
+
+        Returns "unchanged", "appended", "reloaded", "skipped", or "restored"
+        when a cold start was served from an up-to-date snapshot.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.frame is not None and not force and now - self.checked_at < self.ttl:
+                return "skipped"
+            self.checked_at = now
+
+            stat = os.stat(self.path)
+            if self.path.endswith(".parquet"):
+                return self._refresh_parquet(stat)
+            restored = self.frame is None and self._restore_snapshot()
+            if self.frame is not None and stat.st_size == self.size and stat.st_mtime_ns == self.mtime:
+                return "restored" if restored else "unchanged"
+
+            with open(self.path, "rb") as f:
+                status = "reloaded"
+                if self.frame is not None and stat.st_size >= self.offset:
+                    prefix = _hash_prefix(f, self.offset)
+                    if prefix.hexdigest() == self.digest:
+                        status = self._append_tail(f, stat.st_size, prefix)
+                        if restored and status == "unchanged":
+                            status = "restored"
+                if status == "reloaded":
+                    self._load_all(f, stat.st_size)
+
+            self.size = stat.st_size
+            self.mtime = stat.st_mtime_ns
+            if status == "reloaded":
+                self._write_snapshot()
+            return status
+
+    def _load_all(self, f, size):
+        end = _complete_lines_end(f, size)
+        f.seek(0)
+        reader = _HashingReader(f, end, hashlib.blake2b())
+        df = pd.read_csv(reader, header=0, usecols=self._usecols(), **READ_CSV_OPTIONS)
+        f.seek(0)
+        self.header = pd.read_csv(io.BytesIO(f.readline()), header=0, nrows=0).columns.tolist()
+        self.frame = self.prepare(df)
+        self.offset = end
+        self.digest = reader.digest.hexdigest()
+        for listener in self.listeners:
+            listener(self.frame, None)
+
+    def _refresh_parquet(self, stat):
+        if self.frame is not None and stat.st_size == self.size and stat.st_mtime_ns == self.mtime:
+            return "unchanged"
+        from pyarrow import parquet
+        names = parquet.read_schema(self.path).names
+        columns = None if self.columns is None else [col for col in names if col in self.columns]
+        self.frame = self.prepare(pd.read_parquet(self.path, columns=columns))
+        self.header = names
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        for listener in self.listeners:
+            listener(self.frame, None)
+        return "reloaded"
+
+    def _append_tail(self, f, size, digest):
+        end = _complete_lines_end(f, size)
+        if end <= self.offset:
+            return "unchanged"
+        f.seek(self.offset)
+        tail = f.read(end - self.offset)
+        new_rows = pd.read_csv(io.BytesIO(tail), header=None, names=self.header,
+                               usecols=self._usecols(), **READ_CSV_OPTIONS)
+        new_rows = self.prepare(new_rows)
+        new_rows.index = pd.RangeIndex(len(self.frame), len(self.frame) + len(new_rows))
+        self.frame = _append_rows(self.frame, new_rows)
+        digest.update(tail)
+        self.digest = digest.hexdigest()
+        self.offset = end
+        for listener in self.listeners:
+            listener(self.frame, new_rows)
+        return "appended"
+
+    # === Snapshots ===
+
+    def _snapshot_meta_path(self):
+        columns = None if self.columns is None else sorted(self.columns)
+        prepare = f"{self.prepare.__module__}.{self.prepare.__qualname__}"
+        key = json.dumps([os.path.abspath(self.path), columns, prepare, SNAPSHOT_FORMAT])
+        tag = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.snapshot_dir, f"{os.path.basename(self.path)}.{tag}.json")
+
+    def _write_snapshot(self):
+        if not self.snapshot_dir:
+            return
+        try:
+            from pyarrow import feather
+        except ImportError:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        meta_path = self._snapshot_meta_path()
+        data_path = f"{meta_path[:-len('.json')]}.{self.digest[:16]}.arrow"
+        meta = {"data": os.path.basename(data_path), "header": self.header, "offset": self.offset,
+                "digest": self.digest, "size": self.size, "mtime": self.mtime}
+        old = _read_json(meta_path)
+        # Write to temporary names first so a crash never leaves a torn snapshot.
+        feather.write_feather(self.frame.reset_index(drop=True), data_path + ".tmp", compression="uncompressed")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        if old and old.get("data") != meta["data"]:
+            try:
+                os.remove(os.path.join(self.snapshot_dir, old["data"]))
+            except OSError:
+                pass
+
+    def _restore_snapshot(self):
+        """Load the last snapshot's frame and parse state; the caller then checks it against the file."""
+        if not self.snapshot_dir:
+            return False
+        meta = _read_json(self._snapshot_meta_path())
+        if not meta:
+            return False
+        try:
+            from pyarrow import feather
+            table = feather.read_table(os.path.join(self.snapshot_dir, meta["data"]), memory_map=True)
+        except (ImportError, OSError):
+            return False
+        self.frame = table.to_pandas(split_blocks=True, self_destruct=True)
+        self.header = meta["header"]
+        self.offset = meta["offset"]
+        self.digest = meta["digest"]
+        self.size = meta["size"]
+        self.mtime = meta["mtime"]
+        for listener in self.listeners:
+            listener(self.frame, None)
+        return True
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
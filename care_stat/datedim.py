@@ -0,0 +1,96 @@
+"""Integer date keys: the Dates dimension and the month_key columns.
+
+Grouping on ``YEAR(payment_date), MONTH(payment_date)`` (or SQLite's
+``strftime``) evaluates a function on every row and cannot use an index on
+the date.  Instead Payments, Visits, Appointments and Medical_Records carry a
+``month_key`` column (yyyymm) that the loaders fill in as they insert, and
+the Dates table (Database/Dates_data.sql) has one row per calendar day keyed
+by ``date_key`` (yyyymmdd) with its month, quarter and week.  Time-series
+reports group on ``month_key`` and range-scan its index; reports that need
+other calendar attributes join Dates on the key.
+
+The loaders call ``add_month_key`` on their rows and ``ensure`` with their
+dates before committing, like ``care_stat.rollups.apply``.  The SQL is plain
+``?``-parameterized SQL for SQL Server (pyodbc) and SQLite alike.
+"""
+import pandas as pd
+
+# Table -> the date its month_key is taken from.
+MONTH_KEY_SOURCES = {
+    "Appointments": "appointment_date",
+    "Medical_Records": "record_date",
+    "Visits": "visit_date",
+    "Payments": "payment_date",
+}
+DATE_COLUMNS = ["date_key", "full_date", "year", "quarter", "month", "month_key", "day",
+                "day_of_week", "week_start_key"]
+
+
+def date_key(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def month_key(day):
+    return day.year * 100 + day.month
+
+
+def month_keys(dates):
+    """yyyymm of each value in ``dates`` (anything ``pd.to_datetime`` reads); missing stays missing."""
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    return (dates.dt.year * 100 + dates.dt.month).astype("Int64")
+
+
+def add_month_key(table, df):
+    """``df`` with the ``month_key`` of ``table``'s date column, if ``table`` has one."""
+    if table not in MONTH_KEY_SOURCES or MONTH_KEY_SOURCES[table] not in df.columns:
+        return df
+    return df.assign(month_key=month_keys(df[MONTH_KEY_SOURCES[table]]).to_numpy())
+
+
+def calendar(start, end):
+    """Rows of the Dates table for every day from ``start`` to ``end``, inclusive."""
+    days = pd.date_range(start, end, freq="D")
+    weeks = days - pd.to_timedelta(days.dayofweek, unit="D")
+    return pd.DataFrame({
+        "date_key": days.year * 10000 + days.month * 100 + days.day,
+        "full_date": days.strftime("%Y-%m-%d"),
+        "year": days.year,
+        "quarter": days.quarter,
+        "month": days.month,
+        "month_key": days.year * 100 + days.month,
+        "day": days.day,
+        # ISO numbering: 1 is Monday, the day the dashboard's weeks start on.
+        "day_of_week": days.dayofweek + 1,
+        "week_start_key": weeks.year * 10000 + weeks.month * 100 + weeks.day,
+    })
+
+
+def _day(key):
+    return pd.Timestamp(year=key // 10000, month=key // 100 % 100, day=key % 100).date()
+
+
+def ensure(cursor, dates):
+    """Extend Dates to cover ``dates`` without gaps; the caller commits.
+
+    Adds every missing day between the earliest and latest of ``dates`` and
+    the days already in the table.  Returns the number of rows added.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce").dropna()
+    if dates.empty:
+        return 0
+    start, end = dates.min().date(), dates.max().date()
+    cursor.execute("SELECT MIN(date_key), MAX(date_key) FROM Dates")
+    low, high = cursor.fetchone()
+    if low is not None:
+        start, end = min(start, _day(low)), max(end, _day(high))
+    cursor.execute("SELECT date_key FROM Dates WHERE date_key BETWEEN ? AND ?", (date_key(start), date_key(end)))
+    known = {row[0] for row in cursor.fetchall()}
+    rows = calendar(start, end)
+    rows = rows[~rows["date_key"].isin(known)]
+    if not rows.empty:
+        cursor.executemany(
+            f"INSERT INTO Dates ({', '.join(DATE_COLUMNS)}) VALUES ({', '.join('?' * len(DATE_COLUMNS))})",
+            [tuple(v.item() if hasattr(v, "item") else v for v in row)
+             for row in rows.itertuples(index=False, name=None)],
+        )
+    return len(rows)
@@ -0,0 +1,680 @@
+"""Local SQLite copy of the Care_Stat schema and the dashboard's query-pushdown source.
+
+The tables are created from the SQL Server scripts in Database/*.sql, translated
+to SQLite on the fly, so the two never drift apart.  ``SQLiteSource`` answers the
+dashboard's filters and group-bys with parameterized SQL, and only the aggregated
+results are turned into DataFrames.
+
+Build a local database from the Dataset CSV files with::
+
+    python -m care_stat.db --init
+"""
+import argparse
+import contextlib
+import datetime
+import functools
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from care_stat import datedim, partitions, rollups, versions
+from care_stat.dashboard import EXPORT_CHUNK_ROWS, TAB_COLUMNS, TAB_DATES
+from care_stat.profiling import section
+from care_stat.summaries import MAX_OUTLIERS, QUARTILES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_DIR = os.path.join(ROOT_DIR, "Database")
+CSV_DIR = os.path.join(ROOT_DIR, "Dataset CSV")
+DB_PATH = os.environ.get("CARE_STAT_DB", os.path.join(ROOT_DIR, "Care_Stat.db"))
+# In WAL mode readers keep reading the last committed snapshot while a loader
+# writes, instead of waiting for it; CARE_STAT_JOURNAL_MODE=delete switches
+# back to SQLite's rollback journal.
+JOURNAL_MODE = os.environ.get("CARE_STAT_JOURNAL_MODE", "wal")
+# How long a connection waits for another one's lock before giving up.
+BUSY_TIMEOUT_S = 10.0
+INSERT_CHUNK_ROWS = 50_000
+
+# Referenced tables come before the tables that point at them.
+SCHEMA_FILES = [
+    "Dates_data.sql",
+    "Patients_data.sql",
+    "Doctors_data.sql",
+    "Departments_data.sql",
+    "Chronic_Diseases_data.sql",
+    "Appointments_data.sql",
+    "Medical_Records_data.sql",
+    "Visits_data.sql",
+    "Payments_data.sql",
+    "Doctor_Department_data.sql",
+    "Doctor_Phones_data.sql",
+    "Doctor_Workplaces_data.sql",
+    "Patient_Phones_data.sql",
+    "Department_Equipment_data.sql",
+    "Report_Summaries_data.sql",
+    "Table_Versions_data.sql",
+]
+
+# Access paths used by the dashboard filters.  Foreign-key and date indexes,
+# which also serve the joins behind CareStatWide, are declared with their
+# tables in Database/*.sql.
+DASHBOARD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS IX_Departments_name ON Departments(department_name)",
+    "CREATE INDEX IF NOT EXISTS IX_Doctors_gender ON Doctors(gender)",
+    "CREATE INDEX IF NOT EXISTS IX_Patients_country ON Patients(country)",
+    "CREATE INDEX IF NOT EXISTS IX_MedicalRecords_diagnosis ON Medical_Records(diagnosis, severity_level)",
+    "CREATE INDEX IF NOT EXISTS IX_Payments_status_method ON Payments(payment_status, method, amount)",
+]
+
+# Indexes once declared in Database/*.sql and since merged into another one,
+# by table: create_indexes drops them from existing databases.
+RETIRED_INDEXES = {"IX_Visits_patient_month": "Visits"}
+
+# One row per medical record with its doctor, department and patient, matching
+# the column names of the denormalized Care_stat.csv.
+WIDE_VIEW = """
+CREATE VIEW IF NOT EXISTS CareStatWide AS
+SELECT
+    mr.record_id,
+    mr.patient_id,
+    mr.doctor_id,
+    mr.department_id,
+    d.gender,
+    d.salary,
+    d.years_of_experience,
+    d.age,
+    dep.department_name,
+    dep.num_staff,
+    p.country,
+    p.age AS age_patient,
+    p.visits_count,
+    mr.diagnosis AS disease_name,
+    mr.severity_level,
+    mr.prescription_cost,
+    mr.record_date
+FROM Medical_Records mr
+JOIN Doctors d ON d.doctor_id = mr.doctor_id
+JOIN Departments dep ON dep.department_id = mr.department_id
+JOIN Patients p ON p.patient_id = mr.patient_id
+"""
+
+# Columns each tab may filter on; anything else is rejected before it reaches SQL.
+FILTER_COLUMNS = {
+    "CareStatWide": {"department_name", "gender", "country", "disease_name", "severity_level"},
+    "Payments": {"payment_status", "method"},
+}
+
+# Relation each tab's rows are exported from.
+EXPORT_RELATIONS = {"overview": "CareStatWide", "treatment": "CareStatWide", "financial": "Payments"}
+
+
+def tsql_to_sqlite(sql):
+    """Translate one of the Database/*.sql scripts into statements SQLite accepts."""
+    sql = sql.replace("\xa0", " ")
+    sql = re.sub(r"^\s*(USE\s+\w+;?|GO|CREATE\s+DATABASE\s+\w+;?)\s*$", "", sql, flags=re.IGNORECASE | re.MULTILINE)
+    sql = re.sub(r"\bN'", "'", sql)
+    sql = re.sub(r"\bGETDATE\(\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bLEN\(", "LENGTH(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"NOT\s+LIKE\s+'%\[\^0-9\]%'", "NOT GLOB '*[^0-9]*'", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"--[^\n]*", "", sql)
+    # SQLite has no INCLUDE columns; appending them to the key keeps the index covering.
+    sql = re.sub(r"\b(NON)?CLUSTERED\s+INDEX\b", "INDEX", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"(\bON\s+\w+\s*\([^)]*)\)\s*INCLUDE\s*\(([^)]*)\)", r"\1, \2)", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCREATE\s+(UNIQUE\s+)?INDEX\s+(?!IF\b)", r"CREATE \1INDEX IF NOT EXISTS ", sql, flags=re.IGNORECASE)
+    return [stmt.strip() for stmt in sql.split(";") if stmt.strip()]
+
+
+def _is_index(stmt):
+    return re.match(r"CREATE\s+(UNIQUE\s+)?INDEX\b", stmt, re.IGNORECASE) is not None
+
+
+def read_schema_file(name):
+    # The scripts were saved from SSMS and are not all valid UTF-8.
+    with open(os.path.join(SCHEMA_DIR, name), encoding="latin-1") as f:
+        return f.read()
+
+
+def connect(path=None, check_same_thread=True, journal_mode=None):
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=check_same_thread, timeout=BUSY_TIMEOUT_S)
+    conn.execute("PRAGMA foreign_keys = ON")
+    if journal_mode or JOURNAL_MODE:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode or JOURNAL_MODE}")
+    return conn
+
+
+def create_schema(conn, indexes=True):
+    """Create the Care_Stat tables, their indexes and the CareStatWide view if missing.
+
+    ``indexes=False`` creates the tables with only their primary and unique
+    keys; ``create_indexes`` adds the rest later.  Columns added to the
+    scripts after a table was created are added to it, and its month keys
+    (or DoctorVisits' specializations) filled in.  Returns the names of the tables created.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    created, altered = [], []
+    with conn:
+        for name in SCHEMA_FILES:
+            for stmt in tsql_to_sqlite(read_schema_file(name)):
+                target = re.match(r"(CREATE|ALTER)\s+TABLE\s+(\w+)(?:\s+ADD\s+(\w+))?", stmt, re.IGNORECASE)
+                if _is_index(stmt):
+                    continue
+                if target and target.group(2) in existing:
+                    # An existing table keeps its definition; only new columns are added.
+                    if target.group(1).upper() == "CREATE" or target.group(3) in _columns(conn, target.group(2)):
+                        continue
+                    altered.append(target.group(2))
+                    if partitions.is_partitioned(conn, target.group(2)):
+                        partitions.alter(conn, target.group(2), stmt)
+                        continue
+                conn.execute(stmt)
+                if target and target.group(1).upper() == "CREATE":
+                    created.append(target.group(2))
+        conn.execute(WIDE_VIEW)
+    backfill_month_keys(conn, [table for table in altered if table in datedim.MONTH_KEY_SOURCES])
+    if "DoctorVisits" in altered:
+        with conn:
+            rollups.fill_specializations(conn.cursor())
+    if indexes:
+        create_indexes(conn)
+    return created
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def backfill_month_keys(conn, tables=tuple(datedim.MONTH_KEY_SOURCES)):
+    """Fill ``month_key`` and the Dates rows for ``tables``' rows stored without them.
+
+    Partitioned tables are skipped: every row there was routed by its key.
+    """
+    with conn:
+        for table in tables:
+            if partitions.is_partitioned(conn, table):
+                continue
+            column = datedim.MONTH_KEY_SOURCES[table]
+            conn.execute(f"UPDATE {table} SET month_key = CAST(strftime('%Y%m', {column}) AS INTEGER)"
+                         " WHERE month_key IS NULL")
+            datedim.ensure(conn.cursor(), conn.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}").fetchone())
+
+
+def index_statements():
+    """Every secondary index: those in Database/*.sql, then ``DASHBOARD_INDEXES``."""
+    statements = [stmt for name in SCHEMA_FILES for stmt in tsql_to_sqlite(read_schema_file(name))
+                  if _is_index(stmt)]
+    return statements + DASHBOARD_INDEXES
+
+
+def create_indexes(conn):
+    """Create any missing secondary index, also on tables made before it was declared.
+
+    An index on a partitioned table goes on each of its partitions.  An
+    index now declared on other columns is rebuilt, and ``RETIRED_INDEXES``
+    are dropped.
+    """
+    with conn:
+        for name, table in RETIRED_INDEXES.items():
+            if partitions.is_partitioned(conn, table):
+                partitions.drop_index(conn, table, name)
+            else:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        for stmt in index_statements():
+            table = re.search(r"\bON\s+(\w+)\s*\(", stmt, re.IGNORECASE).group(1)
+            if partitions.is_partitioned(conn, table):
+                partitions.create_index(conn, table, stmt)
+                continue
+            name = re.search(r"\bINDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)", stmt, re.IGNORECASE).group(1)
+            stored = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+            if stored and partitions.index_columns(stored[0]) != partitions.index_columns(stmt):
+                conn.execute(f"DROP INDEX {name}")
+            conn.execute(stmt)
+
+
+def insert_frame(conn, table, df, chunk_rows=INSERT_CHUNK_ROWS):
+    """Insert ``df`` into ``table``, skipping rows that break a constraint.
+
+    Mirrors the loaders in "Python Scripts Entry", which log and skip bad rows
+    instead of aborting the whole load, and like them sets each row's
+    ``month_key``, adds new days to Dates (``care_stat.datedim``), folds the
+    inserted rows into the report summaries (``care_stat.rollups``) and raises
+    the table's version (``care_stat.versions``) before committing.  Rows of
+    a partitioned table go to their month's partition (``care_stat.partitions``).
+
+    Rows are committed ``chunk_rows`` at a time (None: all at once), each
+    chunk together with its summaries and version.  A large load then never
+    holds the write lock for long, and readers, which see the last committed
+    snapshot in WAL mode, never see rows without their summaries.  Returns
+    the number of rows inserted.
+    """
+    df = datedim.add_month_key(table, df)
+    df = df.astype(object).where(pd.notnull(df), None)
+    step = chunk_rows or max(len(df), 1)
+    return sum(_insert_chunk(conn, table, df.iloc[start:start + step]) for start in range(0, len(df), step))
+
+
+def _insert_chunk(conn, table, df):
+    cols = ", ".join(df.columns)
+    marks = ", ".join("?" * len(df.columns))
+    with partitions.transaction(conn):
+        targets = partitions.route(conn, table, df) if partitions.is_partitioned(conn, table) else [(table, df)]
+        inserted, new_rows = 0, []
+        for target, rows in targets:
+            # New rows get rowids above the current largest one.
+            last = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {target}").fetchone()[0]
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {target} ({cols}) VALUES ({marks})",
+                rows.itertuples(index=False, name=None),
+            )
+            inserted += conn.total_changes - before
+            if table in rollups.MAINTAINERS:
+                columns = ", ".join(rollups.BASE_COLUMNS[table])
+                new_rows.append(pd.read_sql_query(f"SELECT {columns} FROM {target} WHERE rowid > ?", conn,
+                                                  params=[last]))
+        if inserted and table in datedim.MONTH_KEY_SOURCES:
+            datedim.ensure(conn.cursor(), df[datedim.MONTH_KEY_SOURCES[table]])
+        if inserted and new_rows:
+            rollups.apply(conn.cursor(), table, pd.concat(new_rows, ignore_index=True))
+        if inserted:
+            versions.bump(conn.cursor(), table)
+        return inserted
+
+
+# === Seeding from Dataset CSV ===
+# The CSV exports carry no foreign-key columns, so (like the loaders' "force-fix"
+# step) every reference is filled with a random valid id.
+
+def _read_csv(name):
+    return pd.read_csv(os.path.join(CSV_DIR, name))
+
+
+def _dates(series, fmt="%Y-%m-%d"):
+    return pd.to_datetime(series, errors="coerce").dt.strftime(fmt)
+
+
+def _ids(conn, table, col):
+    return np.array([row[0] for row in conn.execute(f"SELECT {col} FROM {table}")])
+
+
+def seed_from_csv(conn, seed=42):
+    """Fill an empty local database from the files in "Dataset CSV"."""
+    rng = np.random.default_rng(seed)
+
+    def pick(table, col, n):
+        return rng.choice(_ids(conn, table, col), size=n)
+
+    counts = {}
+
+    df = _read_csv("Patients.csv").rename(columns={"gender_patient": "gender", "age_patient": "age"})
+    df["gender"] = df["gender"].str.strip().str.lower()
+    counts["Patients"] = insert_frame(conn, "Patients", df)
+
+    df = _read_csv("Doctors.csv")
+    df["gender"] = df["gender"].str.strip().str.lower()
+    counts["Doctors"] = insert_frame(conn, "Doctors", df)
+
+    df = _read_csv("Departments.csv")
+    df["emergency_support"] = df["emergency_support"].astype(str).str.upper().eq("TRUE").astype(int)
+    df["head_doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    counts["Departments"] = insert_frame(conn, "Departments", df)
+
+    counts["ChronicDiseases"] = insert_frame(conn, "ChronicDiseases", _read_csv("ChronicDiseases.csv"))
+
+    df = _read_csv("Appointments.csv")
+    df["appointment_date"] = _dates(df["appointment_date"], "%Y-%m-%d %H:%M:%S")
+    df["doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    df["patient_id"] = pick("Patients", "patient_id", len(df))
+    counts["Appointments"] = insert_frame(conn, "Appointments", df)
+
+    df = _read_csv("Medical_Records.csv")
+    df["severity_level"] = df["severity_level"].str.strip().str.lower()
+    df["record_date"] = _dates(df["record_date"])
+    df["patient_id"] = pick("Patients", "patient_id", len(df))
+    df["doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    df["department_id"] = pick("Departments", "department_id", len(df))
+    counts["Medical_Records"] = insert_frame(conn, "Medical_Records", df)
+
+    df = _read_csv("Visits.csv")
+    df["visit_date"] = _dates(df["visit_date"])
+    df["patient_id"] = pick("Patients", "patient_id", len(df))
+    counts["Visits"] = insert_frame(conn, "Visits", df)
+
+    df = _read_csv("Payments.csv")
+    df["payment_date"] = _dates(df["payment_date"], "%Y-%m-%d %H:%M:%S")
+    df["transaction_id"] = df["transaction_id"].astype(str)
+    df["patient_id"] = pick("Patients", "patient_id", len(df))
+    df["appointment_id"] = pick("Appointments", "appointment_id", len(df))
+    df["record_id"] = pick("Medical_Records", "record_id", len(df))
+    df["department_id"] = pick("Departments", "department_id", len(df))
+    counts["Payments"] = insert_frame(conn, "Payments", df)
+
+    df = _read_csv("DoctorDepartment.csv")
+    df["doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    df["department_id"] = pick("Departments", "department_id", len(df))
+    counts["DoctorDepartment"] = insert_frame(conn, "DoctorDepartment", df)
+
+    df = _read_csv("DoctorPhones.csv").rename(columns={"doctor_phone": "phone"})
+    df["phone"] = df["phone"].astype(str)
+    df["doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    counts["DoctorPhones"] = insert_frame(conn, "DoctorPhones", df)
+
+    df = _read_csv("DoctorWorkplaces.csv")
+    df["doctor_id"] = pick("Doctors", "doctor_id", len(df))
+    counts["DoctorWorkplaces"] = insert_frame(conn, "DoctorWorkplaces", df)
+
+    df = _read_csv("PatientPhones.csv").rename(columns={"patient_phone": "phone"})
+    df["phone"] = df["phone"].astype(str)
+    df["patient_id"] = pick("Patients", "patient_id", len(df))
+    counts["PatientPhones"] = insert_frame(conn, "PatientPhones", df)
+
+    df = _read_csv("Department_Equipment.csv")
+    df["department_id"] = pick("Departments", "department_id", len(df))
+    counts["Department_Equipment"] = insert_frame(conn, "Department_Equipment", df)
+
+    return counts
+
+
+# === Query pushdown for the dashboard ===
+
+# SQL for the label of each revenue-chart bucket (its start; weeks start on
+# Monday) and for what it is grouped on.  Months group on the stored integer
+# month_key rather than on a string computed from every row.
+PERIOD_SQL = {
+    "day": ("date(payment_date)", "date(payment_date)"),
+    "week": ("date(payment_date, '-6 days', 'weekday 1')", "date(payment_date, '-6 days', 'weekday 1')"),
+    "month": ("printf('%04d-%02d', month_key / 100, month_key % 100)", "month_key"),
+}
+
+
+def _where(relation, filters, dates=None, date_column="payment_date"):
+    """Build a parameterized WHERE clause from the dashboard's selectbox values and date range."""
+    clauses, params = [], []
+    if dates:
+        # A bare range on the column (ISO text sorts by date) can use its index.
+        clauses.append(f"{date_column} >= ? AND {date_column} < ?")
+        params.extend([str(dates[0]), str(dates[1] + datetime.timedelta(days=1))])
+    for col, value in filters.items():
+        if value is None or value == "All":
+            continue
+        if col not in FILTER_COLUMNS[relation]:
+            raise ValueError(f"'{col}' is not a filterable column of {relation}")
+        clauses.append(f"{col} = ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _one_snapshot(method):
+    """Run every query of ``method`` on the same snapshot (see ``SQLiteSource.snapshot``)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.snapshot():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SQLiteSource:
+    """Answers the dashboard's queries with SQL against the local Care_Stat database.
+
+    Same interface as ``care_stat.dashboard.FrameSource``; every filter and
+    group-by runs inside SQLite and only aggregates come back.  The KPIs and
+    charts of a tab are read from one snapshot, so a load committing in
+    between cannot make them disagree.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """Read transaction: the queries inside see the database as of their first read."""
+        if self.conn.in_transaction:
+            yield
+            return
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.execute("COMMIT")
+
+    def _scalar_row(self, sql, params):
+        with section("sql"):
+            return self.conn.execute(sql, params).fetchone()
+
+    def _frame(self, sql, params):
+        with section("sql"):
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def options(self, tab, column):
+        relation = "Payments" if column in FILTER_COLUMNS["Payments"] else "CareStatWide"
+        if column not in FILTER_COLUMNS[relation]:
+            raise ValueError(f"'{column}' is not a filterable column")
+        with section("options"):
+            rows = self.conn.execute(
+                f"SELECT DISTINCT {column} FROM {relation} WHERE {column} IS NOT NULL ORDER BY {column}"
+            )
+            return [row[0] for row in rows]
+
+    @_one_snapshot
+    def date_bounds(self, tab, column):
+        if column != "payment_date":
+            raise ValueError(f"'{column}' has no date range")
+        # Per partition, oldest first, so each bound is read from one index.
+        names = partitions.names(self.conn, "Payments")
+        lo = hi = None
+        for name in names:
+            lo = lo or self._scalar_row(f"SELECT MIN(date({column})) FROM {name}", [])[0]
+        for name in reversed(names):
+            hi = hi or self._scalar_row(f"SELECT MAX(date({column})) FROM {name}", [])[0]
+        if lo is None:
+            return None
+        return datetime.date.fromisoformat(lo), datetime.date.fromisoformat(hi)
+
+    def export_chunks(self, tab, filters, dates=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Same as ``FrameSource.export_chunks``, fetched from one cursor ``chunk_rows`` rows at a time."""
+        relation = EXPORT_RELATIONS[tab]
+        available = {row[1] for row in self.conn.execute(f"PRAGMA table_info({relation})")}
+        columns = [col for col in TAB_COLUMNS[tab] if col in available]
+        date_column = TAB_DATES.get(tab)
+        where, params = _where(relation, filters, dates if date_column else None, date_column)
+        source = partitions.relation(self.conn, relation, dates if date_column else None)
+        cursor = self.conn.execute(f"SELECT {', '.join(columns)} FROM {source}{where}", params)
+        rows = cursor.fetchmany(chunk_rows)
+        while True:
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            if date_column:
+                chunk[date_column] = pd.to_datetime(chunk[date_column], errors="coerce")
+            yield chunk
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+
+    def _box_summary(self, relation, by, col, where, params):
+        """``summaries.box_summary`` in SQL: quartile rows via window ranks, then whiskers and outliers."""
+        where = f"{where} AND" if where else " WHERE"
+        source = f"SELECT {by} AS g, {col} AS v FROM {relation}{where} {by} IS NOT NULL AND {col} IS NOT NULL"
+        stats = self._frame(f"SELECT g, COUNT(*) AS n, AVG(v) AS mean FROM ({source}) GROUP BY g ORDER BY g", params)
+        if stats.empty:
+            return None
+        positions = ", ".join(f"CAST((n - 1) * {q} AS INTEGER) + {k}" for q in QUARTILES for k in (0, 1))
+        ranked = self._frame(
+            f"SELECT g, r, v FROM (SELECT g, v, ROW_NUMBER() OVER (PARTITION BY g ORDER BY v) - 1 AS r,"
+            f" COUNT(*) OVER (PARTITION BY g) AS n FROM ({source})) WHERE r IN ({positions})",
+            params,
+        ).set_index(["g", "r"])["v"]
+        # Linear interpolation between the two ranks around (n - 1) * q, like pandas' quantile.
+        for name, q in zip(["q1", "median", "q3"], QUARTILES):
+            values = []
+            for g, n in zip(stats["g"], stats["n"]):
+                h = (n - 1) * q
+                lo = ranked[(g, int(h))]
+                hi = ranked.get((g, int(h) + 1), lo)
+                values.append(lo + (h - int(h)) * (hi - lo))
+            stats[name] = values
+        iqr = stats["q3"] - stats["q1"]
+        stats["lo"], stats["hi"] = stats["q1"] - 1.5 * iqr, stats["q3"] + 1.5 * iqr
+
+        fences = ", ".join("(?, ?, ?)" for _ in range(len(stats)))
+        fence_params = [x for row in stats[["g", "lo", "hi"]].itertuples(index=False) for x in row]
+        joined = f"WITH f(g, lo, hi) AS (VALUES {fences}) SELECT t.g, t.v, f.lo, f.hi FROM ({source}) t JOIN f ON f.g = t.g"
+        whiskers = self._frame(
+            f"SELECT g, MIN(CASE WHEN v BETWEEN lo AND hi THEN v END) AS lower,"
+            f" MAX(CASE WHEN v BETWEEN lo AND hi THEN v END) AS upper, SUM(v < lo OR v > hi) AS n_outliers"
+            f" FROM ({joined}) GROUP BY g",
+            fence_params + params,
+        )
+        outliers = self._frame(
+            f"SELECT g, v FROM (SELECT g, v, ROW_NUMBER() OVER (PARTITION BY g) AS k FROM ({joined})"
+            f" WHERE v < lo OR v > hi) WHERE k <= ?",
+            fence_params + params + [MAX_OUTLIERS],
+        ).groupby("g")["v"].agg(list)
+        stats = stats.drop(columns=["lo", "hi"]).merge(whiskers, on="g")
+        stats["outliers"] = [outliers.get(g, []) for g in stats["g"]]
+        return stats.rename(columns={"g": by})
+
+    def _histogram(self, relation, col, where, params, bins=30, by=None):
+        """``summaries.histogram`` in SQL: one COUNT per bin (and group)."""
+        where = f"{where} AND" if where else " WHERE"
+        where = f"{where} {col} IS NOT NULL" + ("" if by is None else f" AND {by} IS NOT NULL")
+        start, stop = self._scalar_row(f"SELECT MIN({col}), MAX({col}) FROM {relation}{where}", params)
+        if start is None:
+            return None
+        width = (stop - start) / bins or 1.0
+        group = "" if by is None else f", {by}"
+        counts = self._frame(
+            f"SELECT MIN(CAST(({col} - ?) / ? AS INTEGER), {bins - 1}) AS bin{group}, COUNT(*) AS count"
+            f" FROM {relation}{where} GROUP BY bin{group} ORDER BY bin{group}",
+            [start, width] + params,
+        )
+        counts["bin_start"] = start + counts["bin"] * width
+        counts["bin_end"] = counts["bin_start"] + width
+        counts["bin_mid"] = counts["bin_start"] + width / 2
+        return counts.drop(columns="bin")
+
+    @_one_snapshot
+    def overview(self, filters):
+        where, params = _where("CareStatWide", filters)
+        employees, avg_salary, departments, female_pct, n = self._scalar_row(
+            "SELECT COUNT(DISTINCT doctor_id), AVG(salary), COUNT(DISTINCT department_name),"
+            " AVG(gender = 'female') * 100, COUNT(*)"
+            f" FROM CareStatWide{where}",
+            params,
+        )
+        return {
+            "employees": employees,
+            "avg_salary": avg_salary if n else None,
+            "departments": departments,
+            "female_pct": female_pct if n else None,
+            "dept_count": self._frame(
+                f"SELECT department_name, COUNT(*) AS count FROM CareStatWide{where}"
+                " GROUP BY department_name ORDER BY count DESC",
+                params,
+            ),
+            "gender_count": self._frame(
+                f"SELECT gender, COUNT(*) AS count FROM CareStatWide{where}"
+                " GROUP BY gender ORDER BY count DESC",
+                params,
+            ),
+            "salary_by_dept": self._frame(
+                f"SELECT department_name, AVG(salary) AS salary FROM CareStatWide{where}"
+                " GROUP BY department_name ORDER BY department_name",
+                params,
+            ),
+            "salary_box": self._box_summary("CareStatWide", "department_name", "salary", where, params),
+        }
+
+    @_one_snapshot
+    def treatment(self, filters):
+        where, params = _where("CareStatWide", filters)
+        patients, avg_cost, n = self._scalar_row(
+            f"SELECT COUNT(DISTINCT patient_id), AVG(prescription_cost), COUNT(*) FROM CareStatWide{where}",
+            params,
+        )
+        # Equipment is counted per department instead of being joined into every
+        # record row, which would multiply the rows by the equipment count.
+        (devices,) = self._scalar_row(
+            "SELECT COUNT(DISTINCT equipment_name) FROM Department_Equipment"
+            f" WHERE department_id IN (SELECT department_id FROM CareStatWide{where})",
+            params,
+        )
+        disease_count = self._frame(
+            f"SELECT disease_name, COUNT(*) AS count FROM CareStatWide{where}"
+            " GROUP BY disease_name ORDER BY count DESC, disease_name",
+            params,
+        )
+        return {
+            "patients": patients,
+            "top_disease": disease_count["disease_name"].iloc[0] if n else None,
+            "avg_cost": avg_cost if n else None,
+            "devices": devices,
+            "disease_count": disease_count,
+            "severity_count": self._frame(
+                f"SELECT severity_level, COUNT(*) AS count FROM CareStatWide{where}"
+                " GROUP BY severity_level ORDER BY count DESC",
+                params,
+            ),
+            "cost_by_disease": self._frame(
+                f"SELECT disease_name, AVG(prescription_cost) AS prescription_cost FROM CareStatWide{where}"
+                " GROUP BY disease_name ORDER BY disease_name",
+                params,
+            ),
+            "age_hist": self._histogram("CareStatWide", "age_patient", where, params, by="severity_level"),
+        }
+
+    @_one_snapshot
+    def financial(self, filters, dates=None, grain="month"):
+        where, params = _where("Payments", filters, dates)
+        # Only the partitions overlapping ``dates``, when Payments is partitioned.
+        payments = partitions.relation(self.conn, "Payments", dates)
+        revenue, avg_transaction, completed_pct, n = self._scalar_row(
+            "SELECT SUM(amount), AVG(amount), AVG(payment_status = 'completed') * 100, COUNT(*)"
+            f" FROM {payments}{where}",
+            params,
+        )
+        method_count = self._frame(
+            f"SELECT method, COUNT(*) AS count FROM {payments}{where} GROUP BY method ORDER BY count DESC, method",
+            params,
+        )
+        label, group = PERIOD_SQL[grain]
+        revenue_series = self._frame(
+            f"SELECT {label} AS period, SUM(amount) AS amount FROM {payments}{where}"
+            f" GROUP BY {group} ORDER BY {group}",
+            params,
+        ).dropna()
+        return {
+            "revenue": revenue if n else None,
+            "avg_transaction": avg_transaction if n else None,
+            "completed_pct": completed_pct if n else None,
+            "top_method": method_count["method"].iloc[0] if n else None,
+            "status_count": self._frame(
+                f"SELECT payment_status, COUNT(*) AS count FROM {payments}{where}"
+                " GROUP BY payment_status ORDER BY count DESC",
+                params,
+            ),
+            "method_count": method_count,
+            "revenue_series": revenue_series if not revenue_series.empty else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local SQLite copy of Care_Stat.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--init", action="store_true", help="seed empty tables from the Dataset CSV files")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    created = create_schema(conn)
+    print(f"✅ Schema ready in {args.db}")
+    if set(created) & set(rollups.SUMMARY_TABLES) and not set(created) >= set(rollups.MAINTAINERS):
+        # Summaries added to a database that already holds rows.
+        rollups.rebuild(conn)
+        print("✅ Report summaries built from the existing rows")
+    if args.init:
+        for table, n in seed_from_csv(conn).items():
+            print(f"   {table:<22} {n} rows")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
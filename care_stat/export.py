@@ -0,0 +1,152 @@
+"""Streams the filtered rows behind a dashboard tab as CSV or Parquet.
+
+The rows come from the source's ``export_chunks``: slices of the shared cached
+frame, or a SQLite cursor read a chunk at a time.  ``stream`` encodes each
+chunk as soon as it arrives (one Parquet row group per chunk), so an export
+holds one chunk in memory, never a second copy of the whole selection.
+
+serve.py mounts ``routes()``, which answers
+
+    /export/care_stat_<tab>.<csv|parquet>?<column>=<value>&start=<date>&end=<date>
+
+with a streamed response.  Under plain ``streamlit run app.py`` there is no
+such route, and the dashboard offers no row export rather than building the
+whole file in memory.
+"""
+import datetime
+from urllib.parse import urlencode
+
+from care_stat import resources
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+ROUTE_PREFIX = "export"
+
+# Set by routes(): the current server streams exports itself.
+routes_mounted = False
+
+
+class _Sink:
+    """Write-only file for ParquetWriter whose bytes are collected between chunks."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def csv_stream(chunks):
+    first = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=first).encode("utf-8")
+        first = False
+
+
+def parquet_stream(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _Sink(), None
+    for chunk in chunks:
+        if writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = pq.ParquetWriter(sink, table.schema)
+        else:
+            # Later chunks take the first chunk's types, e.g. for an all-null column.
+            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def stream(chunks, fmt):
+    """Encode ``chunks`` (DataFrames with the same columns) as ``fmt``, piece by piece."""
+    return csv_stream(chunks) if fmt == "csv" else parquet_stream(chunks)
+
+
+def open_source():
+    """A source of the dashboard's rows usable outside a script run, and its cleanup."""
+    if resources.DATA_SOURCE == "sqlite":
+        from care_stat import db
+        # Streamed responses are generated on worker threads, one chunk at a time.
+        conn = db.connect(check_same_thread=False)
+        return db.SQLiteSource(conn), conn.close
+    from care_stat.dashboard import FrameSource
+    return FrameSource(resources.dataset_frame), lambda: None
+
+
+def rows(tab, fmt, filters, dates=None):
+    """The encoded rows of ``tab`` matching ``filters`` and ``dates``, as a stream of bytes."""
+    source, close = open_source()
+    try:
+        yield from stream(source.export_chunks(tab, filters, dates), fmt)
+    finally:
+        close()
+
+
+def file_name(tab, fmt):
+    return f"care_stat_{tab}.{fmt}"
+
+
+def url(tab, fmt, filters, dates=None):
+    """Relative link to the streamed export of ``tab`` served by ``routes()``."""
+    params = {col: value for col, value in filters.items() if value is not None and value != "All"}
+    if dates:
+        params.update(start=str(dates[0]), end=str(dates[1]))
+    query = urlencode(params)
+    return f"{ROUTE_PREFIX}/{file_name(tab, fmt)}" + (f"?{query}" if query else "")
+
+
+def routes():
+    """Starlette routes serving ``url()`` links; pass them to ``st.App``."""
+    global routes_mounted
+    from starlette.responses import PlainTextResponse, StreamingResponse
+    from starlette.routing import Route
+
+    from care_stat.dashboard import TAB_DATES, TAB_FILTERS
+
+    async def export(request):
+        tab, fmt = request.path_params["tab"], request.path_params["fmt"]
+        if tab not in TAB_FILTERS or fmt not in EXPORT_FORMATS:
+            return PlainTextResponse("Unknown export", status_code=404)
+        params = dict(request.query_params)
+        try:
+            dates = None
+            if "start" in params or "end" in params:
+                dates = (datetime.date.fromisoformat(params.pop("start")),
+                         datetime.date.fromisoformat(params.pop("end")))
+            if dates and tab not in TAB_DATES:
+                raise ValueError(f"the {tab} tab has no date range")
+            unknown = set(params) - set(TAB_FILTERS[tab])
+            if unknown:
+                raise ValueError(f"cannot filter {tab} on {', '.join(sorted(unknown))}")
+        except (KeyError, ValueError) as e:
+            return PlainTextResponse(f"Bad export request: {e}", status_code=400)
+        return StreamingResponse(
+            rows(tab, fmt, params, dates), media_type=EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{file_name(tab, fmt)}"'},
+        )
+
+    # Exports run on the server's worker threads, outside any script run.
+    resources.quiet_outside_script_runs("AnyIO worker thread")
+    routes_mounted = True
+    return [Route(f"/{ROUTE_PREFIX}/care_stat_{{tab}}.{{fmt}}", export)]
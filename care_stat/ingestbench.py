@@ -0,0 +1,188 @@
+"""Reader latency while a bulk load writes to the local database.
+
+Reader threads, each with its own connection, keep answering the Financial
+tab (``SQLiteSource.financial``) and timing it, first on an idle database and
+then while a writer process (like a loader next to the dashboard server)
+inserts payments through ``db.insert_frame``.  Every read also checks,
+inside the same snapshot, that the payment count in the RevenueMonthly
+summary matches the Payments rows; a read that sees one without the other is
+counted as inconsistent.
+
+    python -m care_stat.ingestbench --rows 100000 --load-rows 200000 --readers 4
+    python -m care_stat.ingestbench --journal-modes delete wal --chunk-rows 0 20000
+
+Each combination of ``--journal-modes`` and ``--chunk-rows`` (0: the whole
+load in one transaction, the way the loaders commit) runs on a fresh copy of
+the same synthetic database.  With WAL and chunked commits the latency under
+load should stay close to the idle one.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from care_stat import db, rollups, sqlbench
+from care_stat.synthetic import METHODS, STATUSES
+
+
+def prepare(path, rows, seed=0):
+    """Write a synthetic database with ``rows`` payments, its indexes and summaries; returns the row counts."""
+    conn = sqlbench.bulk_connect(path)
+    db.create_schema(conn, indexes=False)
+    sizes = sqlbench.synthetic_load(conn, rows, seed=seed)
+    db.create_indexes(conn)
+    rollups.rebuild(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+    return sizes
+
+
+def new_payments(conn, rows, seed=0):
+    """``rows`` payments for existing patients, with ids after the largest one stored."""
+    rng = np.random.default_rng(seed)
+    first = conn.execute("SELECT COALESCE(MAX(payment_id), 0) + 1 FROM Payments").fetchone()[0]
+    patients = np.array([row[0] for row in conn.execute("SELECT patient_id FROM Patients")])
+    departments = np.array([row[0] for row in conn.execute("SELECT department_id FROM Departments")])
+    ids = np.arange(first, first + rows)
+    seconds = rng.integers(0, 365 * 86400, size=rows)
+    return pd.DataFrame({
+        "payment_id": ids,
+        "patient_id": rng.choice(patients, size=rows),
+        "department_id": rng.choice(departments, size=rows),
+        "method": rng.choice(METHODS, size=rows),
+        "amount": np.round(rng.uniform(10, 5000, size=rows), 2),
+        "payment_date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+        "payment_status": rng.choice(STATUSES, size=rows),
+        "transaction_id": [f"ING{i}" for i in ids],
+    })
+
+
+def _reader(path, journal_mode, stop, loading, samples, lock):
+    conn = db.connect(path, journal_mode=journal_mode)
+    source = db.SQLiteSource(conn)
+    while not stop.is_set():
+        phase = "load" if loading.is_set() else "idle"
+        start = time.perf_counter()
+        try:
+            with source.snapshot():
+                source.financial({})
+                counted, stored = conn.execute(
+                    "SELECT (SELECT SUM(payment_count) FROM RevenueMonthly), (SELECT COUNT(*) FROM Payments)"
+                ).fetchone()
+            outcome = "ok" if counted == stored else "inconsistent"
+        except sqlite3.OperationalError:
+            outcome = "error"
+        with lock:
+            samples.append((phase, outcome, (time.perf_counter() - start) * 1000))
+    conn.close()
+
+
+def _writer(path, journal_mode, payments, chunk_rows, results):
+    conn = db.connect(path, journal_mode=journal_mode)
+    start = time.perf_counter()
+    try:
+        inserted = db.insert_frame(conn, "Payments", payments, chunk_rows=chunk_rows or None)
+    except sqlite3.OperationalError as e:
+        # In rollback-journal mode a steady stream of readers can keep the writer out past the busy timeout.
+        inserted = f"failed: {e}"
+    results.put((inserted, time.perf_counter() - start))
+    conn.close()
+
+
+def run_scenario(template, journal_mode, chunk_rows, readers, load_rows, idle_s, seed=0):
+    """Time reads on a copy of ``template`` before and during a load of ``load_rows`` payments."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "care_stat_ingest.db")
+        shutil.copyfile(template, path)
+        conn = db.connect(path, journal_mode=journal_mode)
+        payments = new_payments(conn, load_rows, seed)
+        conn.close()
+
+        stop, loading, lock, samples = threading.Event(), threading.Event(), threading.Lock(), []
+        threads = [threading.Thread(target=_reader, args=(path, journal_mode, stop, loading, samples, lock))
+                   for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(idle_s)
+
+        loading.set()
+        # Spawned, not forked: forking while the readers hold connections is unsafe.
+        spawn = multiprocessing.get_context("spawn")
+        done = spawn.Queue()
+        writer = spawn.Process(target=_writer, args=(path, journal_mode, payments, chunk_rows, done))
+        writer.start()
+        inserted, load_s = done.get()
+        writer.join()
+        loading.clear()
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    result = {"journal_mode": journal_mode, "chunk_rows": chunk_rows, "readers": readers,
+              "inserted": inserted, "load_s": round(load_s, 2), "phases": {}}
+    for phase in ("idle", "load"):
+        times = [ms for p, outcome, ms in samples if p == phase and outcome != "error"]
+        p50, p95, p99 = np.percentile(times, [50, 95, 99]) if times else (None, None, None)
+        result["phases"][phase] = {
+            "reads": len(times), "p50": p50, "p95": p95, "p99": p99, "max": max(times, default=None),
+            "errors": sum(1 for p, outcome, _ in samples if p == phase and outcome == "error"),
+            "inconsistent": sum(1 for p, outcome, _ in samples if p == phase and outcome == "inconsistent"),
+        }
+    return result
+
+
+def _ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reader latency during a bulk load of the local Care_Stat database.")
+    parser.add_argument("--rows", type=int, default=100_000, help="payments already in the database")
+    parser.add_argument("--load-rows", type=int, default=200_000, help="payments inserted during the test")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent reader threads")
+    parser.add_argument("--journal-modes", nargs="+", default=["delete", "wal"], choices=["delete", "wal"])
+    parser.add_argument("--chunk-rows", type=int, nargs="+", default=[0, db.INSERT_CHUNK_ROWS],
+                        help="rows per committed chunk; 0 commits the whole load at once")
+    parser.add_argument("--idle-s", type=float, default=2.0, help="seconds of reads before the load starts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        start = time.perf_counter()
+        prepare(template, args.rows, args.seed)
+        print(f"✅ {args.rows:,} payments loaded in {time.perf_counter() - start:.1f}s; "
+              f"inserting {args.load_rows:,} more with {args.readers} readers\n")
+        print(f"{'journal':<8} {'chunk':>7} {'phase':<5} {'reads':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'errors':>6} {'inconsistent':>12} {'load s':>7}")
+        print("-" * 97)
+        for journal_mode in args.journal_modes:
+            for chunk_rows in args.chunk_rows:
+                result = run_scenario(template, journal_mode, chunk_rows, args.readers, args.load_rows,
+                                      args.idle_s, args.seed)
+                results.append(result)
+                for phase, s in result["phases"].items():
+                    print(f"{journal_mode:<8} {chunk_rows or 'all':>7} {phase:<5} {s['reads']:>6} {_ms(s['p50'])} "
+                          f"{_ms(s['p95'])} {_ms(s['p99'])} {_ms(s['max'])} {s['errors']:>6} "
+                          f"{s['inconsistent']:>12} {result['load_s'] if phase == 'load' else '':>7}")
+                if isinstance(result["inserted"], str):
+                    print(f"   ❌ writer {result['inserted']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=float)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Top-N doctor and patient leaderboards, read from ordered indexes.
+
+"Doctors by number of visits" and "patients with more than one visit" used
+to join, group and sort all visits to return ten rows.  The counts they rank
+are kept per doctor and per patient in DoctorVisits and PatientVisits,
+which the loaders update as appointments and visits are inserted
+(``care_stat.rollups``), and each leaderboard walks an index on the ranked
+column from the top and stops after ``n`` rows:
+
+- by visits: ``IX_DoctorVisits_count`` / ``IX_PatientVisits_count``, or
+  ``IX_DoctorVisits_specialization_count`` within one specialization;
+- by rating or salary within a specialization:
+  ``IX_Doctors_specialization_rating`` / ``IX_Doctors_specialization_salary``.
+
+Rankings by rating or salary across all specializations read Doctors once,
+keeping only the best ``n`` rows while sorting.
+
+    python -m care_stat.leaderboards --by visits
+    python -m care_stat.leaderboards --by rating --specialization Cardiology --plan
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from care_stat import db
+
+DOCTOR_RANKS = {"visits": "dv.visit_count", "rating": "d.rating_avg", "salary": "d.salary"}
+DOCTOR_COLUMNS = ("d.doctor_id, d.first_name || ' ' || d.last_name AS doctor_name, d.specialization,"
+                  " COALESCE(dv.visit_count, 0) AS total_visits, d.rating_avg, d.salary")
+
+
+def doctors_sql(by="visits", specialization=None):
+    """(sql, params) of the doctor leaderboard, without its LIMIT parameter."""
+    if by not in DOCTOR_RANKS:
+        raise ValueError(f"doctors are ranked by {', '.join(DOCTOR_RANKS)}, not '{by}'")
+    rank = DOCTOR_RANKS[by]
+    if by == "visits":
+        # Start from the counters so the count index gives the order.
+        source = "DoctorVisits dv JOIN Doctors d ON d.doctor_id = dv.doctor_id"
+        scope = "dv.specialization = ?"
+    else:
+        source = "Doctors d LEFT JOIN DoctorVisits dv ON dv.doctor_id = d.doctor_id"
+        scope = "d.specialization = ?"
+    where = [f"{rank} IS NOT NULL"] + ([scope] if specialization is not None else [])
+    sql = (f"SELECT {DOCTOR_COLUMNS} FROM {source} WHERE {' AND '.join(where)}"
+           f" ORDER BY {rank} DESC, d.doctor_id LIMIT ?")
+    return sql, [specialization] if specialization is not None else []
+
+
+def top_doctors(conn, n=10, by="visits", specialization=None):
+    """The ``n`` doctors with the most visits, or the highest rating or salary, optionally of one specialization."""
+    sql, params = doctors_sql(by, specialization)
+    return pd.read_sql_query(sql, conn, params=params + [n])
+
+
+PATIENTS_SQL = (
+    "SELECT p.patient_id, p.first_name || ' ' || p.last_name AS patient_name, p.age, p.gender,"
+    " pv.visit_count AS total_visits"
+    " FROM PatientVisits pv JOIN Patients p ON p.patient_id = pv.patient_id"
+    " WHERE pv.visit_count >= ? ORDER BY pv.visit_count DESC, pv.patient_id LIMIT ?"
+)
+
+
+def top_patients(conn, n=10, min_visits=2):
+    """The ``n`` patients with the most visits, among those with at least ``min_visits``."""
+    return pd.read_sql_query(PATIENTS_SQL, conn, params=[min_visits, n])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the doctor and patient leaderboards.")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--by", choices=sorted(DOCTOR_RANKS) + ["patients"], default="visits",
+                        help="rank doctors by visits, rating or salary, or patients by visits")
+    parser.add_argument("--specialization", help="only doctors of this specialization")
+    parser.add_argument("-n", type=int, default=10, help="rows to show (default: %(default)s)")
+    parser.add_argument("--plan", action="store_true", help="also show the query plan")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db)
+    start = time.perf_counter()
+    if args.by == "patients":
+        board = top_patients(conn, args.n)
+        sql, params = PATIENTS_SQL, [2, args.n]
+    else:
+        board = top_doctors(conn, args.n, args.by, args.specialization)
+        sql, params = doctors_sql(args.by, args.specialization)
+        params = params + [args.n]
+    elapsed = time.perf_counter() - start
+    print(f"-- top {args.n} by {args.by}{f' in {args.specialization}' if args.specialization else ''}"
+          f" ({elapsed * 1000:.1f} ms)")
+    print(board.to_string(index=False))
+    if args.plan:
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            print(f"   {row[-1]}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Headless load test for app.py: N concurrent sessions changing random filters.
+
+Each session is a Streamlit ``AppTest`` driven from its own thread, the way a
+Streamlit server runs one script thread per browser session.  All sessions
+share the process-wide caches, so the dataset is loaded once, as in production.
+Sessions switch to a random tab and pick random filter values, and every
+rerun is timed.
+
+    python -m care_stat.loadtest --sessions 1 8 32 --rows 10000 100000 --reruns 20
+
+Datasets are synthetic Care_stat.csv files of the requested sizes, written to
+``--data-dir`` (reused between runs) and passed to app.py through CARE_STAT_CSV.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from care_stat.synthetic import COUNTRIES, DEPARTMENTS, DIAGNOSES, EQUIPMENT, METHODS, SEVERITIES, STATUSES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT_DIR, "app.py")
+
+TAB_LABELS = {
+    "overview": "Hospit Overview",
+    "treatment": "Patient & Treatment Data",
+    "financial": "Financial Performance",
+}
+TAB_FILTERS = {
+    "overview": ["tab1_dept", "tab1_gender", "tab1_country"],
+    "treatment": ["tab2_disease", "tab2_severity"],
+    "financial": ["tab3_status", "tab3_method"],
+}
+
+
+def synthetic_frame(rows, seed=0):
+    """A Care_stat-shaped frame with ``rows`` rows and the value ranges of the Faker notebook."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2023-01-01T00:00:00")
+    seconds = rng.integers(0, 365 * 24 * 3600, size=rows).astype("timedelta64[s]")
+    return pd.DataFrame({
+        "doctor_id": rng.integers(10, 10 + max(rows // 10, 100), size=rows),
+        "salary": rng.uniform(5000, 100000, size=rows).round(2),
+        "department_name": rng.choice(DEPARTMENTS, size=rows),
+        "gender": rng.choice(["male", "female"], size=rows),
+        "country": rng.choice(COUNTRIES, size=rows),
+        "patient_id": rng.integers(10, 10 + max(rows // 2, 100), size=rows),
+        "age_patient": rng.integers(1, 90, size=rows),
+        "disease_name": rng.choice(DIAGNOSES, size=rows),
+        "severity_level": rng.choice(SEVERITIES, size=rows),
+        "prescription_cost": rng.uniform(10, 1000, size=rows).round(2),
+        "equipment_name": rng.choice(EQUIPMENT, size=rows),
+        "payment_status": rng.choice(STATUSES, size=rows),
+        "method": rng.choice(METHODS, size=rows),
+        "amount": rng.uniform(10, 5000, size=rows).round(2),
+        "payment_date": pd.to_datetime(start + seconds).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def write_synthetic_csv(rows, directory, seed=0):
+    path = os.path.join(directory, f"Care_stat_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        synthetic_frame(rows, seed).to_csv(path, index=False)
+    return path
+
+
+def install_shared_runtime():
+    """Let several AppTests run at once in this process.
+
+    ``AppTest.run`` installs a fresh mock ``Runtime`` singleton and clears it
+    when it finishes, and it compiles the script into a new ``ScriptCache``
+    every time.  Both race when sessions overlap.  Here one mock runtime and
+    one script cache are shared by every session, as they are in a real server.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.config import set_option
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    # AppTest assigns and clears the singleton through this name; a subclass
+    # takes those writes so the shared instance above stays in place.
+    app_test.Runtime = type("LoadTestRuntime", (Runtime,), {})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+    set_option("global.appTest", True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _timed_run(at, samples, tab, kind):
+    start = time.perf_counter()
+    at.run()
+    samples.append({"tab": tab, "kind": kind, "ms": (time.perf_counter() - start) * 1000,
+                    "error": len(at.exception) > 0})
+
+
+def run_session(reruns, seed, samples, start_barrier):
+    """One simulated user: ``reruns`` rounds of tab switch + random filter change."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    start_barrier.wait()
+    _timed_run(at, samples, "overview", "first")
+    current = "overview"
+    for _ in range(reruns):
+        tab = str(rng.choice(list(TAB_LABELS)))
+        if tab != current:
+            at.session_state["active_tab"] = TAB_LABELS[tab]
+            _timed_run(at, samples, tab, "switch")
+            current = tab
+        for key in TAB_FILTERS[tab]:
+            try:
+                box = at.selectbox(key=key)
+            except KeyError:
+                continue
+            box.set_value(box.options[rng.integers(len(box.options))])
+        _timed_run(at, samples, tab, "filter")
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99}
+
+
+def run_scenario(csv_path, sessions, reruns, seed=0):
+    """Run ``sessions`` concurrent sessions against ``csv_path`` and summarize their reruns."""
+    import streamlit as st
+
+    os.environ["CARE_STAT_CSV"] = csv_path
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    gc.collect()
+
+    from streamlit.testing.v1 import AppTest
+
+    # Warm the shared caches once for every tab, like the first visitors would.
+    warm = []
+    for tab, label in TAB_LABELS.items():
+        at = AppTest.from_file(APP_PATH, default_timeout=600)
+        at.session_state["active_tab"] = label
+        _timed_run(at, warm, tab, "warm")
+    gc.collect()
+    baseline = current_rss()
+
+    # Peak RSS while the sessions run, sampled every 20 ms, so short-lived
+    # per-rerun copies count towards the per-session memory as well.
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.wait(0.02):
+            peak[0] = max(peak[0], current_rss())
+
+    samples = []
+    barrier = threading.Barrier(sessions)
+    threads = [threading.Thread(target=run_session, args=(reruns, seed + i + 1, samples, barrier))
+               for i in range(sessions)]
+    sampler = threading.Thread(target=sample_rss)
+    sampler.start()
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    peak_delta = max(peak[0], current_rss()) - baseline
+
+    timings = [s["ms"] for s in samples]
+    summary = {
+        "sessions": sessions,
+        "reruns": len(samples),
+        "errors": sum(s["error"] for s in samples),
+        "warm_ms": sum(s["ms"] for s in warm),
+        "throughput_per_s": len(samples) / elapsed if elapsed else None,
+        "baseline_rss_mb": baseline / 2**20,
+        "mb_per_session": peak_delta / sessions / 2**20,
+        **_percentiles(timings),
+        "by_tab": {tab: _percentiles([s["ms"] for s in samples if s["tab"] == tab]) for tab in TAB_LABELS},
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Care_Stat dashboard.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="concurrent sessions to simulate")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="synthetic dataset sizes")
+    parser.add_argument("--reruns", type=int, default=10, help="filter changes per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "care_stat_loadtest"))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.environ.setdefault("CARE_STAT_SOURCE", "csv")
+    install_shared_runtime()
+
+    results = []
+    print(f"{'rows':>10} {'sessions':>8} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'MB/session':>10} {'errors':>6}")
+    print("-" * 76)
+    for rows in args.rows:
+        csv_path = write_synthetic_csv(rows, args.data_dir, args.seed)
+        for sessions in args.sessions:
+            summary = {"rows": rows, **run_scenario(csv_path, sessions, args.reruns, args.seed)}
+            results.append(summary)
+            print(f"{rows:>10} {sessions:>8} {summary['reruns']:>7} {summary['p50']:>9.1f} "
+                  f"{summary['p95']:>9.1f} {summary['p99']:>9.1f} {summary['mb_per_session']:>10.2f} "
+                  f"{summary['errors']:>6}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""Monthly partitions of the fact tables in the local SQLite copy.
+
+SQLite has no table partitioning, so a partitioned table is split into one
+table per month (``Payments_p202403``) and replaced by a view of the same
+name that is their ``UNION ALL``.  Everything that reads ``Payments`` keeps
+working unchanged, and:
+
+- ``db.insert_frame`` routes each row to the partition of its ``month_key``
+  (``route``), creating partitions for new months as they arrive;
+- queries with a date range read only the partitions it overlaps
+  (``relation``), which the dashboard's Financial tab and exports use;
+- old partitions can be merged into one table per year (``compact``), or
+  moved to a SQLite file of their own and dropped from the view
+  (``archive``), and brought back later (``restore``).
+
+Each partition carries a ``CHECK`` on its months, the table's indexes and
+its primary and unique keys.  ``route`` skips rows whose id is already in
+another partition, as a single table would; unique keys other than the id
+are only checked within a partition.  Foreign keys between partitioned
+tables (Payments -> Appointments, Medical_Records) are dropped, since
+SQLite cannot reference a view; so a table is only partitioned together
+with every table that references it.  The report summaries
+(``care_stat.rollups``) keep counting archived rows, but ``rollups.rebuild``
+only sees the rows online.
+
+    python -m care_stat.partitions --partition
+    python -m care_stat.partitions --compact-before 202401
+    python -m care_stat.partitions --archive-before 202301 --archive-dir archive
+    python -m care_stat.partitions --restore Payments_p2022
+    python -m care_stat.partitions --list
+"""
+import argparse
+import contextlib
+import os
+import re
+import sqlite3
+
+from care_stat import datedim, versions
+
+KEY = "month_key"
+TABLES = tuple(datedim.MONTH_KEY_SOURCES)
+# SQLite's default cap on the arms of one compound SELECT; compact before it.
+MAX_PARTITIONS = 500
+
+CATALOG = [
+    """CREATE TABLE IF NOT EXISTS PartitionedTables (
+        table_name TEXT PRIMARY KEY,
+        id_column TEXT NOT NULL,
+        columns TEXT NOT NULL,
+        create_sql TEXT NOT NULL,
+        index_sql TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS Partitions (
+        partition_name TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL REFERENCES PartitionedTables(table_name),
+        first_month INT NOT NULL,
+        last_month INT NOT NULL,
+        archive_path TEXT
+    )""",
+]
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """Commit everything run inside, or nothing.
+
+    ``with conn`` alone does not do that here: sqlite3 opens its implicit
+    transaction at the first INSERT, UPDATE or DELETE, so CREATE TABLE, DROP
+    and view changes run before it are committed as they go.  Inside an open
+    transaction this just joins it.
+    """
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _catalog(conn):
+    # Partitioning info by table, or {} for a database that was never partitioned.
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'PartitionedTables'").fetchone() is None:
+        return {}
+    rows = conn.execute("SELECT table_name, id_column, columns, create_sql, index_sql FROM PartitionedTables")
+    return {name: {"id": id_column, "columns": columns.split(","), "create_sql": create_sql,
+                   "index_sql": [stmt for stmt in index_sql.split(";\n") if stmt]}
+            for name, id_column, columns, create_sql, index_sql in rows}
+
+
+def is_partitioned(conn, table):
+    return table in _catalog(conn)
+
+
+def partitions(conn, table, archived=False):
+    """(name, first month, last month) of ``table``'s partitions, oldest first."""
+    where = "archive_path IS NOT NULL" if archived else "archive_path IS NULL"
+    return conn.execute(
+        f"SELECT partition_name, first_month, last_month FROM Partitions WHERE table_name = ? AND {where}"
+        " ORDER BY first_month", (table,)).fetchall()
+
+
+def names(conn, table):
+    """The tables holding ``table``'s rows, oldest first: its partitions, or the table itself."""
+    if not is_partitioned(conn, table):
+        return [table]
+    return [name for name, _, _ in partitions(conn, table)]
+
+
+def partition_name(table, first, last):
+    if first == last:
+        return f"{table}_p{first}"
+    if first % 100 == 1 and last == first + 11:
+        return f"{table}_p{first // 100}"
+    return f"{table}_p{first}_{last}"
+
+
+def _index_name(stmt):
+    return re.search(r"\bINDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", stmt, re.IGNORECASE).group(1)
+
+
+def index_columns(stmt):
+    """The column list of a ``CREATE INDEX`` statement, without spaces."""
+    return re.sub(r"\s+", "", re.search(r"\(([^()]*)\)\s*$", stmt).group(1))
+
+
+def _index_for(stmt, table, name):
+    # The same index on one partition, named after it.
+    stmt = re.sub(r"\bINDEX\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+" + table + r"\s*\(",
+                  lambda m: f"INDEX IF NOT EXISTS {m.group(2)}__{name[len(table) + 1:]} ON {name}(",
+                  stmt, flags=re.IGNORECASE)
+    return stmt
+
+
+def _create(conn, table, first, last, info):
+    name = partition_name(table, first, last)
+    ddl = re.sub(r"^\s*CREATE\s+TABLE\s+\w+", f"CREATE TABLE {name}", info["create_sql"], flags=re.IGNORECASE)
+    ddl = ddl[:ddl.rindex(")")].rstrip() + f",\n    CHECK ({KEY} BETWEEN {first} AND {last})\n)"
+    conn.execute(ddl)
+    for stmt in info["index_sql"]:
+        conn.execute(_index_for(stmt, table, name))
+    conn.execute("INSERT INTO Partitions (partition_name, table_name, first_month, last_month) VALUES (?, ?, ?, ?)",
+                 (name, table, first, last))
+    return name
+
+
+def refresh_view(conn, table):
+    """Recreate ``table``'s view over its online partitions."""
+    info = _catalog(conn)[table]
+    columns = ", ".join(info["columns"])
+    online = names(conn, table)
+    if len(online) > MAX_PARTITIONS:
+        raise ValueError(f"{table} has {len(online)} partitions; compact the oldest ones first")
+    body = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in online)
+    conn.execute(f"DROP VIEW IF EXISTS {table}")
+    conn.execute(f"CREATE VIEW {table} AS "
+                 + (body or "SELECT " + ", ".join(f"NULL AS {col}" for col in info["columns"]) + " WHERE 0"))
+
+
+def _references(conn):
+    # {table: tables with a foreign key pointing at it}
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    refs = {}
+    for table in tables:
+        for row in conn.execute(f"PRAGMA foreign_key_list({table})"):
+            refs.setdefault(row[2], set()).add(table)
+    return refs
+
+
+def partition(conn, tables=TABLES):
+    """Split ``tables`` into monthly partitions behind views of the same names."""
+    done = _catalog(conn)
+    tables = [table for table in tables if table not in done]
+    refs = _references(conn)
+    for table in tables:
+        outside = refs.get(table, set()) - set(tables) - {table}
+        if outside:
+            raise ValueError(f"{', '.join(sorted(outside))} reference {table}; partition them together")
+    # Referencing tables go first, so dropping a table never breaks a foreign key.
+    order = []
+    while len(order) < len(tables):
+        ready = [t for t in tables if t not in order and not (refs.get(t, set()) & set(tables)) - set(order) - {t}]
+        if not ready:
+            raise ValueError(f"{', '.join(t for t in tables if t not in order)} reference each other")
+        order += ready
+
+    with transaction(conn):
+        for stmt in CATALOG:
+            conn.execute(stmt)
+        for table in order:
+            create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (table,)).fetchone()[0]
+            for parent in tables:
+                create_sql = re.sub(r",\s*CONSTRAINT\s+\w+\s+FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+"
+                                    + parent + r"\s*\([^)]*\)", "", create_sql, flags=re.IGNORECASE)
+            info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            indexes = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,))]
+            conn.execute("INSERT INTO PartitionedTables VALUES (?, ?, ?, ?, ?)", (
+                table, next(row[1] for row in info if row[5] == 1), ",".join(row[1] for row in info),
+                create_sql, ";\n".join(indexes)))
+            conn.execute(f"UPDATE {table} SET {KEY} = CAST(strftime('%Y%m', {datedim.MONTH_KEY_SOURCES[table]})"
+                         f" AS INTEGER) WHERE {KEY} IS NULL")
+            missing = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {KEY} IS NULL").fetchone()[0]
+            if missing:
+                raise ValueError(f"{missing} rows of {table} have no {datedim.MONTH_KEY_SOURCES[table]}")
+
+            conn.execute(f"CREATE INDEX IF NOT EXISTS IX_{table}_partitioning ON {table}({KEY})")
+            columns = ", ".join(row[1] for row in info)
+            months = [row[0] for row in conn.execute(f"SELECT DISTINCT {KEY} FROM {table} ORDER BY {KEY}")]
+            meta = _catalog(conn)[table]
+            for month in months:
+                name = _create(conn, table, month, month, meta)
+                conn.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {table} WHERE {KEY} = ?",
+                             (month,))
+            conn.execute(f"DROP TABLE {table}")
+            refresh_view(conn, table)
+    return {table: len(partitions(conn, table)) for table in order}
+
+
+def route(conn, table, rows):
+    """Split ``rows`` of partitioned ``table`` into (partition, rows) pairs, creating missing months.
+
+    Rows with an id already stored (or repeated in ``rows``) or without a
+    month are dropped.  Runs in the caller's transaction.
+    """
+    info = _catalog(conn)[table]
+    rows = rows[rows[KEY].notna()].drop_duplicates(info["id"])
+    ids = [int(i) for i in rows[info["id"]]]
+    stored = set()
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        stored.update(row[0] for row in conn.execute(
+            f"SELECT {info['id']} FROM {table} WHERE {info['id']} IN ({', '.join('?' * len(batch))})", batch))
+    rows = rows[~rows[info["id"]].isin(stored)]
+
+    online = partitions(conn, table)
+    archived = partitions(conn, table, archived=True)
+    created, targets = False, []
+    for month, group in rows.groupby(rows[KEY].astype(int)):
+        name = next((n for n, lo, hi in online if lo <= month <= hi), None)
+        if name is None:
+            if any(lo <= month <= hi for _, lo, hi in archived):
+                raise ValueError(f"{table} rows for {month} belong to an archived partition; restore it first")
+            name = _create(conn, table, month, month, info)
+            online.append((name, month, month))
+            created = True
+        targets.append((name, group))
+    if created:
+        refresh_view(conn, table)
+    return targets
+
+
+def relation(conn, table, dates=None):
+    """What to select ``table``'s rows in ``dates`` from: the partitions overlapping them, or ``table``."""
+    if not dates or not is_partitioned(conn, table):
+        return table
+    first, last = datedim.month_key(dates[0]), datedim.month_key(dates[1])
+    overlapping = [name for name, lo, hi in partitions(conn, table) if lo <= last and hi >= first]
+    columns = ", ".join(_catalog(conn)[table]["columns"])
+    if not overlapping:
+        return f"(SELECT {columns} FROM {table} WHERE 0) AS {table}"
+    return "(" + " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in overlapping) + f") AS {table}"
+
+
+def create_index(conn, table, stmt):
+    """Add index ``stmt`` (written for ``table``) to every partition, now and future.
+
+    An index of the same name on other columns is dropped and rebuilt.
+    """
+    known = {_index_name(sql): sql for sql in _catalog(conn)[table]["index_sql"]}
+    name = _index_name(stmt)
+    if name in known and index_columns(known[name]) != index_columns(stmt):
+        drop_index(conn, table, name)
+    for partition, _, _ in partitions(conn, table):
+        conn.execute(_index_for(stmt, table, partition))
+    info = _catalog(conn)[table]
+    if name not in {_index_name(sql) for sql in info["index_sql"]}:
+        conn.execute("UPDATE PartitionedTables SET index_sql = ? WHERE table_name = ?",
+                     (";\n".join(info["index_sql"] + [stmt]), table))
+
+
+def drop_index(conn, table, name):
+    """Drop index ``name`` from every online partition of ``table`` and from later ones."""
+    info = _catalog(conn)[table]
+    for partition, _, _ in partitions(conn, table):
+        conn.execute(f"DROP INDEX IF EXISTS {name}__{partition[len(table) + 1:]}")
+    conn.execute("UPDATE PartitionedTables SET index_sql = ? WHERE table_name = ?",
+                 (";\n".join(sql for sql in info["index_sql"] if _index_name(sql) != name), table))
+
+
+def alter(conn, table, stmt):
+    """Apply ``ALTER TABLE table ADD ...`` to every online partition and to later ones."""
+    info = _catalog(conn)[table]
+    for name, _, _ in partitions(conn, table):
+        conn.execute(re.sub(r"ALTER\s+TABLE\s+" + table + r"\b", f"ALTER TABLE {name}", stmt, flags=re.IGNORECASE))
+    # Let SQLite rewrite the definition, on a scratch copy.
+    scratch = "_partition_template"
+    conn.execute(re.sub(r"^\s*CREATE\s+TABLE\s+\w+", f"CREATE TEMP TABLE {scratch}", info["create_sql"],
+                        flags=re.IGNORECASE))
+    conn.execute(re.sub(r"ALTER\s+TABLE\s+" + table + r"\b", f"ALTER TABLE temp.{scratch}", stmt, flags=re.IGNORECASE))
+    create_sql = conn.execute("SELECT sql FROM sqlite_temp_master WHERE name = ?", (scratch,)).fetchone()[0]
+    columns = [row[1] for row in conn.execute(f"PRAGMA temp.table_info({scratch})")]
+    conn.execute(f"DROP TABLE temp.{scratch}")
+    conn.execute("UPDATE PartitionedTables SET create_sql = ?, columns = ? WHERE table_name = ?", (
+        re.sub(r"^\s*CREATE\s+TABLE\s+\w+", f"CREATE TABLE {table}", create_sql, flags=re.IGNORECASE),
+        ",".join(columns), table))
+    refresh_view(conn, table)
+
+
+def compact(conn, table, before):
+    """Merge ``table``'s monthly partitions of whole years before ``before`` (yyyymm) into one per year."""
+    info = _catalog(conn)[table]
+    columns = ", ".join(info["columns"])
+    years = {}
+    for name, lo, hi in partitions(conn, table):
+        if lo == hi and lo // 100 * 100 + 12 < before:
+            years.setdefault(lo // 100, []).append(name)
+    merged = []
+    with transaction(conn):
+        for year, parts in years.items():
+            # Archived months of the year would overlap the yearly partition.
+            if any(lo // 100 == year for _, lo, _ in partitions(conn, table, archived=True)):
+                continue
+            conn.executemany("DELETE FROM Partitions WHERE partition_name = ?", [(name,) for name in parts])
+            target = _create(conn, table, year * 100 + 1, year * 100 + 12, info)
+            for name in parts:
+                conn.execute(f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {name}")
+                conn.execute(f"DROP TABLE {name}")
+            merged.append(target)
+        if merged:
+            refresh_view(conn, table)
+    return merged
+
+
+def archive(conn, name, directory):
+    """Move partition ``name`` to its own file in ``directory`` and drop it from its view."""
+    table, archived = conn.execute("SELECT table_name, archive_path FROM Partitions WHERE partition_name = ?",
+                                   (name,)).fetchone() or (None, None)
+    if table is None or archived:
+        raise ValueError(f"{name} is not an online partition")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, f"{name}.db"))
+    if os.path.exists(path):
+        os.remove(path)
+    columns = ", ".join(_catalog(conn)[table]["columns"])
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        with transaction(conn):
+            conn.execute(f"CREATE TABLE archive.{name} AS SELECT {columns} FROM {name}")
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    with transaction(conn):
+        conn.execute(f"DROP TABLE {name}")
+        conn.execute("UPDATE Partitions SET archive_path = ? WHERE partition_name = ?", (path, name))
+        refresh_view(conn, table)
+        versions.bump(conn.cursor(), table)
+    return path
+
+
+def restore(conn, name):
+    """Bring archived partition ``name`` back into its view and delete its archive file."""
+    table, path = conn.execute("SELECT table_name, archive_path FROM Partitions WHERE partition_name = ?",
+                               (name,)).fetchone() or (None, None)
+    if not path:
+        raise ValueError(f"{name} is not an archived partition")
+    info = _catalog(conn)[table]
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        with transaction(conn):
+            first, last = conn.execute("SELECT first_month, last_month FROM Partitions WHERE partition_name = ?",
+                                       (name,)).fetchone()
+            conn.execute("DELETE FROM Partitions WHERE partition_name = ?", (name,))
+            _create(conn, table, first, last, info)
+            # Columns added since the partition was archived stay empty.
+            kept = [row[1] for row in conn.execute(f"PRAGMA archive.table_info({name})") if row[1] in info["columns"]]
+            conn.execute(f"INSERT INTO {name} ({', '.join(kept)}) SELECT {', '.join(kept)} FROM archive.{name}")
+            refresh_view(conn, table)
+            versions.bump(conn.cursor(), table)
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    os.remove(path)
+
+
+def main():
+    from care_stat import db
+
+    parser = argparse.ArgumentParser(description="Partition the local Care_Stat fact tables by month.")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--partition", action="store_true", help="split Payments, Visits, Appointments and "
+                        "Medical_Records into monthly partitions")
+    parser.add_argument("--compact-before", type=int, metavar="YYYYMM",
+                        help="merge monthly partitions older than this month into yearly ones")
+    parser.add_argument("--archive-before", type=int, metavar="YYYYMM",
+                        help="archive partitions that end before this month")
+    parser.add_argument("--archive-dir", default=os.path.join(db.ROOT_DIR, "archive"),
+                        help="where archived partitions are written (default: %(default)s)")
+    parser.add_argument("--restore", nargs="+", metavar="PARTITION", help="bring archived partitions back")
+    parser.add_argument("--list", action="store_true", help="list every partition")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db)
+    try:
+        if args.partition:
+            for table, n in partition(conn).items():
+                print(f"✅ {table} split into {n} monthly partitions")
+        for table in _catalog(conn):
+            if args.compact_before:
+                merged = compact(conn, table, args.compact_before)
+                print(f"✅ {table}: {len(merged)} yearly partitions" + (f" ({', '.join(merged)})" if merged else ""))
+            if args.archive_before:
+                for name, _, last in partitions(conn, table):
+                    if last < args.archive_before:
+                        print(f"✅ {name} archived to {archive(conn, name, args.archive_dir)}")
+        for name in args.restore or []:
+            restore(conn, name)
+            print(f"✅ {name} restored")
+        if args.list:
+            for table in _catalog(conn):
+                for name, lo, hi in partitions(conn, table):
+                    n = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                    print(f"   {name:<32} {lo}-{hi} {n:>10,} rows")
+                for name, lo, hi in partitions(conn, table, archived=True):
+                    path = conn.execute("SELECT archive_path FROM Partitions WHERE partition_name = ?",
+                                        (name,)).fetchone()[0]
+                    print(f"   {name:<32} {lo}-{hi}   archived in {path}")
+    except (ValueError, sqlite3.Error) as e:
+        raise SystemExit(f"❌ {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
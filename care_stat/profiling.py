@@ -0,0 +1,112 @@
+"""Opt-in timing of dashboard reruns.
+
+Turn it on with ``?profile=1`` in the URL or ``CARE_STAT_PROFILE=1``.  Code
+marks its steps with ``with section("groupby"):``; sections nest, so a
+``groupby`` inside the ``overview`` tab is recorded as ``overview/groupby``.
+When no profiler is active for the current script run, ``section`` does
+nothing, so the markers can stay in place permanently.
+"""
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+LOG_PATH = os.environ.get("CARE_STAT_PROFILE_LOG", "profile_log.jsonl")
+
+_current = contextvars.ContextVar("care_stat_profiler", default=None)
+
+
+def env_enabled():
+    return os.environ.get("CARE_STAT_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class RenderProfiler:
+    """Collects section timings, cache hits/misses and memory for one rerun."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.sections = {}
+        self.cache = {}
+        self.memory = {}
+        self._stack = []
+
+    @contextmanager
+    def section(self, name):
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            total, calls = self.sections.get(path, (0.0, 0))
+            self.sections[path] = (total + elapsed, calls + 1)
+
+    def record_cache(self, name, hit):
+        hits, misses = self.cache.get(name, (0, 0))
+        self.cache[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    def record_memory(self, name, nbytes):
+        self.memory[name] = int(nbytes)
+
+    def total_seconds(self):
+        return time.perf_counter() - self.started
+
+    def rows(self):
+        """Section table for display: (section, total ms, calls), slowest first."""
+        rows = [(name, total * 1000, calls) for name, (total, calls) in self.sections.items()]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def to_record(self, **extra):
+        record = {
+            "timestamp": self.timestamp,
+            "total_ms": round(self.total_seconds() * 1000, 3),
+            "sections": {name: {"ms": round(ms, 3), "calls": calls} for name, ms, calls in self.rows()},
+            "cache": {name: {"hits": h, "misses": m} for name, (h, m) in self.cache.items()},
+            "memory_bytes": self.memory,
+        }
+        record.update(extra)
+        return record
+
+
+def write_jsonl(record, path=None):
+    """Append one profile record to the JSON-lines log (``CARE_STAT_PROFILE_LOG``)."""
+    with open(path or LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def start(enabled):
+    """Begin a rerun: install a fresh profiler if ``enabled``, otherwise clear any old one."""
+    profiler = RenderProfiler() if enabled else None
+    _current.set(profiler)
+    return profiler
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def section(name):
+    profiler = _current.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.section(name):
+        yield
+
+
+def record_cache(name, hit):
+    profiler = _current.get()
+    if profiler is not None:
+        profiler.record_cache(name, hit)
+
+
+def record_memory(name, frame):
+    """Record the deep memory use of ``frame``; skipped (it is O(rows)) unless profiling."""
+    profiler = _current.get()
+    if profiler is not None and frame is not None:
+        profiler.record_memory(name, frame.memory_usage(deep=True).sum())
@@ -0,0 +1,323 @@
+"""Columnar replica of the local Care_Stat database for the heavy reports.
+
+The SQL_analysis reports and the analysis notebook scan whole tables, and
+running them against the database the loaders write to makes both wait on
+each other.  ``sync`` copies every table declared in Database/*.sql (except
+the small report summaries) into Parquet files under ``REPLICA_DIR``:
+
+    replica/Payments/month_key=202303/part.parquet    one file per month
+    replica/Doctors/part.parquet                      one file per other table
+
+Syncing is incremental.  Payments, Visits, Appointments and Medical_Records
+only ever get rows appended, so a month is copied again only when its row
+count changed since the last sync (a count per ``month_key`` is read from
+the month index, not the rows).  The other tables are small and are rewritten
+only when their contents hash differently.  Every file is written under a
+temporary name and renamed, so a report never reads a half-written month.
+
+The ``REPORTS`` run the SQL_analysis.sql queries on the replica with Arrow's
+vectorized group-by; ``read`` serves any other scan, reading only the
+requested columns and months.
+
+    python -m care_stat.replica --sync
+    python -m care_stat.replica --report monthly_revenue top_doctors_by_visits
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import pandas as pd
+
+from care_stat import datedim, db, partitions, rollups
+
+REPLICA_DIR = os.environ.get("CARE_STAT_REPLICA_DIR", os.path.join(db.ROOT_DIR, "replica"))
+STATE_FILE = "_state.json"
+PART_FILE = "part.parquet"
+# Hive's name for the partition of rows whose key is missing.
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def replicated_tables():
+    """Every table declared in Database/*.sql except the report summaries, in schema order."""
+    tables = []
+    for name in db.SCHEMA_FILES:
+        for stmt in db.tsql_to_sqlite(db.read_schema_file(name)):
+            created = re.match(r"CREATE\s+TABLE\s+(\w+)", stmt, re.IGNORECASE)
+            if created and created.group(1) not in rollups.SUMMARY_TABLES:
+                tables.append(created.group(1))
+    return tables
+
+
+def _read_state(directory):
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(directory, state):
+    path = os.path.join(directory, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+# === Arrow types from the declared SQL types ===
+
+def _arrow_type(declared):
+    import pyarrow as pa
+
+    declared = declared.upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("DECIMAL", "FLOAT", "REAL", "NUMERIC", "MONEY")):
+        return pa.float64()
+    if "DATE" in declared or "TIME" in declared:
+        return pa.timestamp("us")
+    if "BIT" in declared:
+        return pa.bool_()
+    return pa.string()
+
+
+def _schema(conn, table):
+    """Arrow schema of ``table``, so every month's file has the same column types."""
+    import pyarrow as pa
+
+    # A partitioned table's view has no declared types; its first partition has.
+    source = (partitions.names(conn, table) or [table])[0]
+    columns = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({source})")]
+    return pa.schema([(name, _arrow_type(declared)) for name, declared in columns
+                      if not (table in datedim.MONTH_KEY_SOURCES and name == partitions.KEY)])
+
+
+def _to_arrow(frame, schema):
+    import pyarrow as pa
+
+    frame = frame[schema.names].copy()
+    for field in schema:
+        if pa.types.is_timestamp(field.type):
+            frame[field.name] = pd.to_datetime(frame[field.name], errors="coerce")
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+def _write(table, path):
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+# === Sync ===
+
+def _month_dir(directory, table, month):
+    return os.path.join(directory, table, f"{partitions.KEY}={NULL_PARTITION if month is None else month}")
+
+
+def _sync_months(conn, directory, table, state):
+    """Copy the months of ``table`` whose row count changed; returns how many were copied or removed."""
+    counts = {str(month): n for month, n in conn.execute(
+        f"SELECT {partitions.KEY}, COUNT(*) FROM {table} GROUP BY {partitions.KEY}")}
+    known = state.get("months", {})
+    schema = _schema(conn, table)
+    changed = 0
+    for month, n in counts.items():
+        if known.get(month) == n:
+            continue
+        key = None if month == "None" else int(month)
+        where = f"{partitions.KEY} IS NULL" if key is None else f"{partitions.KEY} = ?"
+        rows = pd.read_sql_query(f"SELECT {', '.join(schema.names)} FROM {table} WHERE {where}", conn,
+                                 params=[] if key is None else [key])
+        _write(_to_arrow(rows, schema), os.path.join(_month_dir(directory, table, key), PART_FILE))
+        changed += 1
+
+    # Months gone from the database are dropped, except archived ones: the
+    # replica keeps serving them.
+    archived = partitions.partitions(conn, table, archived=True) if partitions.is_partitioned(conn, table) else []
+    for month in set(known) - set(counts):
+        key = None if month == "None" else int(month)
+        if key is not None and any(lo <= key <= hi for _, lo, hi in archived):
+            counts[month] = known[month]
+            continue
+        shutil.rmtree(_month_dir(directory, table, key), ignore_errors=True)
+        changed += 1
+    state["months"] = counts
+    return changed
+
+
+def _sync_whole(conn, directory, table, state):
+    """Rewrite ``table``'s file if its contents changed; returns 1 if it did."""
+    schema = _schema(conn, table)
+    rows = pd.read_sql_query(f"SELECT {', '.join(schema.names)} FROM {table}", conn)
+    digest = str(int(pd.util.hash_pandas_object(rows, index=False).sum()) if len(rows) else 0)
+    path = os.path.join(directory, table, PART_FILE)
+    if state.get("hash") == digest and state.get("rows") == len(rows) and os.path.exists(path):
+        return 0
+    _write(_to_arrow(rows, schema), path)
+    state.update(hash=digest, rows=len(rows))
+    return 1
+
+
+def sync(conn, directory=REPLICA_DIR, tables=None):
+    """Bring the replica in ``directory`` up to date with ``conn``; returns files changed per table.
+
+    The state is saved after each table, so an interrupted sync resumes
+    where it stopped.
+    """
+    os.makedirs(directory, exist_ok=True)
+    state = _read_state(directory)
+    changed = {}
+    for table in tables or replicated_tables():
+        table_state = state.setdefault(table, {})
+        if table in datedim.MONTH_KEY_SOURCES:
+            changed[table] = _sync_months(conn, directory, table, table_state)
+        else:
+            changed[table] = _sync_whole(conn, directory, table, table_state)
+        table_state["synced_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        _write_state(directory, state)
+    return changed
+
+
+# === Reading ===
+
+def read(table, columns=None, months=None, directory=REPLICA_DIR):
+    """``table`` from the replica as an Arrow table.
+
+    Only ``columns`` (default all) are read and, for the monthly tables, only
+    the files of ``months``, a ``(first, last)`` pair of yyyymm keys.
+    """
+    import pyarrow.dataset as ds
+
+    path = os.path.join(directory, table)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"{table} is not in the replica at {directory}; run with --sync first")
+    monthly = table in datedim.MONTH_KEY_SOURCES
+    dataset = ds.dataset(path, format="parquet", partitioning="hive" if monthly else None,
+                         exclude_invalid_files=True)
+    where = None
+    if months and monthly:
+        where = (ds.field(partitions.KEY) >= months[0]) & (ds.field(partitions.KEY) <= months[1])
+    return dataset.to_table(columns=columns, filter=where)
+
+
+def _top(frame, by, n=10, tie=None):
+    # Ties go to the smallest ``tie`` value, as in the SQL reports.
+    keys, ascending = ([by, tie], [False, True]) if tie else (by, False)
+    return frame.sort_values(keys, ascending=ascending, kind="stable").head(n).reset_index(drop=True)
+
+
+def revenue_totals(directory=REPLICA_DIR):
+    import pyarrow.compute as pc
+
+    payments = read("Payments", ["amount", "payment_date"], directory=directory)
+    return pd.DataFrame([{
+        "total_payments": payments.num_rows,
+        "total_revenue": pc.sum(payments["amount"]).as_py(),
+        "avg_payment": pc.mean(payments["amount"]).as_py(),
+        "first_payment": pc.min(payments["payment_date"]).as_py(),
+        "last_payment": pc.max(payments["payment_date"]).as_py(),
+    }])
+
+
+def monthly_revenue(directory=REPLICA_DIR):
+    payments = read("Payments", ["month_key", "amount"], directory=directory)
+    monthly = payments.group_by("month_key").aggregate([("amount", "sum"), ("amount", "count")]).to_pandas()
+    monthly = monthly.sort_values("month_key", ignore_index=True)
+    return pd.DataFrame({"year": monthly["month_key"] // 100, "month": monthly["month_key"] % 100,
+                         "monthly_revenue": monthly["amount_sum"], "payment_count": monthly["amount_count"]})
+
+
+def payment_methods(directory=REPLICA_DIR):
+    payments = read("Payments", ["method", "amount"], directory=directory)
+    methods = payments.group_by("method").aggregate(
+        [("amount", "count"), ("amount", "sum"), ("amount", "mean")]).to_pandas().rename(
+        columns={"amount_count": "count", "amount_sum": "total_amount", "amount_mean": "avg_amount"})
+    return _top(methods[["method", "count", "total_amount", "avg_amount"]], "count", len(methods))
+
+
+def top_doctors_by_visits(directory=REPLICA_DIR):
+    # Visits has no doctor_id; a doctor's visits are their appointments, as in
+    # care_stat.rollups.
+    visits = read("Appointments", ["doctor_id"], directory=directory).group_by("doctor_id").aggregate(
+        [("doctor_id", "count")]).to_pandas().rename(columns={"doctor_id_count": "total_visits"})
+    doctors = read("Doctors", ["doctor_id", "first_name", "last_name", "specialization", "rating_avg", "salary"],
+                   directory=directory).to_pandas()
+    top = _top(visits, "total_visits", tie="doctor_id").merge(doctors, on="doctor_id")
+    top["doctor_name"] = top["first_name"] + " " + top["last_name"]
+    return top[["doctor_id", "doctor_name", "specialization", "total_visits", "rating_avg", "salary"]]
+
+
+def repeat_patients(directory=REPLICA_DIR):
+    visits = read("Visits", ["patient_id"], directory=directory).group_by("patient_id").aggregate(
+        [("patient_id", "count")]).to_pandas().rename(columns={"patient_id_count": "total_visits"})
+    patients = read("Patients", ["patient_id", "first_name", "last_name", "age", "gender"],
+                    directory=directory).to_pandas()
+    top = _top(visits[visits["total_visits"] > 1], "total_visits", tie="patient_id").merge(patients, on="patient_id")
+    top["patient_name"] = top["first_name"] + " " + top["last_name"]
+    return top[["patient_id", "patient_name", "age", "gender", "total_visits"]]
+
+
+def department_doctor_counts(directory=REPLICA_DIR):
+    links = read("DoctorDepartment", ["department_id", "doctor_id"], directory=directory)
+    departments = read("Departments", ["department_id", "department_name"], directory=directory)
+    counts = links.join(departments, "department_id").group_by("department_name").aggregate(
+        [("doctor_id", "count")]).to_pandas().rename(columns={"doctor_id_count": "doctor_count"})
+    return _top(counts[["department_name", "doctor_count"]], "doctor_count", len(counts))
+
+
+def new_patients_per_month(directory=REPLICA_DIR):
+    firsts = read("Visits", ["patient_id", "month_key"], directory=directory).group_by("patient_id").aggregate(
+        [("month_key", "min")])
+    months = firsts.group_by("month_key_min").aggregate([("patient_id", "count")]).to_pandas()
+    months = months.sort_values("month_key_min", ignore_index=True)
+    return pd.DataFrame({"year": months["month_key_min"] // 100, "month": months["month_key_min"] % 100,
+                         "new_patients": months["patient_id_count"]})
+
+
+# Named like the SQL_analysis.sql queries in care_stat.sqlbench.
+REPORTS = {
+    "revenue_totals": revenue_totals,
+    "monthly_revenue": monthly_revenue,
+    "payment_methods": payment_methods,
+    "top_doctors_by_visits": top_doctors_by_visits,
+    "repeat_patients": repeat_patients,
+    "department_doctor_counts": department_doctor_counts,
+    "new_patients_per_month": new_patients_per_month,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a columnar (Parquet) replica of the local Care_Stat database.")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--dir", default=REPLICA_DIR, help="replica directory (default: %(default)s)")
+    parser.add_argument("--sync", action="store_true", help="copy what changed since the last sync")
+    parser.add_argument("--report", nargs="+", choices=sorted(REPORTS), default=[],
+                        help="run these reports on the replica")
+    args = parser.parse_args()
+
+    if args.sync:
+        conn = db.connect(args.db)
+        start = time.perf_counter()
+        changed = sync(conn, args.dir)
+        conn.close()
+        for table, n in changed.items():
+            if n:
+                print(f"   {table:<22} {n:>5} files")
+        print(f"✅ Replica in {args.dir} synced in {time.perf_counter() - start:.2f}s "
+              f"({sum(changed.values())} files changed)")
+    for name in args.report:
+        start = time.perf_counter()
+        try:
+            result = REPORTS[name](args.dir)
+        except FileNotFoundError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"\n-- {name} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
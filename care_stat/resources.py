@@ -0,0 +1,106 @@
+"""Data shared by every dashboard session, configured from the environment.
+
+The shared datasets and sketch cubes live here rather than in app.py so the
+server can build them before the first visitor arrives (see
+care_stat/startup.py): ``st.cache_resource`` keys on the function, so a
+cube built by the warm-up thread is the one every session then reads.
+pandas and the sketches are imported on first use, not with this module.
+"""
+import logging
+import os
+
+import streamlit as st
+
+# "csv" reads Care_stat.parquet or Care_stat.csv into memory; "sqlite" pushes every filter and
+# group-by down to the local Care_Stat database (see care_stat/db.py).
+DATA_SOURCE = os.environ.get("CARE_STAT_SOURCE", "csv").lower()
+
+# Seconds between checks of Care_stat.csv for new or changed rows.
+RELOAD_TTL = float(os.environ.get("CARE_STAT_RELOAD_TTL", "60"))
+# Typed frames are snapshotted here so a restart maps them instead of
+# re-parsing the CSV; set CARE_STAT_SNAPSHOT_DIR="" to turn this off.
+SNAPSHOT_DIR = os.environ.get("CARE_STAT_SNAPSHOT_DIR", ".care_stat_snapshots")
+# Distinct counts: "exact" (nunique), "approx" (HyperLogLog) or "auto", which
+# switches to HyperLogLog once a tab's data reaches APPROX_MIN_ROWS rows.
+DISTINCT_MODE = os.environ.get("CARE_STAT_DISTINCT", "auto").lower()
+# Most-common values and the top-10 chart: same choices, read from
+# Space-Saving summaries instead of value_counts() over the filtered rows.
+TOPK_MODE = os.environ.get("CARE_STAT_TOPK", "auto").lower()
+APPROX_MIN_ROWS = int(os.environ.get("CARE_STAT_APPROX_MIN_ROWS", "1000000"))
+# Exploratory charts from a stratified sample of SAMPLE_SIZE rows per stratum:
+# "exact" (off), "approx" (always) or "auto" (from APPROX_MIN_ROWS rows).
+# KPIs are always computed from the full data.
+SAMPLE_MODE = os.environ.get("CARE_STAT_SAMPLE", "exact").lower()
+SAMPLE_SIZE = int(os.environ.get("CARE_STAT_SAMPLE_SIZE", "20000"))
+
+CUBE_KINDS = ("distinct", "top", "revenue", "sample")
+
+# Logs a warning for every cached call made outside a script run.
+CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+
+def quiet_outside_script_runs(thread_prefix):
+    """Drop that warning for threads whose name starts with ``thread_prefix``."""
+    logging.getLogger(CONTEXT_LOGGER).addFilter(lambda record: not record.threadName.startswith(thread_prefix))
+
+
+def data_path():
+    """The dashboard's data file, ``CARE_STAT_CSV``; read on every call, so a new setting takes effect.
+
+    Unset, it is Care_stat.parquet (the widetable build) if that exists, else Care_stat.csv.
+    """
+    default = "Care_stat.parquet" if os.path.exists("Care_stat.parquet") else "Care_stat.csv"
+    return os.environ.get("CARE_STAT_CSV", default)
+
+
+def csv_dataset(columns):
+    return _csv_dataset(data_path(), columns)
+
+
+@st.cache_resource
+def _csv_dataset(path, columns):
+    # One copy per file and column set shared by every session (cache_resource
+    # hands out the object itself, where cache_data would unpickle a private
+    # copy per call).  refresh() parses only rows appended since the last check.
+    from care_stat.dashboard import prepare_frame
+    from care_stat.datafile import IncrementalCSV
+    return IncrementalCSV(path, columns, prepare_frame, ttl=RELOAD_TTL, snapshot_dir=SNAPSHOT_DIR or None)
+
+
+@st.cache_resource
+def sketch_cube(kind, tab):
+    # Sketches per filter cell, rebuilt on reload and extended on append by the
+    # tab's shared dataset; not built at all in exact mode.
+    # The revenue rollup is exact, so it is always kept.
+    from care_stat.dashboard import (DISTINCT_CUBES, HEAVY_HITTER_CUBES, REVENUE_ROLLUPS, SAMPLE_STRATA,
+                                      TAB_COLUMNS)
+    from care_stat.sketches import DistinctCube, HeavyHitterCube, RevenueRollup, StratifiedSample
+    mode, specs, cube_class = {
+        "distinct": (DISTINCT_MODE, DISTINCT_CUBES, DistinctCube),
+        "top": (TOPK_MODE, HEAVY_HITTER_CUBES, HeavyHitterCube),
+        "revenue": ("approx", REVENUE_ROLLUPS, RevenueRollup),
+        "sample": (SAMPLE_MODE, {tab: (SAMPLE_STRATA[tab], SAMPLE_SIZE) for tab in SAMPLE_STRATA}, StratifiedSample),
+    }[kind]
+    if mode == "exact" or tab not in specs:
+        return None
+    cube = cube_class(*specs[tab], min_rows=0 if mode == "approx" else APPROX_MIN_ROWS)
+    csv_dataset(tuple(TAB_COLUMNS[tab])).add_listener(cube)
+    return cube
+
+
+def dataset_frame(columns):
+    """Up-to-date rows of ``columns`` for code running outside a script run."""
+    dataset = csv_dataset(tuple(columns))
+    dataset.refresh()
+    return dataset.view()
+
+
+def warm():
+    """Load every tab's data and build its cubes, as the first visits would."""
+    if DATA_SOURCE == "sqlite":
+        return
+    from care_stat.dashboard import TAB_COLUMNS
+    for tab, columns in TAB_COLUMNS.items():
+        csv_dataset(tuple(columns)).refresh()
+        for kind in CUBE_KINDS:
+            sketch_cube(kind, tab)
@@ -0,0 +1,190 @@
+"""Summary tables behind the SQL_analysis reports, kept up to date by the loaders.
+
+The revenue, payment-method, doctor and patient-visit and new-patient reports
+used to aggregate all of Payments, Visits and Appointments on every run.  They
+now read these tables (see SQL_analysis/SQL_summary_reports.sql), declared in
+Database/Report_Summaries_data.sql:
+
+- ``RevenueMonthly``: payments, revenue and first/last payment per
+  (year, month, method, payment_status).
+- ``DoctorVisits``: visits per doctor, with the doctor's specialization.
+  Visits carries no doctor, so a doctor's visits are counted from their
+  appointments; doctors loaded after their appointments get their
+  specialization filled in then.
+- ``PatientVisits``: visits and first visit date per patient.
+- ``NewPatientsMonthly``: patients per month of their first visit.  Patients
+  has no admission date; a patient counts as new when first seen.
+
+Every loader calls ``apply`` with the rows it has just inserted, before it
+commits, so the summaries change in the same transaction as the rows they
+count.  Only the new rows are aggregated, and the summary rows they touch are
+updated in place, so a load costs the same however much history there is.
+The SQL is plain UPDATE / INSERT ... WHERE NOT EXISTS with ``?`` parameters,
+which both SQL Server (pyodbc) and the local SQLite copy accept.
+
+``rebuild`` recomputes every summary from the base tables, for databases
+that were loaded before the summaries existed or bulk-loaded around them.
+"""
+import pandas as pd
+
+SUMMARY_TABLES = ("RevenueMonthly", "DoctorVisits", "PatientVisits", "NewPatientsMonthly")
+
+# SQL Server allows 2100 parameters per statement.
+LOOKUP_BATCH = 1000
+REBUILD_CHUNK_ROWS = 500_000
+
+
+def _native(value):
+    # pyodbc only binds Python's own types, not numpy scalars.
+    return value.item() if hasattr(value, "item") else value
+
+
+def _merge(cursor, table, keys, rows, sets):
+    """Fold ``rows`` (one per key) into ``table``.
+
+    ``sets`` maps each value column to its update expression, written with
+    ``{col}`` for the column and ``?`` for the new value (used as many times
+    as it appears).  Existing keys are updated, the rest inserted.
+    """
+    if rows.empty:
+        return
+    columns = list(sets)
+    where = " AND ".join(f"{key} = ?" for key in keys)
+    assignments = [sets[col].format(col=col) for col in columns]
+    uses = [expr.count("?") for expr in assignments]
+    update = f"UPDATE {table} SET {', '.join(f'{c} = {e}' for c, e in zip(columns, assignments))} WHERE {where}"
+    insert = (f"INSERT INTO {table} ({', '.join(keys + columns)}) "
+              f"SELECT {', '.join('?' * (len(keys) + len(columns)))} "
+              f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {where})")
+    records = [tuple(_native(v) for v in row) for row in rows[keys + columns].itertuples(index=False, name=None)]
+    cursor.executemany(update, [
+        tuple(v for value, n in zip(rec[len(keys):], uses) for v in [value] * n) + rec[:len(keys)]
+        for rec in records
+    ])
+    cursor.executemany(insert, [rec + rec[:len(keys)] for rec in records])
+
+
+def _fetch(cursor, sql, ids):
+    """Run ``sql`` (ending in ``IN ({marks})``) for ``ids`` in batches; returns all rows."""
+    rows = []
+    for start in range(0, len(ids), LOOKUP_BATCH):
+        batch = ids[start:start + LOOKUP_BATCH]
+        cursor.execute(sql.format(marks=", ".join("?" * len(batch))), batch)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def _year_month(dates):
+    return pd.DataFrame({"year": dates.dt.year, "month": dates.dt.month})
+
+
+def apply_payments(cursor, rows):
+    payments = rows[["method", "payment_status", "amount", "payment_date"]].dropna()
+    dates = pd.to_datetime(payments["payment_date"])
+    cells = pd.concat([_year_month(dates), payments[["method", "payment_status"]]], axis=1)
+    keys = list(cells.columns)
+    cells["amount"] = payments["amount"].astype(float)
+    cells["stamp"] = dates.dt.strftime("%Y-%m-%d %H:%M:%S")
+    delta = cells.groupby(keys).agg(payment_count=("amount", "size"), revenue=("amount", "sum"),
+                                    first_payment=("stamp", "min"), last_payment=("stamp", "max")).reset_index()
+    _merge(cursor, "RevenueMonthly", keys, delta, {
+        "payment_count": "{col} + ?",
+        "revenue": "{col} + ?",
+        "first_payment": "CASE WHEN {col} <= ? THEN {col} ELSE ? END",
+        "last_payment": "CASE WHEN {col} >= ? THEN {col} ELSE ? END",
+    })
+
+
+def apply_appointments(cursor, rows):
+    delta = rows["doctor_id"].dropna().astype("int64").value_counts().rename_axis("doctor_id").reset_index(
+        name="visit_count")
+    specializations = dict(_fetch(cursor, "SELECT doctor_id, specialization FROM Doctors WHERE doctor_id IN ({marks})",
+                                  [int(d) for d in delta["doctor_id"]]))
+    delta["specialization"] = delta["doctor_id"].map(specializations).astype(object)
+    delta["specialization"] = delta["specialization"].where(delta["specialization"].notna(), None)
+    _merge(cursor, "DoctorVisits", ["doctor_id"], delta,
+           {"visit_count": "{col} + ?", "specialization": "?"})
+
+
+def fill_specializations(cursor):
+    """Copy each doctor's specialization into DoctorVisits rows counted before it was kept there."""
+    cursor.execute(
+        "UPDATE DoctorVisits SET specialization ="
+        " (SELECT d.specialization FROM Doctors d WHERE d.doctor_id = DoctorVisits.doctor_id)"
+        " WHERE specialization IS NULL"
+    )
+
+
+def apply_doctors(cursor, rows):
+    doctors = rows[["doctor_id", "specialization"]].dropna()
+    if doctors.empty:
+        return
+    cursor.executemany("UPDATE DoctorVisits SET specialization = ? WHERE doctor_id = ?",
+                       [(_native(spec), _native(doctor)) for doctor, spec in doctors.itertuples(index=False)])
+
+
+def apply_visits(cursor, rows):
+    visits = rows[["patient_id", "visit_date"]].dropna()
+    visits = pd.DataFrame({"patient_id": visits["patient_id"].astype("int64"),
+                           "visit_date": pd.to_datetime(visits["visit_date"]).dt.strftime("%Y-%m-%d")})
+    delta = visits.groupby("patient_id").agg(visit_count=("visit_date", "size"),
+                                             first_visit=("visit_date", "min")).reset_index()
+    if delta.empty:
+        return
+
+    # A patient is new in the month of their first visit: count first-time
+    # patients there, and move patients whose new visits predate their first.
+    known = _fetch(cursor, "SELECT patient_id, first_visit FROM PatientVisits WHERE patient_id IN ({marks})",
+                   [int(pid) for pid in delta["patient_id"]])
+    previous = pd.Series({int(pid): str(first)[:10] for pid, first in known}, dtype=object)
+    before = pd.to_datetime(delta["patient_id"].map(previous))
+    first = pd.to_datetime(delta["first_visit"])
+    moved = first < before
+    arrivals = first[before.isna() | moved]
+    departures = before[moved]
+    months = pd.concat([_year_month(arrivals).assign(new_patients=1),
+                        _year_month(departures).assign(new_patients=-1)])
+    months = months.groupby(["year", "month"])["new_patients"].sum().reset_index()
+
+    _merge(cursor, "PatientVisits", ["patient_id"], delta, {
+        "visit_count": "{col} + ?",
+        "first_visit": "CASE WHEN {col} <= ? THEN {col} ELSE ? END",
+    })
+    _merge(cursor, "NewPatientsMonthly", ["year", "month"], months[months["new_patients"] != 0],
+           {"new_patients": "{col} + ?"})
+
+
+# Base table -> function folding newly inserted rows into its summaries.
+MAINTAINERS = {
+    "Payments": apply_payments,
+    "Appointments": apply_appointments,
+    "Visits": apply_visits,
+    "Doctors": apply_doctors,
+}
+BASE_COLUMNS = {
+    "Payments": ["method", "payment_status", "amount", "payment_date"],
+    "Appointments": ["doctor_id"],
+    "Visits": ["patient_id", "visit_date"],
+    "Doctors": ["doctor_id", "specialization"],
+}
+
+
+def apply(cursor, table, rows):
+    """Add ``rows`` (a DataFrame), just inserted into ``table``, to its summaries; the caller commits."""
+    if table in MAINTAINERS and len(rows):
+        MAINTAINERS[table](cursor, rows)
+
+
+def rebuild(conn, chunk_rows=REBUILD_CHUNK_ROWS):
+    """Recompute every summary table from the base tables, in one transaction."""
+    cursor = conn.cursor()
+    try:
+        for table in SUMMARY_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        for table, columns in BASE_COLUMNS.items():
+            for chunk in pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table}", conn, chunksize=chunk_rows):
+                apply(cursor, table, chunk)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,426 @@
+"""Mergeable sketches that answer dashboard KPIs without touching raw rows.
+
+``HyperLogLog`` estimates the number of distinct values in a column,
+``SpaceSaving`` keeps the most frequent values with their counts and
+``TDigest`` estimates quantiles.  The cubes
+keep one sketch per filter cell (one combination of the tab's filter values)
+and merge the cells a selection covers, so a KPI costs the same whether the
+frame has a thousand rows or a hundred million.  ``RevenueRollup`` keeps exact
+daily totals per cell the same way, for time series over any date range.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+def hash_values(series):
+    """64-bit hashes of the non-null values of ``series`` (value-based, so categoricals hash like strings)."""
+    return pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy()
+
+
+def _bit_length(values):
+    """Exact bit length of uint64 values (float64 alone would round the top 11 bits)."""
+    high = values >> np.uint64(11)
+    low = values & np.uint64(0x7FF)
+    high_bits = np.frexp(high.astype(np.float64))[1]
+    low_bits = np.frexp(low.astype(np.float64))[1]
+    return np.where(high > 0, high_bits + 11, low_bits)
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2**p one-byte registers.
+
+    The typical (one standard deviation) relative error is ``1.04 / sqrt(2**p)``:
+    about 1.6% for the default p=12, in 4 KB of registers.
+    """
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes << np.uint64(self.p)
+        rank = np.where(rest == 0, 64 - self.p + 1, 64 - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def add(self, series):
+        self.add_hashes(hash_values(series))
+
+    def merge(self, other):
+        return HyperLogLog(self.p, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        return estimate_registers(self.registers)
+
+
+def estimate_registers(registers):
+    """HyperLogLog estimate for one register array, with linear counting for small sets."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+class SpaceSaving:
+    """Mergeable top-k summary: the ``k`` most frequent values and their counts.
+
+    While at most ``k`` distinct values have been seen the counts are exact.
+    Past that, the summary keeps the ``k`` largest counts after every update or
+    merge and adds the largest count it dropped to ``error``, so any value's
+    count is low by at most ``error``.
+    """
+
+    def __init__(self, k=64, counts=None, error=0):
+        self.k = k
+        self.counts = pd.Series(dtype="int64") if counts is None else counts
+        self.error = error
+
+    def add(self, series):
+        counts = series.value_counts(sort=False)
+        counts = counts[counts > 0]
+        counts.index = pd.Index(counts.index.to_numpy())
+        merged = SpaceSaving.combine([self, SpaceSaving(self.k, counts)], self.k)
+        self.counts, self.error = merged.counts, merged.error
+
+    @staticmethod
+    def combine(summaries, k):
+        summaries = [s for s in summaries if len(s.counts)]
+        error = sum(s.error for s in summaries)
+        if not summaries:
+            return SpaceSaving(k, error=error)
+        total = pd.concat([s.counts for s in summaries]).groupby(level=0, sort=False).sum()
+        total = total.sort_values(ascending=False, kind="stable")
+        if len(total) > k:
+            error += int(total.iloc[k])
+            total = total.iloc[:k]
+        return SpaceSaving(k, total, error)
+
+    def top(self, n=None):
+        return self.counts if n is None else self.counts.iloc[:n]
+
+
+class TDigest:
+    """Mergeable quantile sketch of at most about ``delta`` weighted centroids.
+
+    Centroids are narrow near the tails and wide around the median, so
+    extreme quantiles stay accurate.  Digests built over separate parts of the
+    data can be merged and queried as one.
+    """
+
+    def __init__(self, delta=100):
+        self.delta = delta
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        merged = TDigest(self.delta)
+        merged.min, merged.max = min(self.min, other.min), max(self.max, other.max)
+        merged._compress(np.concatenate([self.means, other.means]),
+                         np.concatenate([self.weights, other.weights]))
+        return merged
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        # Arcsine scale: equal steps in k are small steps in q near 0 and 1.
+        cluster = np.floor(self.delta * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.intp)
+        w = np.bincount(cluster, weights=weights)
+        m = np.bincount(cluster, weights=weights * means)
+        keep = w > 0
+        self.weights, self.means = w[keep], m[keep] / w[keep]
+
+    def quantile(self, qs):
+        """Estimated quantiles ``qs`` (scalars or an array in [0, 1])."""
+        if len(self.weights) == 0:
+            return np.full(np.shape(qs), np.nan)
+        centers = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return np.interp(qs, np.concatenate(([0.0], centers, [1.0])),
+                         np.concatenate(([self.min], self.means, [self.max])))
+
+
+class _FilterCube:
+    """Sketches kept for every combination of ``dims`` values.
+
+    Used as an ``IncrementalCSV`` listener: a full reload rebuilds the cube and
+    appended rows are added to their cells.  Below ``min_rows`` rows the cube
+    stays empty (``ready`` is False) and callers compute from the frame instead.
+    Sessions read the cube while it is updated, so an update builds a new
+    ``cells`` dict, copying the cells it changes, and publishes it with one
+    assignment; a reader sees either the old cube or the new one.
+    """
+
+    def __init__(self, dims, min_rows=0):
+        self.dims = list(dims)
+        self.min_rows = min_rows
+        self.cells = None
+
+    @property
+    def ready(self):
+        return self.cells is not None
+
+    def __call__(self, frame, new_rows):
+        if new_rows is None or self.cells is None:
+            self.cells = self._added({}, frame) if len(frame) >= self.min_rows else None
+        else:
+            self.cells = self._added(self.cells, new_rows)
+
+    def _added(self, cells, rows):
+        """A copy of ``cells`` with ``rows`` added; ``cells`` itself is left unchanged."""
+        cells = dict(cells)
+        groups = rows.groupby(self.dims, observed=True, dropna=False, sort=False).indices
+        for cell, positions in groups.items():
+            cell = cell if isinstance(cell, tuple) else (cell,)
+            if cell in cells:
+                sketches = {name: copy.copy(sketch) for name, sketch in cells[cell].items()}
+            else:
+                sketches = self._new_cell()
+            self._add_to_cell(sketches, rows.iloc[positions])
+            cells[cell] = sketches
+        return cells
+
+    def _matching(self, filters, cells=None):
+        wanted = [(i, filters.get(dim)) for i, dim in enumerate(self.dims)]
+        wanted = [(i, value) for i, value in wanted if value is not None and value != "All"]
+        for cell, sketches in (self.cells if cells is None else cells).items():
+            if all(cell[i] == value for i, value in wanted):
+                yield cell, sketches
+
+    def distinct_dim(self, dim, filters):
+        """Exact number of distinct values of one of the cube's own dimensions."""
+        i = self.dims.index(dim)
+        return len({cell[i] for cell, _ in self._matching(filters) if not pd.isna(cell[i])})
+
+
+class DistinctCube(_FilterCube):
+    """HyperLogLog sketches of ``metrics`` for every combination of ``dims`` values."""
+
+    def __init__(self, dims, metrics, p=12, min_rows=0):
+        super().__init__(dims, min_rows)
+        self.metrics = list(metrics)
+        self.p = p
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(1 << self.p)
+
+    def _new_cell(self):
+        return {metric: np.zeros(1 << self.p, dtype=np.uint8) for metric in self.metrics}
+
+    def _add_to_cell(self, sketches, rows):
+        for metric in self.metrics:
+            HyperLogLog(self.p, sketches[metric]).add(rows[metric])
+
+    def estimate(self, metric, filters):
+        """Approximate ``nunique`` of ``metric`` over the rows matching ``filters``."""
+        registers = [sketches[metric] for _, sketches in self._matching(filters)]
+        if not registers:
+            return 0
+        return estimate_registers(np.maximum.reduce(registers))
+
+
+class HeavyHitterCube(_FilterCube):
+    """``SpaceSaving`` summaries of ``columns`` for every combination of ``dims`` values."""
+
+    def __init__(self, dims, columns, k=64, min_rows=0):
+        super().__init__(dims, min_rows)
+        self.columns = list(columns)
+        self.k = k
+
+    def _new_cell(self):
+        return {"rows": 0, **{col: SpaceSaving(self.k) for col in self.columns}}
+
+    def _add_to_cell(self, sketches, rows):
+        sketches["rows"] += len(rows)
+        for col in self.columns:
+            sketches[col].add(rows[col])
+
+    def top(self, column, filters, n=None):
+        """Most frequent values of ``column`` for ``filters`` as a ``count_by``-style frame.
+
+        Returns ``(frame, relative_error)``, where the error bounds how far any
+        count may be low as a fraction of the matching rows (0.0 when exact).
+        """
+        cells = [sketches for _, sketches in self._matching(filters)]
+        merged = SpaceSaving.combine([c[column] for c in cells], self.k)
+        rows = sum(c["rows"] for c in cells)
+        counts = merged.top(n)
+        frame = pd.DataFrame({column: counts.index.to_numpy(), "count": counts.to_numpy()})
+        return frame, (merged.error / rows if rows else 0.0)
+
+
+class _DailyTotals:
+    """One published state of a ``RevenueRollup``: its day axis, the cells' daily arrays and their prefix sums."""
+
+    def __init__(self, day0, days, cells):
+        self.day0 = day0
+        self.days = days
+        self.cells = cells
+        self.prefix = {}
+
+
+class RevenueRollup(_FilterCube):
+    """Daily sums of ``value`` by ``date`` for every combination of ``dims`` values.
+
+    Each cell holds one array of daily totals over a shared day axis.  A query
+    adds up the arrays of the matching cells once, keeps the running (prefix)
+    sum, and then answers any date range at day, week or month grain with two
+    lookups per bucket, so changing the range or the resolution never scans
+    rows.  The day axis, the arrays and the cached prefix sums change together,
+    so each update replaces ``state`` as a whole and each query reads it once.
+    """
+
+    def __init__(self, dims, date, value, min_rows=0):
+        super().__init__(dims, min_rows)
+        self.date = date
+        self.value = value
+        self.state = None
+
+    @property
+    def ready(self):
+        return self.state is not None
+
+    def __call__(self, frame, new_rows):
+        if new_rows is None or self.state is None:
+            self.state = self._added(_DailyTotals(None, 0, {}), frame) if len(frame) >= self.min_rows else None
+        else:
+            self.state = self._added(self.state, new_rows)
+
+    def _added(self, state, rows):
+        """A new state with ``rows`` added to ``state``, which is left unchanged."""
+        rows = rows[rows[self.date].notna()]
+        if rows.empty:
+            return state
+        dates = rows[self.date].to_numpy().astype("datetime64[D]")
+        lo, hi = dates.min(), dates.max()
+        day0 = lo if state.day0 is None else min(state.day0, lo)
+        before = 0 if state.day0 is None else int((state.day0 - day0).astype(np.int64))
+        days = max(before + state.days, int((hi - day0).astype(np.int64)) + 1)
+        if days == state.days:
+            cells = dict(state.cells)
+        else:
+            cells = {cell: np.pad(daily, (before, days - before - state.days)) for cell, daily in state.cells.items()}
+        index = (dates - day0).astype(np.int64)
+        values = rows[self.value].to_numpy(dtype=np.float64, na_value=0.0)
+        groups = rows.groupby(self.dims, observed=True, dropna=False, sort=False).indices
+        for cell, positions in groups.items():
+            cell = cell if isinstance(cell, tuple) else (cell,)
+            daily = np.bincount(index[positions], weights=values[positions], minlength=days)
+            cells[cell] = cells[cell] + daily if cell in cells else daily
+        return _DailyTotals(day0, days, cells)
+
+    def bounds(self):
+        """First and last day with data, as ``datetime.date``, or None when empty."""
+        state = self.state
+        if state is None or state.day0 is None:
+            return None
+        return state.day0.astype(object), (state.day0 + state.days - 1).astype(object)
+
+    def prefix(self, filters, state=None):
+        """Running totals for ``filters``: ``prefix[i]`` is the sum over the first ``i`` days."""
+        state = self.state if state is None else state
+        key = tuple(filters.get(dim, "All") for dim in self.dims)
+        if key not in state.prefix:
+            daily = np.zeros(state.days)
+            for _, cell_daily in self._matching(filters, state.cells):
+                daily = daily + cell_daily
+            state.prefix[key] = np.concatenate(([0.0], np.cumsum(daily)))
+        return state.prefix[key]
+
+    def series(self, filters, start=None, end=None, grain="month"):
+        """Totals per ``grain`` bucket between ``start`` and ``end`` (inclusive) as (period, value)."""
+        # Imported here: care_stat.dashboard imports this module through care_stat.summaries.
+        from care_stat.dashboard import GRAINS
+        state = self.state
+        if state is None or state.day0 is None:
+            return None
+        last = state.day0 + state.days - 1
+        start = state.day0 if start is None else max(np.datetime64(start, "D"), state.day0)
+        end = last if end is None else min(np.datetime64(end, "D"), last)
+        if start > end:
+            return None
+        periods = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq=GRAINS[grain])
+        first = np.maximum(periods.start_time.to_numpy().astype("datetime64[D]"), start)
+        stop = np.minimum(periods.end_time.to_numpy().astype("datetime64[D]"), end)
+        prefix = self.prefix(filters, state)
+        totals = prefix[(stop - state.day0).astype(np.int64) + 1] - prefix[(first - state.day0).astype(np.int64)]
+        labels = periods.strftime("%Y-%m") if grain == "month" else pd.DatetimeIndex(periods.start_time).strftime("%Y-%m-%d")
+        return pd.DataFrame({"period": np.asarray(labels), self.value: totals})
+
+
+class StratifiedSample:
+    """Uniform sample of up to ``size`` rows for every value of ``stratum``.
+
+    Every row gets a random key and each stratum keeps the ``size`` rows with
+    the smallest keys (bottom-k sampling), so appended rows are merged in by
+    keying them and keeping the smallest keys again: no old rows are re-read.
+    Each sampled row carries ``_weight``, the number of rows it stands for.
+    Like the cubes, it is an ``IncrementalCSV`` listener and stays empty below
+    ``min_rows`` rows.
+    """
+
+    def __init__(self, stratum, size=20000, min_rows=0, seed=0):
+        self.stratum = stratum
+        self.size = size
+        self.min_rows = min_rows
+        self.rng = np.random.default_rng(seed)
+        self.frame = None
+        self.seen = None
+
+    @property
+    def ready(self):
+        return self.frame is not None
+
+    def __call__(self, frame, new_rows):
+        if new_rows is None or self.frame is None:
+            self.frame, self.seen = None, None
+            if len(frame) >= self.min_rows:
+                self._add(frame)
+        else:
+            self._add(new_rows)
+
+    def _add(self, rows):
+        seen = rows.groupby(self.stratum, observed=True, dropna=False).size()
+        keyed = rows.assign(_key=self.rng.random(len(rows)))
+        if self.frame is None:
+            pool, self.seen = keyed, seen
+        else:
+            pool = pd.concat([self.frame.drop(columns="_weight"), keyed], ignore_index=True)
+            self.seen = self.seen.add(seen, fill_value=0)
+            # concat turns categoricals with different categories into objects.
+            for col in keyed.columns:
+                if isinstance(keyed[col].dtype, pd.CategoricalDtype):
+                    pool[col] = pool[col].astype("category")
+        kept = pool.sort_values("_key").groupby(self.stratum, observed=True, dropna=False).head(self.size)
+        counts = kept.groupby(self.stratum, observed=True, dropna=False)[self.stratum].transform("size")
+        weights = kept[self.stratum].map(self.seen).astype(np.float64) / counts
+        self.frame = kept.assign(_weight=weights.to_numpy()).reset_index(drop=True)
+
+    def rows(self):
+        """Number of sampled rows."""
+        return 0 if self.frame is None else len(self.frame)
@@ -0,0 +1,442 @@
+"""Benchmarks the SQL_analysis.sql queries on synthetic Care_Stat loads.
+
+The queries are read from SQL_analysis/SQL_analysis.sql, named after the
+comment above each one and translated from T-SQL to SQLite.  For every scale
+in ``--rows`` a temporary database is filled with that many payments (and
+proportionate visits, records, appointments, patients and doctors), the
+secondary indexes from Database/*.sql are built, and every query is timed
+and its ``EXPLAIN QUERY PLAN`` recorded.
+
+    python -m care_stat.sqlbench --rows 10000 100000 1000000 --save-baseline
+    python -m care_stat.sqlbench --rows 10000 100000 1000000
+
+The first command stores the results as the baseline (``--baseline``, by
+default SQL_analysis/sqlbench_baseline.json); later runs are compared with
+it, and a query is flagged when it got more than ``--threshold`` times slower
+(and at least ``--min-ms`` slower), returns a different number of rows,
+changed plan, or started failing.  Flags make the command exit with status 1.
+Baselines are only comparable on the same machine.
+
+``--before-indexes`` also times every query before the indexes are built,
+to show what they change:
+
+    python -m care_stat.sqlbench --rows 10000000 --before-indexes
+
+``--summaries`` also builds the report summary tables (care_stat/rollups.py)
+and times the same reports read from them, from
+SQL_analysis/SQL_summary_reports.sql:
+
+    python -m care_stat.sqlbench --rows 1000000 --summaries
+
+Queries that reference columns or tables the schema does not have are
+reported with SQLite's error instead of a time.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from care_stat import datedim, db, rollups
+from care_stat.synthetic import COUNTRIES, DEPARTMENTS, DIAGNOSES, METHODS, SEVERITIES, STATUSES
+
+ANALYSIS_PATH = os.path.join(db.ROOT_DIR, "SQL_analysis", "SQL_analysis.sql")
+SUMMARY_REPORTS_PATH = os.path.join(db.ROOT_DIR, "SQL_analysis", "SQL_summary_reports.sql")
+BASELINE_PATH = os.path.join(db.ROOT_DIR, "SQL_analysis", "sqlbench_baseline.json")
+
+# Short names for the queries, by the comment above them in SQL_analysis.sql;
+# a query without an entry is named after its comment.
+QUERY_NAMES = {
+    "Total revenue and number of payments": "revenue_totals",
+    "Monthly revenue": "monthly_revenue",
+    "Payment methods (which method is most commonly used?)": "payment_methods",
+    "Patients with chronic diseases": "chronic_diseases",
+    "Patients with more than one chronic disease": "multi_chronic_patients",
+    "Doctors by number of visits": "top_doctors_by_visits",
+    "For patients who have more than one visit": "repeat_patients",
+    "Departments by number of doctors": "department_doctor_counts",
+    "New patients per month": "new_patients_per_month",
+}
+
+CHRONIC_DISEASES = ["Diabetes", "Hypertension", "Asthma", "COPD", "Heart Disease", "Chronic Kidney Disease",
+                    "Arthritis", "Epilepsy", "Hypothyroidism", "Depression"]
+SPECIALIZATIONS = ["Cardiology", "Neurology", "Orthopedics", "Pediatrics", "General Surgery", "Dermatology"]
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def tsql_query_to_sqlite(sql):
+    """Translate one SQL_analysis.sql SELECT into SQLite."""
+    sql = sql.strip().rstrip(";")
+    sql = re.sub(r"\bYEAR\(([^()]*)\)", r"CAST(strftime('%Y', \1) AS INTEGER)", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bMONTH\(([^()]*)\)", r"CAST(strftime('%m', \1) AS INTEGER)", sql, flags=re.IGNORECASE)
+    # String concatenation around a literal: a + ' ' + b.
+    sql = re.sub(r"\+\s*('(?:[^']|'')*')\s*\+", r"|| \1 ||", sql)
+    top = re.match(r"\s*SELECT\s+TOP\s+(\d+)\s", sql, flags=re.IGNORECASE)
+    if top:
+        sql = "SELECT " + sql[top.end():] + f"\nLIMIT {top.group(1)}"
+    return sql
+
+
+def analysis_queries(path=ANALYSIS_PATH, translate=True):
+    """(name, SQLite query) for every query in SQL_analysis.sql, in file order.
+
+    With ``translate=False`` the queries are returned in T-SQL as written.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read().replace("\r\n", "\n")
+    text = re.sub(r"^\s*USE\s+\w+;?\s*$", "", text, flags=re.IGNORECASE | re.MULTILINE)
+    parts = re.split(r"^--\s*(.*?)\s*--\s*$", text, flags=re.MULTILINE)
+    queries = []
+    for title, body in zip(parts[1::2], parts[2::2]):
+        if body.strip():
+            sql = tsql_query_to_sqlite(body) if translate else body.strip()
+            queries.append((QUERY_NAMES.get(title, _slug(title)), sql))
+    return queries
+
+
+# === Synthetic load ===
+
+def _insert(conn, table, columns):
+    names = list(columns)
+    values = zip(*(np.asarray(columns[name]).tolist() for name in names))
+    with conn:
+        conn.executemany(f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                         values)
+
+
+def _timestamps(rng, n, unit):
+    start = np.datetime64("2021-01-01T00:00:00")
+    stamps = start + rng.integers(0, 3 * 365 * 24 * 3600, size=n).astype("timedelta64[s]")
+    if unit == "D":
+        return np.datetime_as_string(stamps, unit="D")
+    return np.char.replace(np.datetime_as_string(stamps, unit="s"), "T", " ")
+
+
+def _month_keys(stamps):
+    # yyyymm from ISO date strings, as the loaders store it.
+    return np.char.replace(np.asarray(stamps).astype("U7"), "-", "").astype(np.int64)
+
+
+def _pick(rng, values, n):
+    return np.asarray(values)[rng.integers(0, len(values), size=n)]
+
+
+def table_sizes(rows):
+    """Rows per table for a load with ``rows`` payments."""
+    return {
+        "Patients": max(rows // 10, 100),
+        "Doctors": max(rows // 5000, 50),
+        "Departments": len(DEPARTMENTS),
+        "ChronicDiseases": len(CHRONIC_DISEASES),
+        "Appointments": max(rows // 2, 1),
+        "Medical_Records": max(rows // 2, 1),
+        "Visits": rows,
+        "Payments": rows,
+    }
+
+
+def synthetic_load(conn, rows, seed=0, chunk_rows=500_000):
+    """Fill an empty schema with ``rows`` payments and proportionate related rows; returns row counts."""
+    rng = np.random.default_rng(seed)
+    sizes = table_sizes(rows)
+    n_patients, n_doctors, n_departments = sizes["Patients"], sizes["Doctors"], sizes["Departments"]
+
+    _insert(conn, "Patients", {
+        "patient_id": np.arange(1, n_patients + 1),
+        "first_name": _pick(rng, ["Ahmed", "Sara", "Omar", "Mona", "Youssef", "Laila"], n_patients),
+        "last_name": _pick(rng, ["Hassan", "Ali", "Mahmoud", "Ibrahim", "Saleh"], n_patients),
+        "gender": _pick(rng, ["male", "female"], n_patients),
+        "age": rng.integers(0, 100, size=n_patients),
+        "country": _pick(rng, COUNTRIES, n_patients),
+        "visits_count": rng.integers(0, 20, size=n_patients),
+    })
+    _insert(conn, "Doctors", {
+        "doctor_id": np.arange(1, n_doctors + 1),
+        "first_name": _pick(rng, ["Khaled", "Nour", "Tarek", "Hana"], n_doctors),
+        "last_name": _pick(rng, ["Fahmy", "Nabil", "Zaki", "Soliman"], n_doctors),
+        "age": rng.integers(28, 70, size=n_doctors),
+        "specialization": _pick(rng, SPECIALIZATIONS, n_doctors),
+        "university_grade": _pick(rng, ["Excellent", "Very Good", "Good"], n_doctors),
+        "educational_degree": _pick(rng, ["MBBS", "MSc", "MD", "PhD"], n_doctors),
+        "years_of_experience": rng.integers(1, 40, size=n_doctors),
+        "rating_avg": np.round(rng.uniform(1, 5, size=n_doctors), 2),
+        "salary": np.round(rng.uniform(20000, 90000, size=n_doctors), 2),
+        "gender": _pick(rng, ["male", "female"], n_doctors),
+    })
+    _insert(conn, "Departments", {
+        "department_id": np.arange(1, n_departments + 1),
+        "department_name": DEPARTMENTS,
+        "department_code": [f"D{i:03d}" for i in range(1, n_departments + 1)],
+        "max_capacity": rng.integers(20, 200, size=n_departments),
+        "num_staff": rng.integers(5, 100, size=n_departments),
+        "emergency_support": rng.integers(0, 2, size=n_departments),
+    })
+    _insert(conn, "ChronicDiseases", {
+        "disease_id": np.arange(1, len(CHRONIC_DISEASES) + 1),
+        "disease_name": CHRONIC_DISEASES,
+    })
+    # Every doctor works in one department, every other doctor in a second one.
+    doctors = np.arange(1, n_doctors + 1)
+    first = (doctors % n_departments) + 1
+    second = ((doctors * 7 + 3) % n_departments) + 1
+    both = (doctors % 2 == 0) & (second != first)
+    _insert(conn, "DoctorDepartment", {
+        "doctor_id": np.concatenate([doctors, doctors[both]]),
+        "department_id": np.concatenate([first, second[both]]),
+        "workload_hours_week": rng.integers(10, 60, size=n_doctors + int(both.sum())),
+    })
+
+    def chunked(table, total, make):
+        date_column = datedim.MONTH_KEY_SOURCES[table]
+        for start in range(0, total, chunk_rows):
+            n = min(chunk_rows, total - start)
+            columns = make(np.arange(start + 1, start + n + 1), n)
+            columns["month_key"] = _month_keys(columns[date_column])
+            _insert(conn, table, columns)
+            with conn:
+                datedim.ensure(conn.cursor(), [min(columns[date_column]), max(columns[date_column])])
+
+    chunked("Appointments", sizes["Appointments"], lambda ids, n: {
+        "appointment_id": ids,
+        "doctor_id": rng.integers(1, n_doctors + 1, size=n),
+        "patient_id": rng.integers(1, n_patients + 1, size=n),
+        "appointment_date": _timestamps(rng, n, "s"),
+    })
+    chunked("Medical_Records", sizes["Medical_Records"], lambda ids, n: {
+        "record_id": ids,
+        "patient_id": rng.integers(1, n_patients + 1, size=n),
+        "doctor_id": rng.integers(1, n_doctors + 1, size=n),
+        "department_id": rng.integers(1, n_departments + 1, size=n),
+        "diagnosis": _pick(rng, DIAGNOSES, n),
+        "severity_level": _pick(rng, SEVERITIES, n),
+        "prescription_cost": np.round(rng.uniform(10, 1000, size=n), 2),
+        "record_date": _timestamps(rng, n, "D"),
+    })
+    chunked("Visits", sizes["Visits"], lambda ids, n: {
+        "visit_id": ids,
+        "patient_id": rng.integers(1, n_patients + 1, size=n),
+        "visit_date": _timestamps(rng, n, "D"),
+    })
+    chunked("Payments", sizes["Payments"], lambda ids, n: {
+        "payment_id": ids,
+        "patient_id": rng.integers(1, n_patients + 1, size=n),
+        "appointment_id": rng.integers(1, sizes["Appointments"] + 1, size=n),
+        "record_id": rng.integers(1, sizes["Medical_Records"] + 1, size=n),
+        "department_id": rng.integers(1, n_departments + 1, size=n),
+        "method": _pick(rng, METHODS, n),
+        "amount": np.round(rng.uniform(50, 5000, size=n), 2),
+        "payment_date": _timestamps(rng, n, "s"),
+        "payment_status": _pick(rng, STATUSES, n),
+    })
+    return sizes
+
+
+def bulk_connect(path):
+    """A connection tuned for loading a throwaway database: no journal, no fsync, no FK checks."""
+    conn = db.connect(path)
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    return conn
+
+
+# === Timing ===
+
+def query_plan(conn, sql):
+    """``EXPLAIN QUERY PLAN`` of ``sql`` as indented lines."""
+    depth, lines = {0: -1}, []
+    for node, parent, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def time_queries(conn, queries, repeat=3, plans=True):
+    """Best-of-``repeat`` wall time, row count and plan per query, or the error SQLite raised."""
+    results = {}
+    for name, sql in queries:
+        best, rows = None, None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = len(conn.execute(sql).fetchall())
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        except sqlite3.Error as e:
+            results[name] = {"error": str(e)}
+            continue
+        results[name] = {"ms": round(best * 1000, 3), "rows": rows}
+        if plans:
+            results[name]["plan"] = query_plan(conn, sql)
+    return results
+
+
+def run_scale(rows, queries, repeat=3, seed=0, before_indexes=False, path=None, summary_queries=None):
+    """Load ``rows`` payments into a fresh database and time ``queries`` on it.
+
+    With ``summary_queries``, the report summaries are then built from the
+    loaded rows and those queries timed as well.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = path or os.path.join(tmp, "care_stat_bench.db")
+        if os.path.exists(path):
+            raise SystemExit(f"❌ {path} already exists")
+        conn = bulk_connect(path)
+        db.create_schema(conn, indexes=False)
+
+        start = time.perf_counter()
+        sizes = synthetic_load(conn, rows, seed=seed)
+        conn.execute("ANALYZE")
+        result = {"tables": sizes, "load_s": round(time.perf_counter() - start, 3)}
+        if before_indexes:
+            result["before"] = time_queries(conn, queries, repeat, plans=False)
+
+        start = time.perf_counter()
+        db.create_indexes(conn)
+        conn.execute("ANALYZE")
+        result["index_s"] = round(time.perf_counter() - start, 3)
+        result["queries"] = time_queries(conn, queries, repeat)
+        if summary_queries:
+            start = time.perf_counter()
+            rollups.rebuild(conn)
+            result["summary_s"] = round(time.perf_counter() - start, 3)
+            result["summaries"] = time_queries(conn, summary_queries, repeat)
+        result["size_mb"] = round(os.path.getsize(path) / 2**20, 1)
+        conn.close()
+    return result
+
+
+def compare(results, baseline, threshold=1.5, min_ms=5.0):
+    """Regressions of ``results`` against ``baseline``, as {(scale, query): [reasons]}."""
+    flags = {}
+    for scale, run in results.items():
+        for name, now in run["queries"].items():
+            then = baseline.get(scale, {}).get("queries", {}).get(name)
+            if then is None:
+                continue
+            reasons = []
+            if "error" in now and "error" not in then:
+                reasons.append(f"fails: {now['error']}")
+            elif "error" not in now and "error" not in then:
+                if now["ms"] > then["ms"] * threshold and now["ms"] - then["ms"] >= min_ms:
+                    reasons.append(f"{now['ms'] / max(then['ms'], 1e-3):.1f}x slower")
+                if now["rows"] != then["rows"]:
+                    reasons.append(f"{now['rows']} rows instead of {then['rows']}")
+                if "plan" in then and now.get("plan") != then["plan"]:
+                    reasons.append("plan changed")
+            if reasons:
+                flags[(scale, name)] = reasons
+    return flags
+
+
+def _read_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["scales"]
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQL_analysis.sql queries on synthetic loads.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="payments per scale; other tables are sized from it (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; the best is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--query", action="append", help="only run this query (repeatable)")
+    parser.add_argument("--before-indexes", action="store_true",
+                        help="also time every query before the secondary indexes are built")
+    parser.add_argument("--summaries", action="store_true",
+                        help="also time the reports read from the summary tables")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="flag queries more than this many times slower than the baseline")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slow-downs smaller than this")
+    parser.add_argument("--show-plans", action="store_true", help="print every query plan")
+    parser.add_argument("--db", help="database file to build for a single scale (default: a temporary file)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    if args.db and len(args.rows) > 1:
+        parser.error("--db needs a single --rows value")
+
+    queries = analysis_queries()
+    if args.query:
+        unknown = set(args.query) - {name for name, _ in queries}
+        if unknown:
+            parser.error(f"unknown queries: {', '.join(sorted(unknown))}")
+        queries = [(name, sql) for name, sql in queries if name in args.query]
+    summary_queries = None
+    if args.summaries:
+        summary_queries = [(name, sql) for name, sql in analysis_queries(SUMMARY_REPORTS_PATH)
+                           if name in {name for name, _ in queries}]
+
+    results = {}
+    for rows in args.rows:
+        run = run_scale(rows, queries, args.repeat, args.seed, args.before_indexes, args.db, summary_queries)
+        results[str(rows)] = run
+        print(f"✅ {rows:,} payments: loaded {sum(run['tables'].values()):,} rows in {run['load_s']:.1f} s, "
+              f"indexed in {run['index_s']:.1f} s, {run['size_mb']:,.0f} MB"
+              + (f", summaries built in {run['summary_s']:.1f} s" if summary_queries else ""))
+
+    baseline = None if args.save_baseline else _read_baseline(args.baseline)
+    flags = {} if baseline is None else compare(results, baseline, args.threshold, args.min_ms)
+
+    for scale, run in results.items():
+        print(f"\n== {int(scale):,} payments")
+        header = f"{'query':<26}" + (f" {'before ms':>11}" if args.before_indexes else "") + f" {'ms':>11} {'rows':>7}"
+        if summary_queries:
+            header += f" {'summary ms':>11}"
+        if baseline is not None:
+            header += f" {'baseline ms':>12}"
+        print(header)
+        for name, _ in queries:
+            now = run["queries"][name]
+            line = f"{name:<26}"
+            if args.before_indexes:
+                before = run["before"][name]
+                line += f" {before['ms']:>11,.1f}" if "ms" in before else f" {'n/a':>11}"
+            if "error" in now:
+                line += f" {'n/a':>11} {'':>7}"
+            else:
+                line += f" {now['ms']:>11,.1f} {now['rows']:>7}"
+            if summary_queries:
+                summary = run["summaries"].get(name, {})
+                line += f" {summary['ms']:>11,.1f}" if "ms" in summary else f" {'-':>11}"
+            if baseline is not None:
+                then = baseline.get(scale, {}).get("queries", {}).get(name, {})
+                line += f" {then['ms']:>12,.1f}" if "ms" in then else f" {'-':>12}"
+            if "error" in now:
+                line += f"  ({now['error']})"
+            if (scale, name) in flags:
+                line += "  ⚠️ " + "; ".join(flags[(scale, name)])
+            print(line)
+            if args.show_plans and "plan" in now:
+                print("\n".join("      " + step for step in now["plan"]))
+
+    record = {"timestamp": time.time(), "sqlite": sqlite3.sqlite_version, "scales": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline}; store one with --save-baseline.")
+    elif flags:
+        print(f"\n❌ {len(flags)} regression(s) against {args.baseline}")
+        raise SystemExit(1)
+    else:
+        print(f"\n✅ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Fast server start: deferred imports, background warm-up and startup timing.
+
+Run the dashboard through serve.py to use it:
+
+    streamlit run serve.py
+
+serve.py wraps app.py in an ``st.App`` whose ``lifespan`` calls
+``start_warm_up``: while the server starts listening, a background thread
+imports pandas and plotly and loads every tab's data and cubes
+(``resources.warm``), so the first visitor finds them ready.
+
+app.py itself sends the page title before it imports plotly, and pandas and
+the data modules are only imported by the code that uses them, so a cold
+first visit sees the page start to render before those imports.  It marks the first run's
+milestones with ``mark``; once the first run is interactive, ``report``
+prints how long the first visitor waited for the first byte (the page title)
+and for a fully rendered page, measured from the start of that run and from
+process start.  Plain ``streamlit run app.py`` still works, just without the
+warm-up.
+"""
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from care_stat import profiling, resources
+
+WARM_UP_THREAD = "care-stat-warm-up"
+
+_marks = {}
+_lock = threading.Lock()
+
+
+def _process_start():
+    # Wall-clock start of this process, from /proc on Linux.
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat", encoding="ascii") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_START = _process_start()
+
+
+def mark(name):
+    """Record when ``name`` first happened in this process; True the first time only."""
+    with _lock:
+        if name in _marks:
+            return False
+        _marks[name] = time.time()
+        return True
+
+
+def report():
+    """Print and return the first run's startup timings, in seconds."""
+    with _lock:
+        marks = dict(_marks)
+    run = marks.get("run", PROCESS_START)
+    record = {"startup": {
+        "first_byte_s": round(marks["first_byte"] - run, 3),
+        "interactive_s": round(marks["interactive"] - run, 3),
+        "first_byte_since_process_s": round(marks["first_byte"] - PROCESS_START, 3),
+        "interactive_since_process_s": round(marks["interactive"] - PROCESS_START, 3),
+    }}
+    line = (f"⏱️ First visit: first byte after {record['startup']['first_byte_s']:.2f} s, "
+            f"interactive after {record['startup']['interactive_s']:.2f} s")
+    if "warm_start" in marks:
+        warmed = marks.get("warm_done")
+        record["startup"]["warm_up_s"] = None if warmed is None else round(warmed - marks["warm_start"], 3)
+        line += (" (warm-up still running)" if warmed is None or warmed > run
+                 else f" (warm-up finished {run - warmed:.2f} s earlier)")
+    print(line, flush=True)
+    if profiling.env_enabled():
+        profiling.write_jsonl(record)
+    return record["startup"]
+
+
+def _warm_up():
+    start = time.perf_counter()
+    try:
+        # Imported here so the first run of app.py finds them in sys.modules.
+        import plotly.express  # noqa: F401
+        import plotly.graph_objects  # noqa: F401
+        from care_stat import dashboard, db  # noqa: F401
+        resources.warm()
+    except Exception as e:
+        # The first visit will run into the same problem and show it.
+        print(f"⚠️ Warm-up failed: {e}", flush=True)
+        return
+    mark("warm_done")
+    print(f"✅ Data and aggregates warmed up in {time.perf_counter() - start:.2f} s", flush=True)
+
+
+def start_warm_up():
+    """Start the warm-up in a background thread, once per process."""
+    if mark("warm_start"):
+        resources.quiet_outside_script_runs(WARM_UP_THREAD)
+        threading.Thread(target=_warm_up, name=WARM_UP_THREAD, daemon=True).start()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Serving starts right away; the warm-up runs alongside it.
+    start_warm_up()
+    yield
@@ -0,0 +1,93 @@
+"""Compact summaries for distribution charts.
+
+Box plots and histograms are drawn from these summaries rather than from raw
+rows, so the figure sent to the browser has a fixed size however many rows
+the data has: five numbers and a capped list of outliers per box, and one
+count per histogram bin.
+"""
+import numpy as np
+import pandas as pd
+
+from care_stat.profiling import section
+from care_stat.sketches import TDigest
+
+QUARTILES = [0.25, 0.5, 0.75]
+# Outliers drawn per box; the rest are only counted.
+MAX_OUTLIERS = 50
+
+
+def _fences(stats):
+    iqr = stats["q3"] - stats["q1"]
+    return stats["q1"] - 1.5 * iqr, stats["q3"] + 1.5 * iqr
+
+
+def box_summary(df, by, col, method="exact", max_outliers=MAX_OUTLIERS):
+    """Box-plot statistics of ``col`` per ``by`` group.
+
+    One row per group with ``n``, ``mean``, ``q1``, ``median``, ``q3``, the
+    whisker ends ``lower``/``upper`` (most extreme values within 1.5 IQR),
+    ``n_outliers`` and up to ``max_outliers`` of them in ``outliers``.
+    ``method="tdigest"`` estimates the quartiles from a ``TDigest`` per group.
+    """
+    with section("box_summary"):
+        df = df[[by, col]].dropna()
+        if df.empty:
+            return None
+        grouped = df.groupby(by, observed=True)[col]
+        stats = grouped.agg(["count", "mean"]).rename(columns={"count": "n"})
+        if method == "tdigest":
+            digests = {}
+            for group, values in grouped:
+                digests[group] = TDigest()
+                digests[group].add(values.to_numpy())
+            quartiles = pd.DataFrame({g: d.quantile(QUARTILES) for g, d in digests.items()}).T
+        else:
+            quartiles = grouped.quantile(QUARTILES).unstack()
+        quartiles.columns = ["q1", "median", "q3"]
+        stats = stats.join(quartiles)
+        low, high = _fences(stats)
+
+        fence_low = df[by].map(low).astype(float)
+        fence_high = df[by].map(high).astype(float)
+        inside = (df[col] >= fence_low) & (df[col] <= fence_high)
+        stats["lower"] = df[col].where(inside).groupby(df[by], observed=True).min()
+        stats["upper"] = df[col].where(inside).groupby(df[by], observed=True).max()
+        outliers = df.loc[~inside, [by, col]]
+        stats["n_outliers"] = outliers.groupby(by, observed=True).size().reindex(stats.index, fill_value=0)
+        capped = outliers.groupby(by, observed=True).head(max_outliers)
+        stats["outliers"] = capped.groupby(by, observed=True)[col].agg(list).reindex(stats.index)
+        stats["outliers"] = stats["outliers"].apply(lambda v: v if isinstance(v, list) else [])
+        return stats.reset_index()
+
+
+def histogram(df, col, bins=30, by=None, start=None, width=None, weights=None):
+    """Counts of ``col`` in ``bins`` equal-width bins, optionally per ``by`` group.
+
+    The bins span the column's range unless ``start`` and ``width`` fix them.
+    With ``weights`` (a column name) each row counts as its weight, as in a
+    stratified sample.  Returns one row per non-empty bin (and group) with
+    ``bin_start``, ``bin_end``, ``bin_mid`` and ``count``.
+    """
+    with section("histogram"):
+        columns = [col] + ([] if by is None else [by]) + ([] if weights is None else [weights])
+        df = df[columns].dropna()
+        if df.empty:
+            return None
+        values = df[col].to_numpy(dtype=np.float64)
+        if start is None or width is None:
+            start, stop = values.min(), values.max()
+            width = (stop - start) / bins or 1.0
+        idx = np.clip(((values - start) // width).astype(np.int64), 0, bins - 1)
+        keys = pd.DataFrame({"bin": idx})
+        if by is not None:
+            keys[by] = df[by].to_numpy()
+        grouped = keys.groupby(list(keys.columns), observed=True)
+        if weights is None:
+            counts = grouped.size().reset_index(name="count")
+        else:
+            counts = pd.Series(df[weights].to_numpy(), index=keys.index).groupby(
+                [keys[c] for c in keys.columns], observed=True).sum().round().astype("int64").reset_index(name="count")
+        counts["bin_start"] = start + counts["bin"] * width
+        counts["bin_end"] = counts["bin_start"] + width
+        counts["bin_mid"] = counts["bin_start"] + width / 2
+        return counts.drop(columns="bin")
@@ -0,0 +1,18 @@
+"""Value lists for the synthetic Care_Stat data of the benchmarks and load tests.
+
+Shared by ``care_stat.loadtest`` (wide Care_stat.csv files), ``care_stat.sqlbench``
+(the normalized tables) and ``care_stat.ingestbench``, so every generator draws
+from the same departments, diagnoses and payment values.
+"""
+
+DEPARTMENTS = ["Cardiology", "Neurology", "Orthopedics", "Pediatrics", "Radiology", "Surgery",
+               "Dermatology", "Oncology", "Emergency", "ICU", "Laboratory", "Pharmacy"]
+COUNTRIES = ["Egypt", "Saudi Arabia", "UAE", "Jordan", "Morocco", "Kuwait", "Qatar"]
+DIAGNOSES = ["Flu", "Fracture", "Hypertension", "Diabetes", "Asthma",
+             "Migraine", "Pneumonia", "Anemia", "Gastritis", "Arthritis"]
+SEVERITIES = ["low", "moderate", "high", "critical"]
+EQUIPMENT = ["MRI Scanner", "CT Scanner", "X-Ray Machine", "Ultrasound", "ECG Monitor", "Ventilator",
+             "Defibrillator", "Infusion Pump", "Dialysis Machine", "Surgical Light",
+             "Anesthesia Machine", "Patient Monitor"]
+METHODS = ["cash", "credit_card", "debit_card", "insurance", "online"]
+STATUSES = ["pending", "completed", "failed", "refunded"]
@@ -0,0 +1,38 @@
+"""Per-table version counters, raised whenever a loader changes a table.
+
+Results computed from the database (``care_stat.analytics``) are cached
+with the versions of the tables they read, and stay valid while those
+versions stay the same.  Every writer calls ``bump`` with the tables it
+changed before committing, so the new versions become visible together with
+the rows.  The counters live in the TableVersions table
+(Database/Table_Versions_data.sql); a table without a row is at version 0.
+The SQL is plain ``?``-parameterized SQL for SQL Server (pyodbc) and SQLite
+alike.
+"""
+
+
+def bump(cursor, *tables):
+    """Raise the version of each of ``tables``; the caller commits."""
+    for table in tables:
+        cursor.execute(
+            "UPDATE TableVersions SET version = version + 1, changed_at = CURRENT_TIMESTAMP WHERE table_name = ?",
+            (table,),
+        )
+        cursor.execute(
+            "INSERT INTO TableVersions (table_name, version, changed_at) SELECT ?, 1, CURRENT_TIMESTAMP"
+            " WHERE NOT EXISTS (SELECT 1 FROM TableVersions WHERE table_name = ?)",
+            (table, table),
+        )
+
+
+def current(cursor, tables):
+    """{table: version} for ``tables``, read in one query."""
+    tables = sorted(set(tables))
+    if not tables:
+        return {}
+    cursor.execute(
+        f"SELECT table_name, version FROM TableVersions WHERE table_name IN ({', '.join('?' * len(tables))})",
+        tables,
+    )
+    found = dict(cursor.fetchall())
+    return {table: int(found.get(table, 0)) for table in tables}
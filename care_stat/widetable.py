@@ -0,0 +1,188 @@
+"""Builds the denormalized Care_stat table from the normalized Care_Stat tables.
+
+One row per medical record, joined on the schema's foreign keys to its doctor,
+department and patient (each at most one match), its payments (every match)
+and its department's equipment (one device per record, as in Care_stat.csv).
+
+Every join is a vectorized hash join: the right side's keys are hashed once,
+the left side probes them in one pass, and the output size of the join is
+known before any column is copied.  Each join's fan-out (output rows per
+input row) is reported, and a join whose fan-out passes ``max_fanout`` is
+refused before it can blow up memory.
+
+    python -m care_stat.widetable --source db                       # Care_stat.parquet, read by the dashboard
+    python -m care_stat.widetable --source db --out Care_stat.csv
+
+The Dataset CSV files carry no foreign keys, so ``--source csv`` first seeds
+an in-memory copy of the schema from them, as ``python -m care_stat.db --init``
+does.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from care_stat import db
+
+# Base table of the wide table: one row per medical record.
+BASE_QUERY = (
+    "SELECT record_id, patient_id, doctor_id, department_id, diagnosis AS disease_name,"
+    " severity_level, prescription_cost, record_date FROM Medical_Records"
+)
+
+# (table, query, key, matches): matches is "one" for a many-to-one foreign key,
+# "all" to keep every matching row and "first" to keep only the first one.
+WIDE_JOINS = [
+    ("Doctors", "SELECT doctor_id, gender, salary, years_of_experience, age FROM Doctors",
+     "doctor_id", "one"),
+    ("Departments", "SELECT department_id, department_name, num_staff FROM Departments",
+     "department_id", "one"),
+    ("Patients", "SELECT patient_id, country, age AS age_patient, visits_count FROM Patients",
+     "patient_id", "one"),
+    ("Payments", "SELECT record_id, payment_id, method, amount, payment_status, payment_date FROM Payments",
+     "record_id", "all"),
+    ("Department_Equipment", "SELECT department_id, equipment_name FROM Department_Equipment",
+     "department_id", "first"),
+]
+
+MAX_FANOUT = 10.0
+
+
+class JoinExplosion(ValueError):
+    """A join would multiply the row count by more than the allowed fan-out."""
+
+
+def _take(series, positions):
+    # -1 marks "no match" and becomes a missing value; integer columns that get
+    # one go nullable first, so ids such as payment_id do not turn into floats.
+    if pd.api.types.is_integer_dtype(series.dtype) and (positions < 0).any():
+        series = series.astype("Int64")
+    return series.array.take(positions, allow_fill=True)
+
+
+def hash_join(left, right, key, matches="all", max_fanout=MAX_FANOUT):
+    """Left join of ``right`` onto ``left`` on ``key``; returns (frame, stats).
+
+    ``stats`` has the input and output row counts, the fan-out, the number of
+    unmatched left rows and the largest number of matches for one key.
+    """
+    # Build: hash the right-hand keys once and group right rows by key.
+    right_codes, uniques = pd.factorize(right[key], use_na_sentinel=True)
+    counts = np.bincount(right_codes[right_codes >= 0], minlength=len(uniques))
+    order = np.argsort(right_codes, kind="stable")[np.count_nonzero(right_codes < 0):]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Probe: one hash lookup per left row.
+    codes = pd.Index(uniques).get_indexer(left[key])
+    found = codes >= 0
+    codes = np.where(found, codes, 0)
+    # Only matched rows index ``counts``, which is empty when the right side is.
+    per_row = np.zeros(len(left), dtype=np.int64)
+    per_row[found] = counts[codes[found]]
+    if matches in ("one", "first"):
+        per_row = np.minimum(per_row, 1)
+    out_per_row = np.maximum(per_row, 1)
+    out_rows = int(out_per_row.sum())
+
+    stats = {
+        "left_rows": len(left),
+        "right_rows": len(right),
+        "out_rows": out_rows,
+        "fanout": out_rows / len(left) if len(left) else 0.0,
+        "unmatched": int(np.count_nonzero(~found)),
+        "max_matches": int(counts.max()) if len(counts) else 0,
+    }
+    if matches == "one" and stats["max_matches"] > 1:
+        raise JoinExplosion(f"{key} is not unique on the right side ({stats['max_matches']} rows for one key)")
+    if stats["fanout"] > max_fanout:
+        raise JoinExplosion(f"join on {key} would grow {len(left)} rows to {out_rows} "
+                            f"(fan-out {stats['fanout']:.2f} > {max_fanout})")
+
+    # Materialize: repeat each left row once per match and line up the matches.
+    left_pos = np.repeat(np.arange(len(left)), out_per_row)
+    within = np.arange(out_rows) - np.repeat(np.cumsum(out_per_row) - out_per_row, out_per_row)
+    matched = np.repeat(per_row > 0, out_per_row)
+    right_pos = np.full(out_rows, -1)
+    right_pos[matched] = order[(np.repeat(starts[codes], out_per_row) + within)[matched]]
+
+    columns = {col: _take(left[col], left_pos) for col in left.columns}
+    for col in right.columns:
+        if col != key:
+            columns[col] = _take(right[col], right_pos)
+    return pd.DataFrame(columns), stats
+
+
+def tables_from_db(conn):
+    """Base records and the right-hand side of every join, read from a Care_Stat database."""
+    base = pd.read_sql_query(BASE_QUERY, conn)
+    return base, {table: pd.read_sql_query(query, conn) for table, query, _, _ in WIDE_JOINS}
+
+
+def tables_from_csv(seed=42):
+    """Same as ``tables_from_db``, from an in-memory schema seeded from the Dataset CSV files."""
+    conn = db.connect(":memory:")
+    db.create_schema(conn)
+    db.seed_from_csv(conn, seed=seed)
+    try:
+        return tables_from_db(conn)
+    finally:
+        conn.close()
+
+
+def build_wide(base, tables, max_fanout=MAX_FANOUT):
+    """Run ``WIDE_JOINS`` over ``base``; returns the wide frame and one stats dict per join."""
+    wide, report = base, []
+    for table, _, key, matches in WIDE_JOINS:
+        start = time.perf_counter()
+        wide, stats = hash_join(wide, tables[table], key, matches, max_fanout)
+        stats.update(table=table, key=key, seconds=time.perf_counter() - start)
+        report.append(stats)
+    return wide, report
+
+
+def write_wide(wide, path):
+    """Write the wide table; ``.parquet`` (columnar, needs pyarrow) or ``.csv`` by extension."""
+    if path.endswith(".csv"):
+        wide.to_csv(path, index=False)
+    else:
+        wide.to_parquet(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the denormalized Care_stat table.")
+    parser.add_argument("--source", choices=["db", "csv"], default="db",
+                        help="read the local database or seed from the Dataset CSV files")
+    parser.add_argument("--db", default=db.DB_PATH, help="database file for --source db (default: %(default)s)")
+    parser.add_argument("--out", default=os.path.join(db.ROOT_DIR, "Care_stat.parquet"),
+                        help="output file, .parquet or .csv; the dashboard reads Care_stat.parquet in "
+                             "preference to Care_stat.csv (default: %(default)s)")
+    parser.add_argument("--max-fanout", type=float, default=MAX_FANOUT,
+                        help="refuse any join that multiplies the row count by more than this")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        conn = db.connect(args.db)
+        base, tables = tables_from_db(conn)
+        conn.close()
+    else:
+        base, tables = tables_from_csv()
+
+    try:
+        wide, report = build_wide(base, tables, args.max_fanout)
+    except JoinExplosion as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    print(f"{'join':<22} {'key':<14} {'in':>9} {'out':>9} {'fan-out':>8} {'unmatched':>9} {'max/key':>7}")
+    for s in report:
+        flag = "  ⚠️" if s["fanout"] > 1 else ""
+        print(f"{s['table']:<22} {s['key']:<14} {s['left_rows']:>9} {s['out_rows']:>9} {s['fanout']:>8.3f} "
+              f"{s['unmatched']:>9} {s['max_matches']:>7}{flag}")
+    write_wide(wide, args.out)
+    print(f"✅ {len(wide)} rows x {len(wide.columns)} columns written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
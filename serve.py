@@ -0,0 +1,10 @@
+"""Serves app.py with a background warm-up at server start (see care_stat/startup.py)
+and streamed exports of the filtered rows (see care_stat/export.py).
+
+    streamlit run serve.py
+"""
+import streamlit as st
+
+from care_stat import export, startup
+
+app = st.App("app.py", lifespan=startup.lifespan, routes=export.routes())